@@ -0,0 +1,219 @@
+# api/bar_cache.py
+"""In-process OHLCV bar cache keyed by (symbol, exchange, interval).
+
+Each entry keeps the bar history for one key. Repeat requests are served
+from memory until the entry expires, after which only the bars newer than
+the last cached timestamp are fetched and merged onto the tail. Entries
+are evicted least-recently-used once the memory cap is exceeded and can
+optionally be mirrored to disk so they survive a restart.
+"""
+
+import math
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+
+# Bar length in seconds for each interval accepted by the API
+INTERVAL_SECONDS = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "1h": 3600,
+    "4h": 14400,
+    "1d": 86400,
+    "1w": 604800,
+    "1M": 2592000,
+}
+
+DAY_SECONDS = 86400
+
+
+def expiry_for(interval: str, now: float) -> float:
+    """Return the wall-clock time at which bars cached at `now` go stale.
+
+    Intraday data expires when the current bar closes; daily and longer
+    bars stay valid until the next session (the next UTC day).
+    """
+    step = INTERVAL_SECONDS.get(interval, DAY_SECONDS)
+    step = min(step, DAY_SECONDS)
+    return (math.floor(now / step) + 1) * step
+
+
+def _file_part(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9.-]", "-", value)
+
+
+class _Entry:
+    def __init__(self, frame: pd.DataFrame, fetched_at: float, expires_at: float, exhausted: bool):
+        self.frame = frame
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+        # True when upstream returned fewer bars than asked for, i.e. this is all the history there is
+        self.exhausted = exhausted
+        self.nbytes = int(frame.memory_usage(index=True, deep=True).sum())
+
+
+class BarCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_bars: int = 5000, cache_dir: str = None):
+        self.max_bytes = max_bytes
+        self.max_bars = max_bars
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'refreshes': 0, 'misses': 0, 'evictions': 0, 'bars_fetched': 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, symbol: str, exchange: str, interval: str, n_bars: int,
+            fetch: Callable[[int], Optional[pd.DataFrame]], now: float = None) -> Optional[pd.DataFrame]:
+        """Return the latest `n_bars` bars, calling `fetch(count)` only for data the cache lacks"""
+        now = time.time() if now is None else now
+        key = (symbol.upper(), exchange.upper(), interval)
+        entry = self._lookup(key)
+
+        if entry is not None and (len(entry.frame) >= n_bars or entry.exhausted):
+            if now < entry.expires_at:
+                self._count('hits')
+                return entry.frame.tail(n_bars).copy()
+
+            merged = self._refresh_tail(entry, interval, n_bars, fetch, now)
+            if merged is not None:
+                self._count('refreshes')
+                self._store(key, _Entry(merged, now, expiry_for(interval, now), entry.exhausted))
+                return merged.tail(n_bars).copy()
+
+        # Cold key, or not enough history cached: fetch the full window
+        self._count('misses')
+        count = max(n_bars, len(entry.frame) if entry is not None else 0)
+        data = fetch(count)
+        if data is None or data.empty:
+            return data
+        self._count('bars_fetched', len(data))
+        data = data.sort_index()
+        self._store(key, _Entry(data.iloc[-max(self.max_bars, n_bars):], now, expiry_for(interval, now),
+                                len(data) < count))
+        return data.tail(n_bars).copy()
+
+    def _refresh_tail(self, entry: _Entry, interval: str, n_bars: int, fetch, now: float) -> Optional[pd.DataFrame]:
+        """Fetch only the bars after the last cached timestamp and merge them onto the history"""
+        cached = entry.frame
+        step = INTERVAL_SECONDS.get(interval, DAY_SECONDS)
+        # Bars that can have opened since the cache was filled, plus the last cached bar,
+        # which may still have been forming when it was fetched
+        missing = int(math.ceil((now - entry.fetched_at) / step)) + 1
+        if missing >= len(cached) or missing >= n_bars:
+            return None
+
+        fresh = fetch(missing)
+        if fresh is None or fresh.empty:
+            return None
+        self._count('bars_fetched', len(fresh))
+        fresh = fresh.sort_index()
+        if fresh.index[0] > cached.index[-1]:
+            # Gap between cached history and new bars; fall back to a full fetch
+            return None
+
+        merged = pd.concat([cached[cached.index < fresh.index[0]], fresh])
+        if len(merged) > self.max_bars:
+            merged = merged.iloc[-self.max_bars:]
+        return merged
+
+    def _lookup(self, key) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = self._load(key)
+        if entry is not None:
+            self._store(key, entry, persist=False)
+        return entry
+
+    def _store(self, key, entry: _Entry, persist: bool = True):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            # Evict least recently used keys, always keeping the one just stored
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self._stats['evictions'] += 1
+        if persist:
+            self._save(key, entry)
+
+    def _path(self, key) -> str:
+        name = "_".join(_file_part(part) for part in key)
+        return os.path.join(self.cache_dir, f"{name}.pkl")
+
+    def _save(self, key, entry: _Entry):
+        if not self.cache_dir:
+            return
+        try:
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump((entry.frame, entry.fetched_at, entry.expires_at, entry.exhausted), f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"Error writing bar cache: {e}")
+
+    def _load(self, key) -> Optional[_Entry]:
+        if not self.cache_dir or not os.path.exists(self._path(key)):
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                frame, fetched_at, expires_at, exhausted = pickle.load(f)
+            return _Entry(frame, fetched_at, expires_at, exhausted)
+        except Exception as e:
+            print(f"Error reading bar cache: {e}")
+            return None
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def invalidate(self, symbol: str = None):
+        """Drop cached bars for one symbol, or everything when no symbol is given, in memory and on disk"""
+        with self._lock:
+            for key in list(self._entries):
+                if symbol is None or key[0] == symbol.upper():
+                    self._bytes -= self._entries.pop(key).nbytes
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        # File names start with the sanitized symbol, which never contains the "_" separator
+        prefix = "" if symbol is None else _file_part(symbol.upper()) + "_"
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith(".pkl"):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> Dict:
+        """Return a snapshot of cache counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        stats['max_bytes'] = self.max_bytes
+        lookups = stats['hits'] + stats['refreshes'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+# Shared cache used by the API routes
+bar_cache = BarCache(
+    max_bytes=int(float(os.getenv("BAR_CACHE_MAX_MB", "64")) * 1024 * 1024),
+    cache_dir=os.getenv("BAR_CACHE_DIR") or None,
+)
@@ -0,0 +1,290 @@
+# api/bar_stream.py
+"""Server-push fan-out of newly closed bars and the predictions made on them.
+
+Every (ticker, interval) that has at least one subscriber gets a feed. One
+background poller serves all feeds: it only asks upstream for bars once a
+new bar can have closed, pushes each closed bar through the feed's
+IndicatorState (O(1) per bar instead of recomputing the history) and
+scores it with the ticker's fitted model. The resulting delta event (just
+the new bar and its prediction) is put on every subscriber's bounded queue.
+
+Like tvDatafeed, fetches end with the bar that is still forming, so a bar
+counts as closed once a later bar has appeared after it. Bar timestamps
+are never compared with the wall clock: tvDatafeed stamps bars in the
+host's local time, so such a comparison would depend on its timezone.
+Polls are scheduled from when the previous new bar was seen instead.
+
+A subscriber whose queue fills up is disconnected rather than allowed to
+stall the poller or grow memory. Each feed keeps its recent events, so a
+client that reconnects with Last-Event-ID is replayed exactly what it missed.
+A new feed starts with events for its seed history, so this holds even when
+the client was the feed's only subscriber and the feed was dropped meanwhile.
+"""
+
+import json
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .bar_cache import INTERVAL_SECONDS
+from .metrics import metrics
+from .serialization import add_time_column
+from .singleflight import SingleFlight
+from ..ml.streaming import IndicatorState
+
+BAR_FIELDS = ['time', 'open', 'high', 'low', 'close', 'volume']
+
+
+class Subscriber:
+    def __init__(self, key: tuple, max_queue: int):
+        self.key = key
+        self.events: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+
+class _Feed:
+    def __init__(self, ticker: str, interval: str, state: IndicatorState, predictor, last_time: int,
+                 replay: int, now: float):
+        self.ticker = ticker
+        self.interval = interval
+        self.step = INTERVAL_SECONDS[interval]
+        self.state = state
+        self.predictor = predictor
+        self.last_time = last_time
+        self.latest: Optional[Dict] = None
+        self.recent: "deque[Dict]" = deque(maxlen=replay)
+        self.subscribers: List[Subscriber] = []
+        self.events = 0
+        # Wall-clock times of the last fetch and of the earliest useful next one
+        self.polled_at = now
+        self.next_poll = now
+
+
+class BarStreamHub:
+    def __init__(self, fetch: Callable[[str, str, int], Optional[pd.DataFrame]],
+                 predictor_for: Callable[[str, str, List[Dict]], object] = None, seed_bars: int = 100,
+                 poll_interval: float = 2.0, max_queue: int = 64, replay: int = 500,
+                 clock: Callable[[], float] = time.time):
+        # fetch(ticker, interval, n_bars) returns the latest bars indexed by datetime, like tvDatafeed
+        self._fetch = fetch
+        # predictor_for(ticker, interval, records) returns a fitted predictor (or None) for the seed history
+        self._predictor_for = predictor_for
+        self.seed_bars = seed_bars
+        self.poll_interval = poll_interval
+        self.max_queue = max_queue
+        self.replay = replay
+        self._clock = clock
+        self._feeds: Dict[tuple, _Feed] = {}
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stats = {'subscribed': 0, 'unsubscribed': 0, 'overflows': 0, 'polls': 0, 'poll_errors': 0,
+                       'bars': 0, 'deliveries': 0}
+
+    def subscribe(self, ticker: str, interval: str, last_event_id: int = None) -> Optional[Subscriber]:
+        """Join (or start) the feed for ticker+interval; None if upstream has no bars for it"""
+        key = (ticker.upper(), interval)
+        while True:
+            feed = self._flights.do(key, lambda: self._get_or_create_feed(*key))
+            if feed is None:
+                return None
+            self._lock.acquire()
+            if self._feeds.get(key) is feed:
+                break
+            # The last subscriber left (or overflowed) and the feed was dropped meanwhile; start a new one
+            self._lock.release()
+
+        try:
+            if last_event_id is not None:
+                # Replay what a reconnecting client missed, oldest first
+                backlog = [event for event in feed.recent if event['id'] > last_event_id]
+            else:
+                backlog = [feed.latest] if feed.latest is not None else []
+            # Room for the whole backlog on top of the usual bound, so a replay can't overflow by itself
+            subscriber = Subscriber(key, self.max_queue + len(backlog))
+            for event in backlog:
+                subscriber.events.put_nowait(event)
+            feed.subscribers.append(subscriber)
+            self._stats['subscribed'] += 1
+        finally:
+            self._lock.release()
+        self.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            feed = self._feeds.get(subscriber.key)
+            if feed is not None and subscriber in feed.subscribers:
+                feed.subscribers.remove(subscriber)
+                self._stats['unsubscribed'] += 1
+                if not feed.subscribers:
+                    # Nobody is listening, so stop polling upstream for it
+                    del self._feeds[subscriber.key]
+
+    def _get_or_create_feed(self, ticker: str, interval: str) -> Optional[_Feed]:
+        with self._lock:
+            feed = self._feeds.get((ticker, interval))
+        if feed is not None:
+            return feed
+
+        now = self._clock()
+        records = self._closed(self._fetch(ticker, interval, self.seed_bars))
+        if not records:
+            return None
+        predictor = self._predictor_for(ticker, interval, records) if self._predictor_for else None
+        feed = _Feed(ticker, interval, IndicatorState(), predictor,
+                     last_time=int(records[-1]['time']), replay=self.replay, now=now)
+        # The newest seed bars become replayable events, for clients reconnecting after the feed was dropped
+        replay_from = len(records) - max(self.replay, 1)
+        for index, bar in enumerate(records):
+            features = feed.state.update(bar)
+            if index >= replay_from:
+                feed.latest = self._event(feed, bar, features)
+                feed.recent.append(feed.latest)
+
+        with self._lock:
+            # Another request may have created it meanwhile; keep the one already serving subscribers
+            return self._feeds.setdefault((ticker, interval), feed)
+
+    def _closed(self, data: Optional[pd.DataFrame]) -> List[Dict]:
+        """Bars from an upstream frame that have fully closed, oldest first, as records with a UNIX 'time'.
+
+        Every bar but the newest has a later bar after it and so has closed;
+        the newest may still be forming and waits for its successor.
+        """
+        if data is None or len(data) < 2:
+            return []
+        data = data.sort_index().iloc[:-1].reset_index()
+        add_time_column(data)
+        return data.to_dict(orient='records')
+
+    def _event(self, feed: _Feed, bar: Dict, features: Dict[str, float]) -> Dict:
+        bar = {field: bar[field] for field in BAR_FIELDS}
+        bar['time'] = int(bar['time'])
+        return {
+            'id': bar['time'],
+            'ticker': feed.ticker,
+            'timeframe': feed.interval,
+            'bar': bar,
+            'prediction': self._predict(feed, features),
+        }
+
+    def _predict(self, feed: _Feed, features: Dict[str, float]) -> Optional[Dict]:
+        predictor = feed.predictor
+        if predictor is None:
+            return None
+        columns = predictor.get_feature_columns()
+        X = np.array([[features.get(column, np.nan) for column in columns]], dtype=np.float64)
+        if np.isnan(X).any():
+            return None
+        predictions, probabilities = predictor.predict_batch(X)
+        return {
+            'prediction': str(predictions[0]),
+            'confidence': float(probabilities[0].max()),
+            'probabilities': {str(label): float(p) for label, p in zip(predictor.model.classes_, probabilities[0])},
+        }
+
+    def poll(self):
+        """Fetch and publish newly closed bars for every feed whose next bar is due"""
+        now = self._clock()
+        with self._lock:
+            due = [feed for feed in self._feeds.values() if now >= feed.next_poll]
+        for feed in due:
+            try:
+                # Enough bars to cover every one that can have closed since the last fetch, the
+                # forming bar and slack
+                count = min(int((now - feed.polled_at) // feed.step) + 3, self.seed_bars)
+                with metrics.span('stream_poll'):
+                    records = self._closed(self._fetch(feed.ticker, feed.interval, count))
+                published = False
+                for bar in records:
+                    if bar['time'] > feed.last_time:
+                        self._publish(feed, self._event(feed, bar, feed.state.update(bar)))
+                        feed.last_time = int(bar['time'])
+                        published = True
+                feed.polled_at = now
+                if published:
+                    # The bar now forming opened at most one poll ago, so it can't close for about a bar;
+                    # until then there is nothing to fetch. After that, poll every cycle until it does.
+                    feed.next_poll = now + feed.step - 2 * self.poll_interval
+                with self._lock:
+                    self._stats['polls'] += 1
+            except Exception as e:
+                print(f"Error polling bars for {feed.ticker} {feed.interval}: {e}")
+                with self._lock:
+                    self._stats['poll_errors'] += 1
+
+    def _publish(self, feed: _Feed, event: Dict):
+        with self._lock:
+            feed.latest = event
+            feed.recent.append(event)
+            feed.events += 1
+            self._stats['bars'] += 1
+            for subscriber in list(feed.subscribers):
+                try:
+                    subscriber.events.put_nowait(event)
+                    self._stats['deliveries'] += 1
+                except queue.Full:
+                    # A slow client must not hold up the others; it reconnects and replays from Last-Event-ID
+                    subscriber.overflowed = True
+                    feed.subscribers.remove(subscriber)
+                    self._stats['overflows'] += 1
+            if not feed.subscribers:
+                self._feeds.pop((feed.ticker, feed.interval), None)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Error in bar stream poll cycle: {e}")
+
+    def start(self):
+        """Start the shared poller thread (no-op if it's running)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='bar-stream-poller', daemon=True)
+            self._thread.start()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['feeds'] = {f"{ticker}:{interval}": {
+                'subscribers': len(feed.subscribers),
+                'last_bar_time': feed.last_time,
+                'events': feed.events,
+                'queued': [subscriber.events.qsize() for subscriber in feed.subscribers],
+            } for (ticker, interval), feed in self._feeds.items()}
+        stats['running'] = self._thread is not None and self._thread.is_alive()
+        return stats
+
+
+def sse_events(hub: BarStreamHub, subscriber: Subscriber, heartbeat: float = 15.0) -> Iterator[str]:
+    """Render a subscription as a Server-Sent Events body; unsubscribes when the client goes away"""
+    try:
+        yield f"retry: {int(hub.poll_interval * 1000)}\n\n"
+        while True:
+            try:
+                event = subscriber.events.get(timeout=heartbeat)
+            except queue.Empty:
+                if subscriber.overflowed:
+                    yield "event: overflow\ndata: {}\n\n"
+                    return
+                # Comment line; keeps proxies from timing out an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {event['id']}\nevent: bar\ndata: {json.dumps(event)}\n\n"
+            if subscriber.overflowed and subscriber.events.empty():
+                yield "event: overflow\ndata: {}\n\n"
+                return
+    finally:
+        hub.unsubscribe(subscriber)
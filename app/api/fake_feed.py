@@ -0,0 +1,125 @@
+# api/fake_feed.py
+"""Offline stand-in for TvDatafeed used for local development and testing.
+
+Set TV_FAKE_FEED=1 to make the session pool hand out FakeTvDatafeed
+instances instead of logging in to TradingView. The fake feed also accepts
+the API's interval keys ("1m", "1d", ...), so tvDatafeed need not be
+installed to run against it.
+"""
+
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from .bar_cache import INTERVAL_SECONDS
+
+# Bar length in seconds for each TradingView interval value ("1", "1H", "1D", ...)
+TV_INTERVAL_SECONDS = {
+    "1": 60,
+    "3": 180,
+    "5": 300,
+    "15": 900,
+    "30": 1800,
+    "45": 2700,
+    "1H": 3600,
+    "2H": 7200,
+    "3H": 10800,
+    "4H": 14400,
+    "1D": 86400,
+    "1W": 604800,
+    "1M": 2592000,
+}
+
+
+def interval_seconds(interval) -> int:
+    """Return the bar length in seconds for an Interval enum, its value or an API interval key"""
+    value = getattr(interval, "value", interval)
+    return TV_INTERVAL_SECONDS.get(value, INTERVAL_SECONDS.get(value, 86400))
+
+
+def generate_ohlcv(symbol: str, n_bars: int, step: int, end_time: int = None, seed: int = None,
+                   exchange: str = "NASDAQ") -> pd.DataFrame:
+    """Generate a deterministic synthetic OHLCV frame shaped like TvDatafeed.get_hist output"""
+    if end_time is None:
+        end_time = int(time.time())
+    # Align to the last fully closed bar so repeated calls agree on timestamps
+    last_open = (end_time // step) * step - step
+    times = last_open - step * np.arange(n_bars - 1, -1, -1, dtype=np.int64)
+
+    # Noise is a pure function of (symbol, bar index) so overlapping windows agree
+    base_seed = zlib.crc32(symbol.encode()) % 10007 if seed is None else seed
+    bar_index = (times // step).astype(np.float64)
+
+    def noise(channel):
+        x = np.sin(bar_index * 12.9898 + (base_seed + channel) * 78.233) * 43758.5453
+        return x - np.floor(x)
+
+    level = 100.0 + 20.0 * np.sin(bar_index / 50.0) + 5.0 * (noise(0) - 0.5)
+    opens = level * (1 + 0.01 * (noise(1) - 0.5))
+    closes = level
+    highs = np.maximum(opens, closes) * (1 + 0.005 * noise(2))
+    lows = np.minimum(opens, closes) * (1 - 0.005 * noise(3))
+    volumes = np.floor(1_000_000 * (0.5 + noise(4)))
+
+    index = pd.DatetimeIndex(pd.to_datetime(times, unit="s"), name="datetime")
+    return pd.DataFrame({
+        "symbol": f"{exchange}:{symbol}",
+        "open": np.round(opens, 2),
+        "high": np.round(highs, 2),
+        "low": np.round(lows, 2),
+        "close": np.round(closes, 2),
+        "volume": volumes,
+    }, index=index)
+
+
+class FakeBarSource:
+    """Synthetic bars on a clock that runs `speed` times faster than real time (or only when advanced).
+
+    Drives the bar stream offline: with speed=60, a new 1m bar closes every
+    real second. speed=0 freezes the clock so tests can step it with advance().
+    Like TradingView, each fetch ends with the bar that is still forming.
+    """
+
+    def __init__(self, speed: float = 1.0, start: float = None, interval_seconds: dict = None):
+        self.speed = speed
+        self.interval_seconds = interval_seconds or INTERVAL_SECONDS
+        self._started = time.time()
+        self._origin = self._started if start is None else start
+        self._offset = 0.0
+        self.calls = 0
+
+    def now(self) -> float:
+        return self._origin + (time.time() - self._started) * self.speed + self._offset
+
+    def advance(self, seconds: float):
+        self._offset += seconds
+
+    def fetch(self, symbol: str, interval: str, n_bars: int) -> pd.DataFrame:
+        """Latest n_bars for an API interval key ("1m", "1d", ...) as of the source's clock, forming bar last"""
+        self.calls += 1
+        step = self.interval_seconds.get(interval, 86400)
+        # generate_ohlcv stops at the last closed bar; a bar later, that is the one now forming
+        return generate_ohlcv(symbol, n_bars, step, end_time=int(self.now()) + step)
+
+
+class FakeTvDatafeed:
+    """Drop-in replacement for TvDatafeed that never touches the network"""
+
+    def __init__(self, username: str = None, password: str = None, login_delay: float = 0.0, fetch_delay: float = 0.0):
+        if login_delay:
+            time.sleep(login_delay)
+        self.username = username
+        self.fetch_delay = fetch_delay
+        self.expired = False
+        self.calls = 0
+
+    def get_hist(self, symbol: str, exchange: str = "NASDAQ", interval="1D", n_bars: int = 10, **kwargs):
+        """Return synthetic bars, or None once the session has been marked expired"""
+        self.calls += 1
+        if self.fetch_delay:
+            time.sleep(self.fetch_delay)
+        if self.expired:
+            return None
+        return generate_ohlcv(symbol, n_bars, interval_seconds(interval), exchange=exchange)
@@ -0,0 +1,149 @@
+# api/metrics.py
+"""Per-stage latency histograms, exported in Prometheus text format.
+
+Code wraps each expensive stage in `metrics.span("stage")`. A span costs
+two perf_counter() calls and one short locked bucket update, so it is
+cheap enough to leave on in production. Durations go into fixed-bucket
+histograms served at /api/metrics. Requests sent with `X-Profile: 1`
+additionally get a Server-Timing header listing the spans recorded on
+that request's thread.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds in seconds, from sub-millisecond cache hits to multi-second model fits
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Spans recorded for the current request when profiling was asked for, else None
+_profile: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar('profile', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # One slot per bucket plus +Inf; counts are per bucket, cumulated when exported
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self, namespace: str = 'smartfinance', buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.namespace = namespace
+        self.buckets = buckets
+        self._stages: Dict[str, Histogram] = {}
+        self._requests: Dict[Tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        """Record one duration for a stage"""
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+        profile = _profile.get()
+        if profile is not None:
+            profile.append((stage, seconds))
+
+    @contextmanager
+    def span(self, stage: str):
+        """Time the enclosed block as `stage` (recorded even if it raises)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def timed(self, stage: str):
+        """Decorator form of span()"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe_request(self, endpoint: str, status: int, seconds: float):
+        key = (endpoint, str(status))
+        with self._lock:
+            histogram = self._requests.get(key)
+            if histogram is None:
+                histogram = self._requests[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def start_profile(self):
+        """Collect this request's spans for a Server-Timing header; returns a token for stop_profile"""
+        return _profile.set([])
+
+    def stop_profile(self, token) -> List[Tuple[str, float]]:
+        spans = _profile.get() or []
+        _profile.reset(token)
+        return spans
+
+    def stats(self) -> Dict:
+        """Return count/sum/mean per stage as JSON-friendly dicts"""
+        with self._lock:
+            return {stage: {'count': h.count, 'sum': h.sum, 'mean': h.sum / h.count if h.count else 0.0}
+                    for stage, h in self._stages.items()}
+
+    def clear(self):
+        with self._lock:
+            self._stages.clear()
+            self._requests.clear()
+
+    def render_prometheus(self) -> str:
+        """Render every histogram in the Prometheus text exposition format"""
+        with self._lock:
+            stages = {stage: (list(h.counts), h.sum, h.count) for stage, h in self._stages.items()}
+            requests = {key: (list(h.counts), h.sum, h.count) for key, h in self._requests.items()}
+
+        lines = []
+        self._render(lines, f'{self.namespace}_stage_duration_seconds', 'Time spent in each request stage',
+                     {(('stage', stage),): values for stage, values in sorted(stages.items())})
+        self._render(lines, f'{self.namespace}_http_request_duration_seconds', 'HTTP request latency by endpoint',
+                     {(('endpoint', endpoint), ('status', status)): values
+                      for (endpoint, status), values in sorted(requests.items())})
+        return '\n'.join(lines) + '\n'
+
+    def _render(self, lines: List[str], name: str, help_text: str, series: Dict):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for labels, (counts, total, count) in series.items():
+            label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{{{label_text},le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label_text}}} {total}')
+            lines.append(f'{name}_count{{{label_text}}} {count}')
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def server_timing(spans: List[Tuple[str, float]]) -> str:
+    """Format spans as a Server-Timing header value (durations in milliseconds)"""
+    totals: Dict[str, List[float]] = {}
+    for stage, seconds in spans:
+        totals.setdefault(stage, []).append(seconds)
+    return ', '.join(f'{stage};dur={sum(values) * 1000:.2f}' + (f';desc="x{len(values)}"' if len(values) > 1 else '')
+                     for stage, values in totals.items())
+
+
+# Shared metrics used across the app
+metrics = Metrics()
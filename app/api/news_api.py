@@ -1,121 +1,154 @@
 # api/news_api.py
 
-from flask import Blueprint, jsonify, request
-import yfinance as yf
-import requests
-from datetime import datetime, timedelta
 import os
-from dotenv import load_dotenv
-from ..ml.model import sentiment_analyzer
 
-# Load environment variables
-load_dotenv()
+from flask import Blueprint, jsonify, request
+from .metrics import metrics
+from .news_refresher import NewsRefresher, watchlist_from_env
+from .news_sources import news_aggregator
+from .singleflight import single_flight
+from ..ml.model import get_sentiment_analyzer
 
 news_bp = Blueprint('news', __name__)
 
-# News API configuration
-NEWS_API_KEY = os.getenv('NEWS_API_KEY')
-NEWS_API_URL = 'https://newsapi.org/v2/everything'
-
-# Finnhub configuration
-FINNHUB_API_KEY = os.getenv('FINN_HUB_API')
-FINNHUB_API_URL = 'https://finnhub.io/api/v1/company-news'
-
 @news_bp.route('/api/news', methods=['GET'])
 def get_news():
     ticker = request.args.get('ticker')
-    if not ticker:
+    tickers = request.args.get('tickers')
+    if not ticker and not tickers:
         return jsonify({'error': 'Missing ticker parameter'}), 400
 
     try:
-        # Get news from Finnhub for the last 7 days
-        to_date = datetime.now().date()
-        from_date = to_date - timedelta(days=7)
-        finnhub_params = {
-            'symbol': ticker.upper(),
-            'from': from_date,
-            'to': to_date,
-            'token': FINNHUB_API_KEY
-        }
-        finnhub_response = requests.get(FINNHUB_API_URL, params=finnhub_params)
-        finnhub_data = finnhub_response.json() if finnhub_response.status_code == 200 else []
-
-        all_news = []
-        for article in finnhub_data:
-            headline = article.get('headline', '')
-            summary = article.get('summary', '')
-            published_at = article.get('datetime', 0)
-            url = article.get('url', '')
-            source = article.get('source', 'Finnhub')
-            if not headline or not summary or not published_at:
-                continue  # Skip articles with missing data
-            all_news.append({
-                'title': headline,
-                'source': source,
-                'publishedAt': datetime.fromtimestamp(published_at).isoformat(),
-                'url': url,
-                'summary': summary
-            })
-
-        # Analyze sentiment for each article
-        for article in all_news:
-            text_to_analyze = f"{article['title']} {article['summary']}"
-            article['sentiment'] = sentiment_analyzer.analyze_sentiment(text_to_analyze)
-
-        # Split articles by sentiment
-        positive_articles = [a for a in all_news if a['sentiment'] > 0.3]
-        negative_articles = [a for a in all_news if a['sentiment'] < -0.3]
-        neutral_articles  = [a for a in all_news if -0.3 <= a['sentiment'] <= 0.3]
-
-        # Sort each group
-        positive_articles.sort(key=lambda x: x['sentiment'], reverse=True)
-        negative_articles.sort(key=lambda x: x['sentiment'])
-        neutral_articles.sort(key=lambda x: x['publishedAt'], reverse=True)
-
-        # Select top N from each group
-        top_positive = positive_articles[:4]
-        top_negative = negative_articles[:4]
-        top_neutral  = neutral_articles[:2]
-
-        # Combine and (optionally) sort by date
-        selected_articles = top_positive + top_negative + top_neutral
-        selected_articles.sort(key=lambda x: x['publishedAt'], reverse=True)
-
-        # Calculate overall sentiment metrics
-        sentiments = [article['sentiment'] for article in selected_articles]
-        overall_sentiment = sum(sentiments) / len(sentiments) if sentiments else 0
-
-        # Calculate sentiment distribution
-        positive_count = sum(1 for a in selected_articles if a['sentiment'] > 0.3)
-        negative_count = sum(1 for a in selected_articles if a['sentiment'] < -0.3)
-        neutral_count = len(selected_articles) - positive_count - negative_count
-
-        # Calculate sentiment trend (comparing recent vs older articles)
-        if len(sentiments) >= 2:
-            recent_sentiments = sentiments[:len(sentiments)//2]
-            older_sentiments = sentiments[len(sentiments)//2:]
-            sentiment_trend = (sum(recent_sentiments) / len(recent_sentiments)) - \
-                              (sum(older_sentiments) / len(older_sentiments))
-        else:
-            sentiment_trend = 0
-
-        response_data = {
-            'articles': selected_articles,
-            'sentiment_analysis': {
-                'overall_sentiment': overall_sentiment,
-                'sentiment_trend': sentiment_trend,
-                'social_media_sentiment': 0,  # To be implemented
-                'news_sentiment': overall_sentiment,
-                'technical_sentiment': 0,
-                'sentiment_distribution': {
-                    'positive': positive_count,
-                    'neutral': neutral_count,
-                    'negative': negative_count
-                }
-            }
-        }
-        print('REPONSE DATA:', response_data)
-        return jsonify(response_data)
+        # Get news for the last 7 days from every configured provider concurrently
+        if tickers:
+            symbols = list(dict.fromkeys(t.strip().upper() for t in tickers.split(',') if t.strip()))
+            results = single_flight.do(('news', tuple(symbols)), lambda: build_news_responses(symbols))
+            with metrics.span('serialization'):
+                return jsonify({'results': results})
+
+        # Tracked tickers are served from the background refresher's precomputed response
+        symbol = ticker.upper()
+        response_data = news_refresher.get(symbol)
+        if response_data is None:
+            # Concurrent requests for the same ticker share one upstream fetch and scoring pass
+            response_data = single_flight.do(('news', symbol), lambda: fetch_and_adopt(symbol))
+        with metrics.span('serialization'):
+            return jsonify(response_data)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+@news_bp.route('/api/news/refresher', methods=['GET'])
+def news_refresher_stats():
+    """Report which tickers are kept fresh in the background and how current they are"""
+    return jsonify(news_refresher.stats())
+
+
+@news_bp.route('/api/sentiment/cache', methods=['GET', 'DELETE'])
+def sentiment_cache_stats():
+    """Report sentiment score cache usage, or clear it with DELETE"""
+    if request.method == 'DELETE':
+        get_sentiment_analyzer().cache.invalidate()
+    return jsonify(get_sentiment_analyzer().cache.stats())
+
+
+@news_bp.route('/api/sentiment/backend', methods=['GET'])
+def sentiment_backend_stats():
+    """Report which sentiment backend is active and its throughput"""
+    return jsonify(get_sentiment_analyzer().backend.stats())
+
+
+def fetch_and_adopt(symbol):
+    """Live path for an untracked ticker: fetch and score now, then hand the articles to the refresher"""
+    articles = score_articles(news_aggregator.fetch([symbol])[symbol])
+    response_data = summarize_news(articles)
+    news_refresher.adopt(symbol, articles)
+    return response_data
+
+
+def build_news_responses(symbols):
+    """Fetch and score news for each symbol, returning {symbol: response}"""
+    news_by_ticker = news_aggregator.fetch(symbols)
+    return {symbol: build_news_response(news_by_ticker[symbol]) for symbol in symbols}
+
+
+def build_news_response(all_news):
+    """Score articles and pick the top positive/negative/neutral ones with summary metrics"""
+    return summarize_news(score_articles(all_news))
+
+
+def score_articles(articles):
+    """Set each article's 'sentiment' score in place and return the list"""
+    # Analyze sentiment for each article (repeat headlines are served from the score cache)
+    texts = [f"{article['title']} {article['summary']}" for article in articles]
+    for article, score in zip(articles, get_sentiment_analyzer().analyze_batch(texts)):
+        article['sentiment'] = score
+    return articles
+
+
+def summarize_news(all_news):
+    """Pick the top positive/negative/neutral scored articles and compute the sentiment metrics"""
+    # Split articles by sentiment
+    positive_articles = [a for a in all_news if a['sentiment'] > 0.3]
+    negative_articles = [a for a in all_news if a['sentiment'] < -0.3]
+    neutral_articles  = [a for a in all_news if -0.3 <= a['sentiment'] <= 0.3]
+
+    # Sort each group
+    positive_articles.sort(key=lambda x: x['sentiment'], reverse=True)
+    negative_articles.sort(key=lambda x: x['sentiment'])
+    neutral_articles.sort(key=lambda x: x['publishedAt'], reverse=True)
+
+    # Select top N from each group
+    top_positive = positive_articles[:4]
+    top_negative = negative_articles[:4]
+    top_neutral  = neutral_articles[:2]
+
+    # Combine and (optionally) sort by date
+    selected_articles = top_positive + top_negative + top_neutral
+    selected_articles.sort(key=lambda x: x['publishedAt'], reverse=True)
+
+    # Calculate overall sentiment metrics
+    sentiments = [article['sentiment'] for article in selected_articles]
+    overall_sentiment = sum(sentiments) / len(sentiments) if sentiments else 0
+
+    # Calculate sentiment distribution
+    positive_count = sum(1 for a in selected_articles if a['sentiment'] > 0.3)
+    negative_count = sum(1 for a in selected_articles if a['sentiment'] < -0.3)
+    neutral_count = len(selected_articles) - positive_count - negative_count
+
+    # Calculate sentiment trend (comparing recent vs older articles)
+    if len(sentiments) >= 2:
+        recent_sentiments = sentiments[:len(sentiments)//2]
+        older_sentiments = sentiments[len(sentiments)//2:]
+        sentiment_trend = (sum(recent_sentiments) / len(recent_sentiments)) - \
+                          (sum(older_sentiments) / len(older_sentiments))
+    else:
+        sentiment_trend = 0
+
+    response_data = {
+        'articles': selected_articles,
+        'sentiment_analysis': {
+            'overall_sentiment': overall_sentiment,
+            'sentiment_trend': sentiment_trend,
+            'social_media_sentiment': 0,  # To be implemented
+            'news_sentiment': overall_sentiment,
+            'technical_sentiment': 0,
+            'sentiment_distribution': {
+                'positive': positive_count,
+                'neutral': neutral_count,
+                'negative': negative_count
+            }
+        }
+    }
+    return response_data
+
+
+# Background refresher for the NEWS_WATCHLIST and tickers adopted from the live path.
+# NEWS_REFRESH_INTERVAL=0 disables it and every request takes the live path.
+news_refresher = NewsRefresher(
+    news_aggregator, score_articles, summarize_news,
+    watchlist=watchlist_from_env(),
+    interval=float(os.getenv('NEWS_REFRESH_INTERVAL', '300')),
+    max_tickers=int(os.getenv('NEWS_MAX_TRACKED', '200')),
+)
@@ -0,0 +1,200 @@
+# api/news_refresher.py
+"""Background refresh of scored news for tracked tickers.
+
+Tracked tickers (the NEWS_WATCHLIST plus any ticker requested on demand)
+keep a rolling window of scored articles in memory. On every cycle the
+refresher asks the providers only for articles newer than the last one
+it has seen, scores just those, drops articles that have aged out of the
+window and rebuilds the ticker's /api/news response, so a request is a
+dictionary lookup instead of a fetch + scoring pass.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .metrics import metrics
+from .news_sources import NewsAggregator, dedupe_articles
+
+
+class _TickerNews:
+    def __init__(self, pinned: bool):
+        self.articles: List[Dict] = []
+        self.last_seen: Optional[datetime] = None
+        self.response: Optional[Dict] = None
+        self.refreshed_at = 0.0
+        self.requested_at = time.time()
+        # Watchlist tickers are never dropped for being idle
+        self.pinned = pinned
+
+
+class NewsRefresher:
+    def __init__(self, aggregator: NewsAggregator, score: Callable[[List[Dict]], List[Dict]],
+                 summarize: Callable[[List[Dict]], Dict], watchlist: Iterable[str] = (),
+                 interval: float = 300.0, days: int = 7, max_tickers: int = 200, idle_ttl: float = 86400.0):
+        self.aggregator = aggregator
+        self._score = score
+        self._summarize = summarize
+        self.interval = interval
+        self.days = days
+        self.max_tickers = max_tickers
+        self.idle_ttl = idle_ttl
+        self._tickers: "OrderedDict[str, _TickerNews]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stopped = False
+        self._stats = {'cycles': 0, 'reads': 0, 'misses': 0, 'new_articles': 0, 'expired_articles': 0,
+                       'adopted': 0, 'dropped': 0, 'errors': 0, 'last_cycle_seconds': 0.0}
+        for ticker in watchlist:
+            self._tickers[ticker.upper()] = _TickerNews(pinned=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def get(self, ticker: str) -> Optional[Dict]:
+        """Return the precomputed /api/news response, or None if the ticker isn't ready yet"""
+        ticker = ticker.upper()
+        with self._lock:
+            entry = self._tickers.get(ticker)
+            if entry is None or entry.response is None:
+                self._stats['misses'] += 1
+                return None
+            entry.requested_at = time.time()
+            self._tickers.move_to_end(ticker)
+            self._stats['reads'] += 1
+            return entry.response
+
+    def adopt(self, ticker: str, articles: List[Dict]) -> Optional[Dict]:
+        """Seed a ticker with articles scored on the live path and keep it refreshed from now on"""
+        if not self.enabled:
+            return None
+        ticker = ticker.upper()
+        with self._lock:
+            entry = self._tickers.get(ticker)
+            if entry is None:
+                entry = self._tickers[ticker] = _TickerNews(pinned=False)
+                self._stats['adopted'] += 1
+                self._evict_locked()
+        self._merge(ticker, entry, articles, scored=True)
+        self.start(immediate=False)
+        return entry.response
+
+    def refresh(self, tickers: List[str] = None):
+        """Fetch, score and merge new articles for the given (default: all tracked) tickers"""
+        started = time.perf_counter()
+        with self._lock:
+            self._drop_idle_locked()
+            entries = {t: e for t, e in self._tickers.items() if tickers is None or t in tickers}
+        if not entries:
+            return
+
+        since = {t: e.last_seen for t, e in entries.items() if e.last_seen is not None}
+        with metrics.span('news_refresh'):
+            fetched = self.aggregator.fetch(list(entries), days=self.days, since=since)
+            for ticker, entry in entries.items():
+                try:
+                    self._merge(ticker, entry, fetched.get(ticker, []), scored=False)
+                except Exception as e:
+                    print(f"Error refreshing news for {ticker}: {e}")
+                    with self._lock:
+                        self._stats['errors'] += 1
+
+        with self._lock:
+            self._stats['cycles'] += 1
+            self._stats['last_cycle_seconds'] = time.perf_counter() - started
+
+    def _merge(self, ticker: str, entry: _TickerNews, articles: List[Dict], scored: bool):
+        # The live path and the refresh thread can both merge into one ticker
+        with self._merge_lock:
+            # Only articles the store hasn't seen get scored
+            fresh = dedupe_articles(entry.articles + articles)[len(entry.articles):]
+            if fresh and not scored:
+                self._score(fresh)
+
+            # publishedAt is a naive ISO timestamp, so string order is time order
+            cutoff = (datetime.now() - timedelta(days=self.days)).isoformat()
+            kept = [a for a in entry.articles + fresh if a['publishedAt'] >= cutoff]
+            expired = len(entry.articles) + len(fresh) - len(kept)
+
+            response = self._summarize(kept)
+            last_seen = max((datetime.fromisoformat(a['publishedAt']) for a in kept), default=entry.last_seen)
+
+            with self._lock:
+                entry.articles = kept
+                entry.response = response
+                entry.last_seen = last_seen
+                entry.refreshed_at = time.time()
+                self._stats['new_articles'] += len(fresh)
+                self._stats['expired_articles'] += expired
+
+    def _drop_idle_locked(self):
+        now = time.time()
+        for ticker in [t for t, e in self._tickers.items() if not e.pinned and now - e.requested_at > self.idle_ttl]:
+            del self._tickers[ticker]
+            self._stats['dropped'] += 1
+
+    def _evict_locked(self):
+        # Least recently requested on-demand tickers go first; the watchlist stays
+        while len(self._tickers) > self.max_tickers:
+            victim = next((t for t, e in self._tickers.items() if not e.pinned), None)
+            if victim is None:
+                break
+            del self._tickers[victim]
+            self._stats['dropped'] += 1
+
+    def _run(self, immediate: bool):
+        if not immediate:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+        while not self._stopped:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error in news refresh cycle: {e}")
+                with self._lock:
+                    self._stats['errors'] += 1
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self, immediate: bool = True):
+        """Start the background refresh thread (no-op if running or disabled).
+
+        With immediate=False the first cycle waits a full interval, e.g.
+        because the live path has just fetched everything there is.
+        """
+        with self._lock:
+            if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, args=(immediate,), name='news-refresher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    def stats(self) -> Dict:
+        """Return refresh counters and per-ticker freshness"""
+        now = time.time()
+        with self._lock:
+            stats = dict(self._stats)
+            stats['tickers'] = {ticker: {
+                'articles': len(entry.articles),
+                'pinned': entry.pinned,
+                'ready': entry.response is not None,
+                'age_seconds': now - entry.refreshed_at if entry.refreshed_at else None,
+                'last_seen': entry.last_seen.isoformat() if entry.last_seen else None,
+            } for ticker, entry in self._tickers.items()}
+        stats['interval'] = self.interval
+        stats['running'] = self._thread is not None and self._thread.is_alive()
+        return stats
+
+
+def watchlist_from_env() -> List[str]:
+    return [t.strip().upper() for t in os.getenv('NEWS_WATCHLIST', '').split(',') if t.strip()]
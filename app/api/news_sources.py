@@ -0,0 +1,195 @@
+# api/news_sources.py
+"""Concurrent news fetching across the configured providers.
+
+Finnhub and NewsAPI are queried in parallel over pooled keep-alive
+sessions with timeouts and retries, and the results are merged and
+deduplicated by URL or headline, so a request takes as long as the
+slowest provider instead of the sum of all of them.
+"""
+
+import hashlib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .metrics import metrics
+
+# Load environment variables
+load_dotenv()
+
+FINNHUB_API_URL = 'https://finnhub.io/api/v1/company-news'
+NEWS_API_URL = 'https://newsapi.org/v2/everything'
+
+# (connect, read) timeouts in seconds for a single provider call
+DEFAULT_TIMEOUT = (3.05, 10)
+
+
+def _make_session(pool_size: int, retries: int) -> requests.Session:
+    """Build a keep-alive session that retries transient upstream failures"""
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _headline_key(title: str) -> str:
+    normalized = re.sub(r'\W+', ' ', title.lower()).strip()
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def _url_key(url: str) -> str:
+    return url.strip().lower().rstrip('/')
+
+
+def dedupe_articles(articles: List[Dict]) -> List[Dict]:
+    """Drop articles whose URL or normalized headline was already seen, keeping the first copy"""
+    seen_urls = set()
+    seen_headlines = set()
+    unique = []
+    for article in articles:
+        url_key = _url_key(article.get('url', ''))
+        headline_key = _headline_key(article.get('title', ''))
+        if (url_key and url_key in seen_urls) or headline_key in seen_headlines:
+            continue
+        if url_key:
+            seen_urls.add(url_key)
+        seen_headlines.add(headline_key)
+        unique.append(article)
+    return unique
+
+
+class NewsAggregator:
+    def __init__(self, finnhub_key: str = None, news_api_key: str = None, timeout=DEFAULT_TIMEOUT,
+                 retries: int = 2, pool_size: int = 16, max_workers: int = 8):
+        self.finnhub_key = finnhub_key
+        self.news_api_key = news_api_key
+        self.timeout = timeout
+        self.session = _make_session(pool_size, retries)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='news')
+
+    def providers(self) -> List[Callable]:
+        """Return fetch functions for every provider with credentials configured"""
+        providers = []
+        if self.finnhub_key:
+            providers.append(self.fetch_finnhub)
+        if self.news_api_key:
+            providers.append(self.fetch_newsapi)
+        return providers
+
+    @metrics.timed('finnhub_fetch')
+    def fetch_finnhub(self, ticker: str, from_date: date, to_date: date) -> List[Dict]:
+        params = {
+            'symbol': ticker.upper(),
+            'from': from_date,
+            'to': to_date,
+            'token': self.finnhub_key
+        }
+        response = self.session.get(FINNHUB_API_URL, params=params, timeout=self.timeout)
+        data = response.json() if response.status_code == 200 else []
+        if not isinstance(data, list):
+            return []
+
+        articles = []
+        for article in data:
+            headline = article.get('headline', '')
+            summary = article.get('summary', '')
+            published_at = article.get('datetime', 0)
+            if not headline or not summary or not published_at:
+                continue  # Skip articles with missing data
+            articles.append({
+                'title': headline,
+                'source': article.get('source', 'Finnhub'),
+                'publishedAt': datetime.fromtimestamp(published_at).isoformat(),
+                'url': article.get('url', ''),
+                'summary': summary
+            })
+        return articles
+
+    @metrics.timed('newsapi_fetch')
+    def fetch_newsapi(self, ticker: str, from_date: date, to_date: date) -> List[Dict]:
+        params = {
+            'q': ticker.upper(),
+            'from': from_date.isoformat(),
+            'to': to_date.isoformat(),
+            'language': 'en',
+            'sortBy': 'publishedAt',
+            'pageSize': 50,
+            'apiKey': self.news_api_key
+        }
+        response = self.session.get(NEWS_API_URL, params=params, timeout=self.timeout)
+        data = response.json() if response.status_code == 200 else {}
+
+        articles = []
+        for article in data.get('articles', []):
+            title = article.get('title') or ''
+            summary = article.get('description') or ''
+            published_at = article.get('publishedAt') or ''
+            if not title or not summary or not published_at or title == '[Removed]':
+                continue  # Skip articles with missing data
+            try:
+                # Convert to local time so it sorts alongside Finnhub timestamps
+                published = datetime.fromisoformat(published_at.replace('Z', '+00:00')).astimezone().replace(tzinfo=None)
+            except ValueError:
+                continue
+            articles.append({
+                'title': title,
+                'source': (article.get('source') or {}).get('name') or 'NewsAPI',
+                'publishedAt': published.isoformat(),
+                'url': article.get('url') or '',
+                'summary': summary
+            })
+        return articles
+
+    def fetch(self, tickers: List[str], days: int = 7,
+              since: Dict[str, datetime] = None) -> Dict[str, List[Dict]]:
+        """Fetch and merge news for every ticker from every provider concurrently.
+
+        `since` maps tickers to the newest publish time already seen; only
+        articles published after it are returned for those tickers.
+        """
+        since = since or {}
+        to_date = datetime.now().date()
+        window_start = to_date - timedelta(days=days)
+
+        futures = {}
+        for ticker in tickers:
+            # Providers filter by day, so an incremental fetch starts on the day of the last article seen
+            from_date = max(window_start, since[ticker].date()) if ticker in since else window_start
+            for provider in self.providers():
+                futures[(ticker, provider.__name__)] = self._executor.submit(provider, ticker, from_date, to_date)
+
+        results = {}
+        for ticker in tickers:
+            merged = []
+            for provider in self.providers():
+                try:
+                    merged.extend(futures[(ticker, provider.__name__)].result())
+                except Exception as e:
+                    # One failing provider shouldn't hide the others' articles
+                    print(f"Error fetching news from {provider.__name__} for {ticker}: {e}")
+            if ticker in since:
+                merged = [a for a in merged if datetime.fromisoformat(a['publishedAt']) > since[ticker]]
+            results[ticker] = dedupe_articles(merged)
+        return results
+
+
+# Shared aggregator used by the news routes
+news_aggregator = NewsAggregator(
+    finnhub_key=os.getenv('FINN_HUB_API'),
+    news_api_key=os.getenv('NEWS_API_KEY'),
+    timeout=(3.05, float(os.getenv('NEWS_TIMEOUT', '10'))),
+)
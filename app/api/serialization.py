@@ -0,0 +1,95 @@
+# api/serialization.py
+"""Bar serialization for /api/stock.
+
+Timestamps are converted to epoch seconds in one vectorized operation.
+Besides the default row format (one object per bar), clients can ask for
+a compact columnar payload (one array per field) as JSON, MessagePack or
+an Arrow IPC stream, optionally gzip-compressed.
+"""
+
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+from flask import Response, current_app, jsonify
+
+from .metrics import metrics
+
+ROW_FORMAT = 'rows'
+RESPONSE_FORMATS = ('rows', 'columns', 'msgpack', 'arrow')
+COLUMNAR_FIELDS = ['time', 'open', 'high', 'low', 'close', 'volume']
+
+_EPOCH = pd.Timestamp(0)
+_SECOND = pd.Timedelta(seconds=1)
+
+
+def epoch_seconds(values) -> np.ndarray:
+    """Convert datetimes (or parseable strings) to UNIX seconds, treating naive values as UTC.
+
+    Timezone-aware values keep their wall-clock time, matching the old
+    calendar.timegm(x.timetuple()) conversion.
+    """
+    stamps = pd.to_datetime(pd.Series(values))
+    if stamps.dt.tz is not None:
+        stamps = stamps.dt.tz_localize(None)
+    return ((stamps - _EPOCH) // _SECOND).to_numpy(dtype=np.int64)
+
+
+@metrics.timed('timestamps')
+def add_time_column(data: pd.DataFrame) -> pd.DataFrame:
+    """Add a UNIX 'time' column computed from the 'datetime' column, in place"""
+    if 'datetime' in data.columns:
+        data['time'] = epoch_seconds(data['datetime'])
+    return data
+
+
+def _columns(data: pd.DataFrame):
+    return [field for field in COLUMNAR_FIELDS if field in data.columns]
+
+
+def _finish(body: bytes, mimetype: str, compress: str = None) -> Response:
+    response = Response(body, mimetype=mimetype)
+    if compress == 'gzip':
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+@metrics.timed('serialization')
+def bars_response(ticker: str, data: pd.DataFrame, fmt: str = ROW_FORMAT, compress: str = None):
+    """Serialize bars in the requested format; raises ImportError if its optional package is missing"""
+    if fmt == ROW_FORMAT and not compress:
+        # Convert DataFrame to list of dictionaries
+        return jsonify({"ticker": ticker, "data": data.to_dict(orient="records")})
+
+    if fmt == ROW_FORMAT:
+        # Same encoding as jsonify (e.g. HTTP-date datetimes), just compressed
+        body = current_app.json.dumps({"ticker": ticker, "data": data.to_dict(orient="records")})
+        return _finish(body.encode(), 'application/json', compress)
+
+    columns = _columns(data)
+    if fmt == 'arrow':
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(data[columns], preserve_index=False)
+        table = table.replace_schema_metadata({'ticker': ticker})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return _finish(sink.getvalue().to_pybytes(), 'application/vnd.apache.arrow.stream', compress)
+
+    payload = {
+        "ticker": ticker,
+        "format": "columns",
+        "count": len(data),
+        "columns": {column: data[column].tolist() for column in columns}
+    }
+    if fmt == 'msgpack':
+        import msgpack
+
+        return _finish(msgpack.packb(payload), 'application/msgpack', compress)
+
+    body = json.dumps(payload, separators=(',', ':'))
+    return _finish(body.encode(), 'application/json', compress)
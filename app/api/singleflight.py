@@ -0,0 +1,87 @@
+# api/singleflight.py
+"""Coalesce identical concurrent calls into one in-flight call.
+
+When many clients open the same ticker at once (e.g. at market open),
+every request would otherwise start its own upstream fetch or model fit.
+The first caller for a key becomes the leader and runs the call; callers
+that arrive while it is running wait and receive the leader's result, or
+the same exception if it fails.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'leaders': 0,
+            'coalesced': 0,
+            'errors': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn() once per key at a time; concurrent callers with the same key share its outcome"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self._stats['leaders'] += 1
+            else:
+                leader = False
+                call.waiters += 1
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            started = time.perf_counter()
+            call.done.wait()
+            waited = time.perf_counter() - started
+            with self._lock:
+                self._stats['wait_time_total'] += waited
+                self._stats['wait_time_max'] = max(self._stats['wait_time_max'], waited)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+        finally:
+            # Later callers start a new flight instead of reusing this (possibly stale) result
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> Dict:
+        """Return a snapshot of leader/coalesced counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+            stats['waiting'] = sum(call.waiters for call in self._calls.values())
+        total = stats['leaders'] + stats['coalesced']
+        stats['coalesce_rate'] = stats['coalesced'] / total if total else 0.0
+        stats['wait_time_avg'] = stats['wait_time_total'] / stats['coalesced'] if stats['coalesced'] else 0.0
+        return stats
+
+
+# Shared instance for the API routes; keys start with the endpoint name so routes never collide
+single_flight = SingleFlight()
@@ -0,0 +1,167 @@
+# api/tv_pool.py
+"""Process-wide pool of logged-in TvDatafeed sessions.
+
+Logging in to TradingView costs an auth round trip before any bars are
+fetched, so sessions are created once and reused across requests. The pool
+caps the number of concurrent upstream sockets and re-authenticates
+sessions that are too old or that stop returning data.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+from dotenv import load_dotenv
+
+from .metrics import metrics
+
+# Load environment variables
+load_dotenv()
+
+
+def _default_factory():
+    """Log in to TradingView (or the offline fake feed when TV_FAKE_FEED is set)"""
+    if os.getenv("TV_FAKE_FEED"):
+        from .fake_feed import FakeTvDatafeed
+        return FakeTvDatafeed(fetch_delay=float(os.getenv("TV_FAKE_DELAY", "0")))
+
+    from tvDatafeed import TvDatafeed
+    return TvDatafeed(username=os.getenv("TV_USERNAME"), password=os.getenv("TV_PASSWORD"))
+
+
+class _Session:
+    def __init__(self, client):
+        self.client = client
+        self.created_at = time.monotonic()
+        self.uses = 0
+
+
+class TvSessionPool:
+    def __init__(self, factory: Callable = None, max_sessions: int = 4, session_ttl: float = 3600.0):
+        self._factory = factory or _default_factory
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self._slots = threading.BoundedSemaphore(max_sessions)
+        self._idle: List[_Session] = []
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'hits': 0,
+            'logins': 0,
+            'relogins': 0,
+            'expired': 0,
+            'failures': 0,
+            'in_use': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+
+    def _login(self) -> _Session:
+        with metrics.span('tv_login'):
+            client = self._factory()
+        with self._lock:
+            self._stats['logins'] += 1
+        return _Session(client)
+
+    def _acquire(self):
+        """Wait for a free slot and return (session, is_fresh_login)"""
+        started = time.perf_counter()
+        self._slots.acquire()
+        waited = time.perf_counter() - started
+
+        session = None
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['in_use'] += 1
+            self._stats['wait_time_total'] += waited
+            self._stats['wait_time_max'] = max(self._stats['wait_time_max'], waited)
+            while self._idle:
+                candidate = self._idle.pop()
+                if time.monotonic() - candidate.created_at < self.session_ttl:
+                    session = candidate
+                    self._stats['hits'] += 1
+                    break
+                self._stats['expired'] += 1
+
+        if session is not None:
+            return session, False
+        try:
+            return self._login(), True
+        except Exception:
+            self._release(None)
+            raise
+
+    def _release(self, session):
+        with self._lock:
+            self._stats['in_use'] -= 1
+            if session is not None:
+                self._idle.append(session)
+        self._slots.release()
+
+    @contextmanager
+    def session(self):
+        """Borrow a logged-in client; the slot is returned when the block exits"""
+        session, _ = self._acquire()
+        try:
+            session.uses += 1
+            yield session.client
+        except Exception:
+            # Don't hand a possibly broken socket to the next caller
+            self._release(None)
+            raise
+        else:
+            self._release(session)
+
+    def get_hist(self, symbol: str, exchange: str, interval, n_bars: int):
+        """Fetch bars through a pooled session, re-authenticating once if it has gone stale"""
+        session, fresh = self._acquire()
+        try:
+            for attempt in range(2):
+                session.uses += 1
+                try:
+                    with metrics.span('bar_fetch'):
+                        data = session.client.get_hist(symbol=symbol, exchange=exchange, interval=interval, n_bars=n_bars)
+                except Exception:
+                    if fresh or attempt:
+                        raise
+                    data = None
+
+                # tvDatafeed returns None when the auth token or socket is no longer valid.
+                # A fresh login that still returns nothing means the symbol really has no data.
+                if data is not None or fresh or attempt:
+                    break
+                with self._lock:
+                    self._stats['relogins'] += 1
+                session, fresh = self._login(), True
+        except Exception:
+            with self._lock:
+                self._stats['failures'] += 1
+            self._release(None)
+            raise
+
+        self._release(session)
+        return data
+
+    def stats(self) -> Dict:
+        """Return a snapshot of pool counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+        stats['max_sessions'] = self.max_sessions
+        stats['hit_rate'] = stats['hits'] / stats['requests'] if stats['requests'] else 0.0
+        stats['wait_time_avg'] = stats['wait_time_total'] / stats['requests'] if stats['requests'] else 0.0
+        return stats
+
+    def clear(self):
+        """Drop all idle sessions so the next request logs in again"""
+        with self._lock:
+            self._idle.clear()
+
+
+# Shared pool used by the API routes
+tv_pool = TvSessionPool(
+    max_sessions=int(os.getenv("TV_MAX_SESSIONS", "4")),
+    session_ttl=float(os.getenv("TV_SESSION_TTL", "3600")),
+)
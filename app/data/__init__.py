@@ -0,0 +1 @@
+# data/__init__.py
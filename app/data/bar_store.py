@@ -0,0 +1,199 @@
+# data/bar_store.py
+"""Append-only, memory-mapped OHLCV history on local disk.
+
+Layout:  <root>/<EXCHANGE>/<SYMBOL>/<interval>/{time.i8, open.f8, ..., volume.f8, meta.json}
+
+Each column is a raw little-endian array file. Appends write the new rows
+to the end of every column file and then publish the new row count in
+meta.json, so readers (which only map `rows` entries) never see a
+half-written bar. Reads map the files with np.memmap and slice them by
+timestamp with searchsorted, so a 100k-bar range comes back as views into
+the page cache with no parsing or copying.
+
+Appends are serialized by a per-instance thread lock only. One process
+(e.g. the API, or the backfill CLI run while the API is stopped) should
+write a given store directory at a time; concurrent readers are always safe.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..api.serialization import epoch_seconds
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bars")
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class BarStore:
+    def __init__(self, root: str = DEFAULT_STORE_DIR, price_dtype: str = 'float64'):
+        self.root = root
+        # float32 halves the footprint, but indicators then differ slightly from the live float64 path
+        self.price_dtype = np.dtype(price_dtype).newbyteorder('<')
+        # Guards appends within this process; it does not coordinate writers in other processes
+        self._lock = threading.Lock()
+
+    def _dir(self, symbol: str, exchange: str, interval: str) -> str:
+        return os.path.join(self.root, exchange.upper(), symbol.upper(), interval)
+
+    def _meta(self, directory: str) -> Optional[Dict]:
+        try:
+            with open(os.path.join(directory, 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, directory: str, meta: Dict):
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.meta-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(directory, 'meta.json'))
+
+    def _path(self, directory: str, column: str, meta: Dict) -> str:
+        return os.path.join(directory, f"{column}.{meta['dtypes'][column]}")
+
+    def rows(self, symbol: str, exchange: str, interval: str) -> int:
+        meta = self._meta(self._dir(symbol, exchange, interval))
+        return meta['rows'] if meta else 0
+
+    def append(self, symbol: str, exchange: str, interval: str, bars: pd.DataFrame) -> int:
+        """Append bars newer than the stored history and return how many rows were added.
+
+        `bars` is indexed by datetime (as tvDatafeed returns them) or has a
+        UNIX 'time' column. A bar with the same timestamp as the last stored
+        one replaces it, since that bar may still have been forming.
+        """
+        if bars is None or bars.empty:
+            return 0
+        times = bars['time'].to_numpy(dtype=np.int64) if 'time' in bars.columns else epoch_seconds(bars.index)
+        order = np.argsort(times, kind='stable')
+        times = times[order]
+        # Keep the last of any duplicate timestamps
+        keep = np.append(times[1:] != times[:-1], True)
+        times = times[keep]
+        columns = {column: pd.to_numeric(bars[column]).to_numpy()[order][keep] for column in PRICE_COLUMNS}
+
+        directory = self._dir(symbol, exchange, interval)
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            meta = self._meta(directory) or {
+                'symbol': symbol.upper(), 'exchange': exchange.upper(), 'interval': interval, 'rows': 0,
+                'dtypes': {'time': 'i8', **{c: self.price_dtype.str[1:] for c in PRICE_COLUMNS}},
+            }
+            rows = meta['rows']
+            last_time = self._last_time(directory, meta)
+
+            if last_time is not None and times[0] < last_time:
+                # Append-only: history before the last stored bar is never rewritten
+                start = int(np.searchsorted(times, last_time))
+                times = times[start:]
+                columns = {c: v[start:] for c, v in columns.items()}
+            if not len(times):
+                return 0
+
+            replace_last = last_time is not None and times[0] == last_time
+            for column in ['time'] + PRICE_COLUMNS:
+                path = self._path(directory, column, meta)
+                values = times if column == 'time' else columns[column]
+                values = np.ascontiguousarray(values, dtype=np.dtype('<' + meta['dtypes'][column]))
+                with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                    # Truncate anything past the published row count (e.g. from an interrupted append)
+                    f.truncate(rows * values.itemsize)
+                    f.seek((rows - 1 if replace_last else rows) * values.itemsize)
+                    f.write(values.tobytes())
+
+            added = len(times) - (1 if replace_last else 0)
+            meta['rows'] = rows + added
+            self._write_meta(directory, meta)
+            return added
+
+    def _last_time(self, directory: str, meta: Dict) -> Optional[int]:
+        if not meta['rows']:
+            return None
+        times = np.memmap(self._path(directory, 'time', meta), dtype='<i8', mode='r', shape=(meta['rows'],))
+        return int(times[-1])
+
+    def read(self, symbol: str, exchange: str, interval: str, start=None, end=None,
+             last: int = None) -> Optional[Dict[str, np.ndarray]]:
+        """Return read-only memory-mapped column views for bars with start <= time < end.
+
+        `start`/`end` are UNIX seconds or anything pandas can parse as a UTC
+        timestamp; `last` keeps only the newest N bars of the range. Returns
+        None if nothing is stored for the key.
+        """
+        directory = self._dir(symbol, exchange, interval)
+        meta = self._meta(directory)
+        if not meta or not meta['rows']:
+            return None
+
+        rows = meta['rows']
+        mapped = {column: np.memmap(self._path(directory, column, meta), mode='r', shape=(rows,),
+                                    dtype='<' + meta['dtypes'][column])
+                  for column in ['time'] + PRICE_COLUMNS}
+        times = mapped['time']
+        lo = int(np.searchsorted(times, _to_epoch(start), side='left')) if start is not None else 0
+        hi = int(np.searchsorted(times, _to_epoch(end), side='left')) if end is not None else rows
+        if last is not None:
+            lo = max(lo, hi - last)
+        return {column: values[lo:hi] for column, values in mapped.items()}
+
+    def read_frame(self, symbol: str, exchange: str, interval: str, start=None, end=None,
+                   last: int = None) -> Optional[pd.DataFrame]:
+        """Like read(), wrapped as a DataFrame whose columns share memory with the mapped files"""
+        columns = self.read(symbol, exchange, interval, start, end, last)
+        if columns is None:
+            return None
+        return pd.DataFrame({name: pd.Series(values, copy=False) for name, values in columns.items()}, copy=False)
+
+    def stats(self) -> Dict:
+        """Return stored row counts per (exchange, symbol, interval)"""
+        stored = {}
+        if os.path.isdir(self.root):
+            for exchange in sorted(os.listdir(self.root)):
+                for symbol in sorted(os.listdir(os.path.join(self.root, exchange))):
+                    for interval in sorted(os.listdir(os.path.join(self.root, exchange, symbol))):
+                        meta = self._meta(os.path.join(self.root, exchange, symbol, interval))
+                        if meta:
+                            stored[f"{exchange}:{symbol}:{interval}"] = meta['rows']
+        return {'root': self.root, 'series': stored, 'total_rows': sum(stored.values())}
+
+
+def _to_epoch(value) -> int:
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(epoch_seconds([value])[0])
+
+
+# Shared store used by the API routes
+bar_store = BarStore(
+    root=os.getenv("BAR_STORE_DIR", DEFAULT_STORE_DIR),
+    price_dtype=os.getenv("BAR_STORE_DTYPE", "float64"),
+)
+
+
+def main(argv=None):
+    """Backfill the store from a CSV export with 'datetime' (or UNIX 'time') and OHLCV columns"""
+    parser = argparse.ArgumentParser(description="Import long OHLCV history into the local bar store")
+    parser.add_argument("symbol")
+    parser.add_argument("interval", help="API interval key, e.g. 1d or 1h")
+    parser.add_argument("csv", help="CSV file with datetime/time, open, high, low, close and volume columns")
+    parser.add_argument("--exchange", default="NASDAQ")
+    args = parser.parse_args(argv)
+
+    frame = pd.read_csv(args.csv)
+    if 'time' not in frame.columns:
+        frame = frame.set_index(pd.to_datetime(frame['datetime']))
+    added = bar_store.append(args.symbol, args.exchange, args.interval, frame)
+    print(f"Added {added} bars; {bar_store.rows(args.symbol, args.exchange, args.interval)} stored for "
+          f"{args.exchange.upper()}:{args.symbol.upper()} {args.interval}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,108 @@
 # main.py
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
 # import yfinance as yf  # Commented out yFinance
-from tvDatafeed import TvDatafeed, Interval
-import os
 from dotenv import load_dotenv
 from app.api.news_api import news_bp
-from app.ml.model import stock_predictor
-import calendar
+from app.api.tv_pool import tv_pool
+from app.api.bar_cache import bar_cache
+from app.api.bar_stream import BarStreamHub, sse_events
+from app.api.fake_feed import FakeBarSource
+from app.data.bar_store import bar_store
+from app.api.serialization import RESPONSE_FORMATS, ROW_FORMAT, add_time_column, bars_response
+from app.api.singleflight import single_flight
+from app.api.metrics import metrics, server_timing
+from app.ml.model import StockMovementPredictor, get_sentiment_analyzer, get_stock_predictor
+from app.ml.registry import model_registry
+from app.ml.features import latest_feature_rows
+from app.ml.feature_registry import feature_registry
+from app.ml.registry import data_fingerprint
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import os
+import time
 
+# tvDatafeed Interval member names; resolved by tv_interval() so tvDatafeed loads on the first fetch
 INTERVAL_MAP = {
-    "1m": Interval.in_1_minute,
-    "5m": Interval.in_5_minute,
-    "15m": Interval.in_15_minute,
-    "30m": Interval.in_30_minute,
-    "1h": Interval.in_1_hour,
-    "4h": Interval.in_4_hour,
-    "1d": Interval.in_daily,
-    "1w": Interval.in_weekly,
-    "1M": Interval.in_monthly
+    "1m": "in_1_minute",
+    "5m": "in_5_minute",
+    "15m": "in_15_minute",
+    "30m": "in_30_minute",
+    "1h": "in_1_hour",
+    "4h": "in_4_hour",
+    "1d": "in_daily",
+    "1w": "in_weekly",
+    "1M": "in_monthly"
 }
 # Load environment variables
 load_dotenv()
 
+# Most bars TradingView returns for one request
+TV_MAX_BARS = 5000
+
+# Batch prediction limits
+BATCH_MAX_WORKERS = int(os.getenv("PREDICT_BATCH_WORKERS", "8"))
+BATCH_MAX_JOBS = int(os.getenv("PREDICT_BATCH_MAX_JOBS", "200"))
+
+# Walk-forward backtest limits (BACKTEST_JOBS=-1 uses every core). Histories come from the
+# local bar store, so they can be longer than a single TradingView fetch.
+BACKTEST_MAX_BARS = int(os.getenv("BACKTEST_MAX_BARS", "20000"))
+BACKTEST_JOBS = int(os.getenv("BACKTEST_JOBS", "-1"))
+
+# Live bar streaming (/api/stream): how often the shared poller checks for closed bars, each
+# subscriber's queue bound, the bars kept for Last-Event-ID replay, and the history a feed is seeded
+# with. STREAM_FAKE_SPEED streams synthetic bars on a clock that many times faster than real time.
+STREAM_POLL_SECONDS = float(os.getenv("STREAM_POLL_SECONDS", "2"))
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "64"))
+STREAM_REPLAY_BARS = int(os.getenv("STREAM_REPLAY_BARS", "500"))
+STREAM_SEED_BARS = int(os.getenv("STREAM_SEED_BARS", "300"))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+STREAM_FAKE_SPEED = float(os.getenv("STREAM_FAKE_SPEED", "0"))
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 app.register_blueprint(news_bp)
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Opt-in per-request breakdown, returned as a Server-Timing header
+    if request.headers.get("X-Profile") == "1":
+        g.profile_token = metrics.start_profile()
+
+@app.after_request
+def record_request_timing(response):
+    elapsed = time.perf_counter() - g.get("request_started", time.perf_counter())
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.observe_request(endpoint, response.status_code, elapsed)
+    token = g.pop("profile_token", None)
+    if token is not None:
+        spans = metrics.stop_profile(token) + [("total", elapsed)]
+        response.headers["Server-Timing"] = server_timing(spans)
+    return response
+
+def tv_interval(interval_str):
+    """Return the tvDatafeed Interval for an API interval key"""
+    if os.getenv("TV_FAKE_FEED"):
+        # The offline feed takes the API key itself, so it runs without tvDatafeed installed
+        return interval_str
+    from tvDatafeed import Interval
+    return Interval[INTERVAL_MAP[interval_str]]
+
+def fetch_bars(ticker, interval_str, n_bars):
+    """Return the latest n_bars for a ticker, fetching from TradingView only what the cache lacks"""
+    symbol = ticker.upper()
+    return bar_cache.get(
+        symbol, 'NASDAQ', interval_str, n_bars,
+        lambda count: tv_pool.get_hist(
+            symbol=symbol,
+            exchange='NASDAQ',
+            interval=tv_interval(interval_str),
+            n_bars=count
+        )
+    )
+
 @app.route("/api/stock", methods=["GET"])
 def get_stock_data():
     ticker = request.args.get("ticker")
@@ -45,47 +120,80 @@ def get_stock_data():
     
     if not interval_enum:
         return {"error": "Invalid interval provided."}, 400
+
+    # Response layout: rows (default), columns, msgpack or arrow; optionally gzip-compressed
+    response_format = request.args.get("format", ROW_FORMAT)
+    compress = request.args.get("compress")
+    if response_format not in RESPONSE_FORMATS:
+        return {"error": f"Invalid format. Use one of: {', '.join(RESPONSE_FORMATS)}"}, 400
+    if compress not in (None, "gzip"):
+        return {"error": "Invalid compress value. Use gzip."}, 400
+
     try:
-        # Initialize tvdatafeed with login credentials
-        username = os.getenv("TV_USERNAME")
-        password = os.getenv("TV_PASSWORD")
-        tv = TvDatafeed(username=username, password=password)
-
-        # Fetch historical data with the n_bars parameter
-        data = tv.get_hist(
-            symbol=ticker.upper(),
-            exchange='NASDAQ',
-            interval=interval_enum,
-            n_bars=n_bars  
+        # Fetch historical data with the n_bars parameter (served from the bar cache when possible).
+        # Identical concurrent requests share one fetch.
+        data = single_flight.do(
+            ("stock", ticker.upper(), interval_str, n_bars),
+            lambda: fetch_bars(ticker, interval_str, n_bars)
         )
 
-        if data.empty or data is None:
+        if data is None or data.empty:
             return {"error": "No data found for that ticker"}, 404
 
-        # Reset index to convert DateTimeIndex to a column
-        data.reset_index(inplace=True)
+        # Reset index to convert DateTimeIndex to a column (into a new frame, since coalesced
+        # requests all received the same one)
+        data = data.reset_index()
 
         # Add a 'time' field as UNIX timestamp (seconds, UTC) from the 'datetime' column
-        if 'datetime' in data.columns:
-            data['time'] = data['datetime'].apply(
-                lambda x: int(calendar.timegm(x.timetuple())) if hasattr(x, 'timetuple') else int(calendar.timegm((
-                    x if isinstance(x, str) else str(x)
-                ) and __import__('dateutil.parser').parse(x).timetuple()))
-            )
+        add_time_column(data)
 
-        # Convert DataFrame to list of dictionaries
-        data_records = data.to_dict(orient="records")
-
-        return jsonify({"ticker": ticker.upper(), "data": data_records})
+        try:
+            return bars_response(ticker.upper(), data, response_format, compress)
+        except ImportError as e:
+            # msgpack/pyarrow are optional dependencies
+            return {"error": f"Format '{response_format}' is not available on this server: {e}"}, 400
 
     except Exception as e:
         return {"error": str(e)}, 500
 
+def prediction_bars(n_bars=None):
+    """Bars to fetch for training + prediction: the requested window, but never below the model's minimum"""
+    return max(n_bars or 0, get_stock_predictor().min_training_bars())
+
+def fetch_bar_records(ticker, interval_str, n_bars):
+    """Return the latest bars as a list of dicts with a UNIX 'time' field, or None if there is no data"""
+    data = fetch_bars(ticker, interval_str, n_bars)
+
+    if data is None or data.empty:
+        return None
+
+    # Reset index to convert DateTimeIndex to a column
+    data.reset_index(inplace=True)
+
+    # Add a 'time' field as UNIX timestamp
+    add_time_column(data)
+
+    # Convert DataFrame to list of dictionaries
+    return data.to_dict(orient="records")
+
+def fetch_history(ticker, interval_str, n_bars):
+    """Return up to the latest n_bars from the local bar store, topped up from TradingView first.
+
+    The frame's columns are memory-mapped views of the store's files, so long
+    histories are read without parsing or copying. Returns None if there is no data.
+    """
+    symbol = ticker.upper()
+    live = fetch_bars(ticker, interval_str, min(n_bars, TV_MAX_BARS))
+    if live is not None and not live.empty:
+        bar_store.append(symbol, 'NASDAQ', interval_str, live)
+    return bar_store.read_frame(symbol, 'NASDAQ', interval_str, last=n_bars)
+
 @app.route("/api/predict", methods=["GET"])
 def predict_stock_movement():
     """Predict stock movement using ML model"""
     ticker = request.args.get("ticker")
-    n_bars = request.args.get("n_bars", default=100, type=int)  # Need more data for ML
+    # Sized from the features' warm-up and the label horizon unless a longer window is asked for
+    n_bars = prediction_bars(request.args.get("n_bars", type=int))
     interval_str = request.args.get("interval", "1d")
     interval_enum = INTERVAL_MAP.get(interval_str)
     
@@ -96,84 +204,303 @@ def predict_stock_movement():
         return {"error": "Invalid interval provided."}, 400
     
     try:
-        # Initialize tvdatafeed with login credentials
-        username = os.getenv("TV_USERNAME")
-        password = os.getenv("TV_PASSWORD")
-        tv = TvDatafeed(username=username, password=password)
-
-        # Fetch historical data for ML training and prediction
-        data = tv.get_hist(
-            symbol=ticker.upper(),
-            exchange='NASDAQ',
-            interval=interval_enum,
-            n_bars=n_bars
+        # Concurrent requests for the same ticker/interval/n_bars share one fetch, fit and prediction
+        body, status = single_flight.do(
+            ("predict", ticker.upper(), interval_str, n_bars),
+            lambda: predict_ticker(ticker, interval_str, n_bars)
         )
+        return jsonify(body), status
 
-        if data.empty or data is None:
-            return {"error": "No data found for that ticker"}, 404
+    except Exception as e:
+        return {"error": str(e)}, 500
 
-        # Reset index to convert DateTimeIndex to a column
-        data.reset_index(inplace=True)
+def predict_ticker(ticker, interval_str, n_bars):
+    """Fetch bars, train (or reuse) the ticker's model and predict; returns (body, status)"""
+    # Fetch historical data for ML training and prediction (served from the bar cache when possible)
+    data_records = fetch_bar_records(ticker, interval_str, n_bars)
 
-        # Add a 'time' field as UNIX timestamp
-        if 'datetime' in data.columns:
-            data['time'] = data['datetime'].apply(
-                lambda x: int(calendar.timegm(x.timetuple())) if hasattr(x, 'timetuple') else int(calendar.timegm((
-                    x if isinstance(x, str) else str(x)
-                ) and __import__('dateutil.parser').parse(x).timetuple()))
-            )
+    if not data_records:
+        return {"error": "No data found for that ticker"}, 404
 
-        # Convert DataFrame to list of dictionaries
-        data_records = data.to_dict(orient="records")
-        
-        # Train the model on historical data
-        training_success = stock_predictor.train_model(data_records)
-        
-        # Evaluate and print metrics to backend, including ticker and interval
+    # Reuse the fitted model for these bars, training only when new bars have arrived
+    predictor = model_registry.get_or_train(ticker, interval_str, data_records)
+
+    if predictor is None:
+        return {
+            "error": "Insufficient data for ML prediction",
+            "prediction": "Neutral",
+            "confidence": 0.0,
+            "probabilities": {"Bullish": 0.33, "Bearish": 0.33, "Neutral": 0.34},
+            "bars_available": len(data_records),
+            "min_bars": get_stock_predictor().min_training_bars()
+        }, 200
+
+    # Get prediction for the latest data point
+    prediction_result = predictor.predict_movement(data_records)
+
+    return prediction_payload(ticker, interval_str, predictor, prediction_result), 200
+
+def prediction_payload(ticker, interval_str, predictor, prediction_result):
+    """Shape a prediction result the way /api/predict returns it"""
+    return {
+        "ticker": ticker.upper(),
+        "prediction": prediction_result["prediction"],
+        "confidence": prediction_result["confidence"],
+        "probabilities": prediction_result["probabilities"],
+        "features": prediction_result.get("features", []),
+        "model_trained": True,
+        "feature_count": len(predictor.get_feature_columns()),
+        "timeframe": interval_str,
+        "prediction_horizon": predictor.horizon
+    }
+
+def _predict_latest(ticker, interval_str, data_records, latest_features):
+    """Train (or reuse) the model for one ticker and predict from its precomputed latest feature row"""
+    predictor = model_registry.get_or_train(ticker, interval_str, data_records)
+    if predictor is None:
+        return {
+            "ticker": ticker,
+            "timeframe": interval_str,
+            "error": "Insufficient data for ML prediction",
+            "prediction": "Neutral",
+            "confidence": 0.0,
+            "probabilities": {"Bullish": 0.33, "Bearish": 0.33, "Neutral": 0.34},
+            "bars_available": len(data_records),
+            "min_bars": get_stock_predictor().min_training_bars()
+        }
+    return prediction_payload(ticker, interval_str, predictor, predictor.predict_features(latest_features))
+
+def run_prediction_batch(jobs, n_bars, max_workers=BATCH_MAX_WORKERS):
+    """Yield one prediction (or inline error) per (ticker, interval) job as each completes"""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Fetch every ticker's bars concurrently; the session pool bounds upstream sockets
+        fetches = {executor.submit(fetch_bar_records, ticker, interval_str, n_bars): (ticker, interval_str)
+                   for ticker, interval_str in jobs}
+        histories = {}
+        for future in as_completed(fetches):
+            ticker, interval_str = fetches[future]
+            try:
+                data_records = future.result()
+            except Exception as e:
+                yield {"ticker": ticker, "timeframe": interval_str, "error": str(e)}
+                continue
+            if not data_records:
+                yield {"ticker": ticker, "timeframe": interval_str, "error": "No data found for that ticker"}
+                continue
+            histories.setdefault(interval_str, {})[ticker] = data_records
+
+        # Compute the latest feature row for every ticker of an interval in one panel pass
+        predictions = {}
+        for interval_str, group in histories.items():
+            latest_rows = latest_feature_rows(group, get_stock_predictor().get_feature_columns())
+            for ticker, data_records in group.items():
+                future = executor.submit(_predict_latest, ticker, interval_str, data_records, latest_rows[ticker])
+                predictions[future] = (ticker, interval_str)
+
+        for future in as_completed(predictions):
+            ticker, interval_str = predictions[future]
+            try:
+                yield future.result()
+            except Exception as e:
+                yield {"ticker": ticker, "timeframe": interval_str, "error": str(e)}
+
+def _string_list(value):
+    """A JSON list of strings, or a comma-separated string, as a list; None for anything else"""
+    if isinstance(value, str):
+        return value.split(",")
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return value
+    return None
+
+@app.route("/api/predict/batch", methods=["GET", "POST"])
+def predict_batch():
+    """Predict stock movement for a watchlist, streaming results as they complete"""
+    if request.method == "POST":
+        body = request.get_json(silent=True) or {}
+        tickers = _string_list(body.get("tickers", []))
+        intervals = _string_list(body.get("intervals") or [body.get("interval", "1d")])
+        if tickers is None or intervals is None:
+            return {"error": "tickers and intervals must be lists of strings or comma-separated strings"}, 400
+        try:
+            n_bars = prediction_bars(body.get("n_bars") and int(body["n_bars"]))
+        except (TypeError, ValueError):
+            return {"error": "n_bars must be an integer"}, 400
+        stream = bool(body.get("stream", True))
+    else:
+        tickers = request.args.get("tickers", "").split(",")
+        intervals = request.args.get("intervals", request.args.get("interval", "1d")).split(",")
+        n_bars = prediction_bars(request.args.get("n_bars", type=int))
+        stream = request.args.get("stream", "1") != "0"
+
+    tickers = [t.strip().upper() for t in tickers if t and t.strip()]
+    intervals = [i.strip() for i in intervals if i and i.strip()]
+
+    if not tickers:
+        return {"error": "Missing tickers parameter"}, 400
+
+    invalid = [i for i in intervals if i not in INTERVAL_MAP]
+    if invalid or not intervals:
+        return {"error": f"Invalid interval provided: {', '.join(invalid)}"}, 400
+
+    # Preserve request order while dropping duplicates
+    jobs = list(dict.fromkeys((ticker, interval_str) for ticker in tickers for interval_str in intervals))
+    if len(jobs) > BATCH_MAX_JOBS:
+        return {"error": f"Too many ticker/interval pairs (max {BATCH_MAX_JOBS})"}, 400
+
+    results = run_prediction_batch(jobs, n_bars)
+    if not stream:
+        return jsonify({"results": list(results), "total_count": len(jobs)})
+
+    # Newline-delimited JSON, one line per ticker/interval as soon as it is ready
+    return Response((json.dumps(result) + "\n" for result in results), mimetype="application/x-ndjson")
+
+@app.route("/api/evaluate", methods=["GET"])
+def evaluate_stock_model():
+    """Evaluate the ML model on a train/test split of recent bars"""
+    ticker = request.args.get("ticker")
+    n_bars = prediction_bars(request.args.get("n_bars", default=100, type=int))
+    interval_str = request.args.get("interval", "1d")
+
+    if not ticker:
+        return {"error": "Missing ticker parameter"}, 400
+
+    if not INTERVAL_MAP.get(interval_str):
+        return {"error": "Invalid interval provided."}, 400
+
+    try:
+        data_records = fetch_bar_records(ticker, interval_str, n_bars)
+
+        if not data_records:
+            return {"error": "No data found for that ticker"}, 404
+
+        # Evaluate on a throwaway predictor so cached models are left untouched
         print(f"\n=== Model Evaluation for {ticker.upper()} ({interval_str}) ===")
-        stock_predictor.evaluate_model(data_records)
-        
-        if not training_success:
-            return {
-                "error": "Insufficient data for ML prediction",
-                "prediction": "Neutral",
-                "confidence": 0.0,
-                "probabilities": {"Bullish": 0.33, "Bearish": 0.33, "Neutral": 0.34}
-            }, 200
-        
-        # Get prediction for the latest data point
-        prediction_result = stock_predictor.predict_movement(data_records)
-        
+        evaluation = StockMovementPredictor().evaluate_model(data_records)
+
+        if evaluation is None:
+            return {"error": "Insufficient data to evaluate model"}, 200
+
         return jsonify({
             "ticker": ticker.upper(),
-            "prediction": prediction_result["prediction"],
-            "confidence": prediction_result["confidence"],
-            "probabilities": prediction_result["probabilities"],
-            "features": prediction_result.get("features", []),
-            "model_trained": True,
-            "feature_count": len(stock_predictor.get_feature_columns()),
             "timeframe": interval_str,
-            "prediction_horizon": 5
+            "metrics": evaluation
         })
 
     except Exception as e:
         return {"error": str(e)}, 500
 
+@app.route("/api/backtest", methods=["GET"])
+def backtest_stock_model():
+    """Walk-forward backtest the ML model: retrain per fold and simulate the signals"""
+    ticker = request.args.get("ticker")
+    n_bars = min(request.args.get("n_bars", default=1000, type=int), BACKTEST_MAX_BARS)
+    interval_str = request.args.get("interval", "1d")
+    train_size = request.args.get("train_size", default=250, type=int)
+    test_size = request.args.get("test_size", default=20, type=int)
+    step = request.args.get("step", type=int)
+    expanding = request.args.get("window", "rolling") == "expanding"
+    cost_bps = request.args.get("cost_bps", default=0.0, type=float)
+
+    if not ticker:
+        return {"error": "Missing ticker parameter"}, 400
+
+    if not INTERVAL_MAP.get(interval_str):
+        return {"error": "Invalid interval provided."}, 400
+
+    if train_size < 30 or test_size < 1:
+        return {"error": "train_size must be at least 30 and test_size at least 1"}, 400
+
+    if step is not None and step < test_size:
+        return {"error": "step must be at least test_size so test windows don't overlap"}, 400
+
+    try:
+        from app.ml.backtest import backtest, periods_per_year
+
+        history = fetch_history(ticker, interval_str, n_bars)
+
+        if history is None or history.empty:
+            return {"error": "No data found for that ticker"}, 404
+
+        result = backtest(history, train_size=train_size, test_size=test_size, step=step,
+                          expanding=expanding, cost_bps=cost_bps, n_jobs=BACKTEST_JOBS,
+                          periods_per_year=periods_per_year(interval_str))
+
+        if result.get("error"):
+            return {"error": result["error"]}, 200
+
+        return jsonify({
+            "ticker": ticker.upper(),
+            "timeframe": interval_str,
+            "window": "expanding" if expanding else "rolling",
+            "summary": result["summary"],
+            "folds": result["folds"]
+        })
+
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+@app.route("/api/tune", methods=["GET"])
+def tune_stock_model():
+    """Search algorithms/hyperparameters for a ticker; re-running the same search resumes it.
+
+    The winning configuration is used for this ticker+interval's predictions
+    from then on (in this process, until restart) unless apply=0 is passed.
+    """
+    ticker = request.args.get("ticker")
+    n_bars = min(request.args.get("n_bars", default=1000, type=int), BACKTEST_MAX_BARS)
+    interval_str = request.args.get("interval", "1d")
+    algorithms = [a.strip() for a in request.args.get("algorithms", "random_forest").split(",") if a.strip()]
+    n_candidates = min(request.args.get("candidates", default=16, type=int), 128)
+    apply = request.args.get("apply", "1") != "0"
+
+    if not ticker:
+        return {"error": "Missing ticker parameter"}, 400
+
+    if not INTERVAL_MAP.get(interval_str):
+        return {"error": "Invalid interval provided."}, 400
+
+    try:
+        # The tuning module pulls in most of scikit-learn, so it's only imported once a valid search is asked for
+        from app.ml.tuning import ALGORITHMS, TunedPredictorFactory, hyperparameter_search
+
+        invalid = [a for a in algorithms if a not in ALGORITHMS]
+        if invalid or not algorithms:
+            return {"error": f"Invalid algorithm. Use one of: {', '.join(ALGORITHMS)}"}, 400
+
+        history = fetch_history(ticker, interval_str, n_bars)
+
+        if history is None or history.empty:
+            return {"error": "No data found for that ticker"}, 404
+
+        result = hyperparameter_search.run(ticker, interval_str, data_fingerprint(history), history,
+                                           algorithms=algorithms, n_candidates=n_candidates)
+
+        if result is None:
+            return {"error": "Insufficient data to tune model"}, 200
+
+        if apply:
+            best = result["best"]
+            model_registry.set_factory(ticker, interval_str, TunedPredictorFactory(best["algorithm"], best["params"]))
+        result["applied"] = apply
+
+        return jsonify(result)
+
+    except Exception as e:
+        return {"error": str(e)}, 500
+
 @app.route("/api/features", methods=["GET"])
 def get_all_features():
-    """Get all available features for the ML model"""
+    """Get the ML model's features (or every registered one with ?all=1) with registry metadata"""
     try:
-        feature_columns = stock_predictor.get_feature_columns()
-        
-        # Create feature objects with metadata
-        features = []
-        for feature_name in feature_columns:
-            features.append({
-                'name': feature_name,
-                'description': f'Technical indicator: {feature_name}',
-                'category': 'technical_analysis'
-            })
-        
+        if request.args.get("all") == "1":
+            feature_columns = feature_registry.names()
+        else:
+            feature_columns = get_stock_predictor().get_feature_columns()
+
+        features = feature_registry.describe(feature_columns)
+        for feature in features:
+            feature["model_feature"] = feature["name"] in get_stock_predictor().get_feature_columns()
+
         return jsonify({
             "features": features,
             "total_count": len(features)
@@ -182,7 +509,128 @@ def get_all_features():
     except Exception as e:
         return {"error": str(e)}, 500
 
+@app.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    """Per-stage and per-endpoint latency histograms in Prometheus text format"""
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/api/tv/pool", methods=["GET"])
+def get_tv_pool_stats():
+    """Report TradingView session pool usage"""
+    return jsonify(tv_pool.stats())
+
+@app.route("/api/bars/cache", methods=["GET"])
+def get_bar_cache_stats():
+    """Report OHLCV bar cache usage"""
+    return jsonify(bar_cache.stats())
+
+@app.route("/api/bars/store", methods=["GET"])
+def get_bar_store_stats():
+    """Report what the local long-history bar store holds"""
+    return jsonify(bar_store.stats())
+
+@app.route("/api/singleflight", methods=["GET"])
+def get_single_flight_stats():
+    """Report how many requests led an upstream call versus joined one already in flight"""
+    return jsonify(single_flight.stats())
+
+@app.route("/api/models/registry", methods=["GET"])
+def get_model_registry_stats():
+    """Report fitted model registry usage"""
+    return jsonify(model_registry.stats())
+
+def _stream_source():
+    """Fetch function and clock for the bar stream: TradingView via the bar cache, or the fake source"""
+    if STREAM_FAKE_SPEED > 0:
+        source = FakeBarSource(speed=STREAM_FAKE_SPEED)
+        return source.fetch, source.now
+    return fetch_bars, time.time
+
+_stream_fetch, _stream_clock = _stream_source()
+
+# One poller shared by every /api/stream subscriber; predictions come from the same registry as /api/predict
+bar_stream = BarStreamHub(
+    fetch=_stream_fetch,
+    predictor_for=lambda ticker, interval_str, records: model_registry.get_or_train(ticker, interval_str, records),
+    seed_bars=STREAM_SEED_BARS,
+    poll_interval=STREAM_POLL_SECONDS,
+    max_queue=STREAM_QUEUE_SIZE,
+    replay=STREAM_REPLAY_BARS,
+    clock=_stream_clock,
+)
+
+@app.route("/api/stream", methods=["GET"])
+def stream_bars():
+    """Server-Sent Events: every newly closed bar for a ticker+interval with the model's prediction for it.
+
+    The first event is the latest closed bar. After that each event carries
+    only the new bar. Reconnecting with a Last-Event-ID header (browsers'
+    EventSource does this automatically) replays the bars missed meanwhile.
+    """
+    ticker = request.args.get("ticker")
+    interval_str = request.args.get("interval", "1m")
+    last_event_id = request.headers.get("Last-Event-ID", request.args.get("last_event_id"))
+
+    if not ticker:
+        return {"error": "Missing ticker parameter"}, 400
+
+    if not INTERVAL_MAP.get(interval_str):
+        return {"error": "Invalid interval provided."}, 400
+
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return {"error": "Invalid Last-Event-ID"}, 400
+
+    try:
+        subscriber = bar_stream.subscribe(ticker, interval_str, last_event_id)
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+    if subscriber is None:
+        return {"error": "No data found for that ticker"}, 404
+
+    return Response(sse_events(bar_stream, subscriber, STREAM_HEARTBEAT_SECONDS), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/api/stream/stats", methods=["GET"])
+def get_stream_stats():
+    """Report live bar stream feeds, subscribers and slow-client disconnects"""
+    return jsonify(bar_stream.stats())
+
+def warm_up():
+    """Load the lazily-imported dependencies and shared analyzers before the first request.
+
+    Heavy imports are deferred so a worker boots fast; call this at deploy
+    time (serve.py --warm-up / WARM_UP=1) to pay for them before taking
+    traffic instead. Returns the seconds spent on each step.
+    """
+    def load_models():
+        # Building the predictor imports scikit-learn; the rest is what backtests and searches use
+        get_stock_predictor()
+        import app.ml.fast_forest  # noqa: F401
+        import app.ml.tuning  # noqa: F401
+
+    steps = {
+        # No-op with the fake feed, which doesn't need tvDatafeed
+        "tvdatafeed": lambda: tv_interval("1d"),
+        "sentiment": lambda: get_sentiment_analyzer().backend.score("Shares rose after strong earnings"),
+        "models": load_models,
+    }
+    timings = {}
+    for name, step in steps.items():
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            print(f"Error warming up {name}: {e}")
+        timings[name] = time.perf_counter() - started
+        metrics.observe(f"warm_up_{name}", timings[name])
+    return timings
+
 if __name__ == "__main__":
+    from app.api.news_api import news_refresher
+    news_refresher.start()
     app.run(debug=True)
 
     # Debug: Print a sample output from the /api/stock endpoint see datetime formatt
@@ -0,0 +1,224 @@
+# ml/backtest.py
+"""Walk-forward backtesting for StockMovementPredictor.
+
+Indicators and labels are computed once per ticker; every fold then
+slices rows out of the same feature matrix and fits a fresh scaler + model
+on its training window. Folds (of one ticker or of many) run in parallel
+through joblib, which memory-maps the shared arrays into the workers.
+
+Each test window is scored with classification metrics and with a simple
+signal strategy: long after a Bullish prediction, short after a Bearish
+one, flat otherwise, rebalanced every bar at the close.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+from sklearn.preprocessing import StandardScaler
+
+from ..api.bar_cache import DAY_SECONDS, INTERVAL_SECONDS
+from .model import StockMovementPredictor
+
+SIGNAL_POSITIONS = {'Bullish': 1.0, 'Bearish': -1.0, 'Neutral': 0.0}
+
+# US equity session: 252 trading days a year of 6.5 hours each
+TRADING_DAYS_PER_YEAR = 252
+TRADING_SECONDS_PER_DAY = 6.5 * 3600
+
+
+def periods_per_year(interval: str) -> float:
+    """Bars per year for an API interval key, used to annualize the Sharpe ratio"""
+    seconds = INTERVAL_SECONDS[interval]
+    if seconds < DAY_SECONDS:
+        # Intraday bars only cover the trading session (e.g. 78 five-minute bars a day)
+        return TRADING_DAYS_PER_YEAR * TRADING_SECONDS_PER_DAY / seconds
+    if seconds == DAY_SECONDS:
+        return float(TRADING_DAYS_PER_YEAR)
+    return 365.25 * DAY_SECONDS / seconds
+
+
+def build_dataset(data: List[Dict], lookahead: int = 5,
+                  predictor: StockMovementPredictor = None) -> Optional[Dict[str, np.ndarray]]:
+    """Compute the feature matrix, labels and bar returns for a whole history in one pass.
+
+    Rows whose features are incomplete (indicator warm-up) or whose label
+    would look past the last bar are dropped. Returns None if nothing is left.
+    """
+    predictor = predictor or StockMovementPredictor()
+    df, X, y, keep = predictor.create_training_set(data, lookahead)
+    if not len(X):
+        return None
+
+    close = df['close'].to_numpy(dtype=np.float64)
+    # Return earned by holding from this bar's close to the next one's
+    next_return = np.append(close[1:] / close[:-1] - 1, np.nan)
+
+    times = df['time'].to_numpy() if 'time' in df.columns else np.arange(len(df))
+    return {
+        'X': np.ascontiguousarray(X),
+        'y': y,
+        'next_return': np.nan_to_num(next_return[keep]),
+        'time': times[keep],
+        'feature_columns': predictor.get_feature_columns(),
+    }
+
+
+def walk_forward_splits(n_rows: int, train_size: int, test_size: int, step: int = None,
+                        expanding: bool = False, gap: int = 0) -> List[Dict[str, int]]:
+    """Return train/test row ranges for a rolling (or expanding) walk-forward.
+
+    `gap` rows are skipped between each training window and its test window
+    so training labels never look into the test period. `step` may not be
+    smaller than `test_size`: overlapping test windows would count the same
+    bars' returns more than once.
+    """
+    step = step or test_size
+    if step < test_size:
+        raise ValueError("step must be at least test_size so test windows don't overlap")
+    splits = []
+    train_start, train_end = 0, train_size
+    while train_end + gap + test_size <= n_rows:
+        test_start = train_end + gap
+        splits.append({
+            'train_start': train_start,
+            'train_end': train_end,
+            'test_start': test_start,
+            'test_end': test_start + test_size,
+        })
+        train_end += step
+        if not expanding:
+            train_start += step
+    return splits
+
+
+def signal_positions(predictions: np.ndarray) -> np.ndarray:
+    return np.array([SIGNAL_POSITIONS.get(p, 0.0) for p in predictions])
+
+
+def strategy_returns(positions: np.ndarray, next_return: np.ndarray, cost_bps: float = 0.0) -> np.ndarray:
+    """Per-bar returns of holding `positions`, net of costs on every change of position"""
+    turnover = np.abs(np.diff(positions, prepend=0.0))
+    return positions * next_return - turnover * cost_bps / 10000.0
+
+
+def _return_stats(returns: np.ndarray, next_return: np.ndarray, periods_per_year: float) -> Dict:
+    equity = np.cumprod(1 + returns)
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    std = returns.std()
+    return {
+        'total_return': float(equity[-1] - 1) if len(equity) else 0.0,
+        'buy_and_hold_return': float(np.prod(1 + next_return) - 1),
+        'sharpe': float(returns.mean() / std * np.sqrt(periods_per_year)) if std > 0 else 0.0,
+        'max_drawdown': float(drawdown.min()) if len(drawdown) else 0.0,
+    }
+
+
+def signal_pnl(predictions: np.ndarray, next_return: np.ndarray, cost_bps: float = 0.0,
+               periods_per_year: float = TRADING_DAYS_PER_YEAR) -> Dict:
+    """Simulate the Bullish/Bearish/Neutral signals as positions and summarize the P&L"""
+    positions = signal_positions(predictions)
+    returns = strategy_returns(positions, next_return, cost_bps)
+    active = positions != 0
+
+    return {
+        **_return_stats(returns, next_return, periods_per_year),
+        'trades': int(np.count_nonzero(np.diff(positions, prepend=0.0))),
+        'exposure': float(active.mean()) if len(active) else 0.0,
+        'hit_rate': float((returns[active] > 0).mean()) if active.any() else 0.0,
+    }
+
+
+def _run_fold(dataset: Dict, split: Dict[str, int], model, cost_bps: float,
+              periods_per_year: float) -> Tuple[np.ndarray, Dict]:
+    X, y = dataset['X'], dataset['y']
+    train = slice(split['train_start'], split['train_end'])
+    test = slice(split['test_start'], split['test_end'])
+
+    scaler = StandardScaler()
+    model = clone(model)
+    model.fit(scaler.fit_transform(X[train]), y[train])
+    y_pred = model.predict(scaler.transform(X[test]))
+    y_test = y[test]
+
+    times = dataset['time']
+    # The predictions come back too, so the summary can score all test windows as one series
+    return y_pred, {
+        **split,
+        'train_from': times[split['train_start']].item(),
+        'train_to': times[split['train_end'] - 1].item(),
+        'test_from': times[split['test_start']].item(),
+        'test_to': times[split['test_end'] - 1].item(),
+        'accuracy': float(accuracy_score(y_test, y_pred)),
+        'precision': float(precision_score(y_test, y_pred, average='weighted', zero_division=0)),
+        'recall': float(recall_score(y_test, y_pred, average='weighted', zero_division=0)),
+        'f1': float(f1_score(y_test, y_pred, average='weighted', zero_division=0)),
+        'pnl': signal_pnl(y_pred, dataset['next_return'][test], cost_bps, periods_per_year),
+    }
+
+
+def _summarize(folds: List[Dict], predictions: List[np.ndarray], next_return: np.ndarray, cost_bps: float,
+               periods_per_year: float) -> Dict:
+    """Score the out-of-sample predictions of every fold as one continuous strategy"""
+    if not folds:
+        return {'folds': 0}
+    # Test windows never overlap, so concatenating them counts every bar once
+    positions = signal_positions(np.concatenate(predictions))
+    tested = np.concatenate([next_return[fold['test_start']:fold['test_end']] for fold in folds])
+    return {
+        'folds': len(folds),
+        'accuracy': float(np.mean([fold['accuracy'] for fold in folds])),
+        'f1': float(np.mean([fold['f1'] for fold in folds])),
+        **_return_stats(strategy_returns(positions, tested, cost_bps), tested, periods_per_year),
+        'trades': int(sum(fold['pnl']['trades'] for fold in folds)),
+    }
+
+
+def backtest_many(histories: Dict[str, List[Dict]], train_size: int = 250, test_size: int = 20,
+                  step: int = None, expanding: bool = False, lookahead: int = 5, cost_bps: float = 0.0,
+                  periods_per_year: float = TRADING_DAYS_PER_YEAR, n_jobs: int = -1,
+                  model_factory: Callable = None) -> Dict[str, Dict]:
+    """Walk-forward backtest several tickers, running every (ticker, fold) pair in one parallel pool.
+
+    Returns {ticker: {'folds': [...], 'summary': {...}}}; tickers without
+    enough rows for a single fold get an 'error' entry instead. Pass
+    periods_per_year(interval) for bars other than daily.
+    """
+    template = StockMovementPredictor()
+    # One core per fit; the parallelism comes from running folds side by side
+    model = model_factory() if model_factory else clone(template.model).set_params(n_jobs=1)
+
+    results, tasks, datasets = {}, [], {}
+    for ticker, data in histories.items():
+        dataset = build_dataset(data, lookahead, template)
+        splits = walk_forward_splits(len(dataset['X']), train_size, test_size, step, expanding,
+                                     gap=lookahead) if dataset else []
+        if not splits:
+            results[ticker] = {'error': 'Insufficient data for a walk-forward fold', 'folds': []}
+            continue
+        results[ticker] = {'folds': []}
+        datasets[ticker] = dataset
+        tasks.extend((ticker, dataset, split) for split in splits)
+
+    fold_results = Parallel(n_jobs=n_jobs)(
+        delayed(_run_fold)(dataset, split, model, cost_bps, periods_per_year)
+        for _, dataset, split in tasks
+    )
+    predictions = {ticker: [] for ticker in results}
+    for (ticker, _, _), (y_pred, fold) in zip(tasks, fold_results):
+        results[ticker]['folds'].append(fold)
+        predictions[ticker].append(y_pred)
+
+    for ticker, result in results.items():
+        for index, fold in enumerate(result['folds']):
+            fold['fold'] = index
+        next_return = datasets[ticker]['next_return'] if ticker in datasets else None
+        result['summary'] = _summarize(result['folds'], predictions[ticker], next_return, cost_bps, periods_per_year)
+    return results
+
+
+def backtest(data: List[Dict], **kwargs) -> Dict:
+    """Walk-forward backtest one ticker's bar history; see backtest_many for the options"""
+    return backtest_many({'_': data}, **kwargs)['_']
@@ -0,0 +1,303 @@
+# ml/feature_registry.py
+"""Registry of technical indicators and the intermediates they are built from.
+
+Every feature declares the columns it reads (raw OHLCV fields or other
+features) and how many earlier bars of those inputs it looks back over.
+Asking for a subset of features computes just that subset plus its
+dependencies, in dependency order, with shared intermediates (e.g.
+`sma_20`, which is also the Bollinger middle band) computed once.
+
+Formulas work on anything pandas can roll column-wise: a Series of one
+symbol's bars or a (bars x symbols) DataFrame panel.
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Tuple
+
+RAW_INPUTS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class Feature:
+    def __init__(self, name: str, func: Callable, inputs: Tuple[str, ...], lookback: int = 0,
+                 description: str = '', category: str = 'technical_analysis',
+                 integer: bool = False, public: bool = True):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        # Earlier bars of the inputs each value depends on (e.g. 19 for a 20-bar window)
+        self.lookback = lookback
+        self.description = description
+        self.category = category
+        # Stored as 0/1 integers in per-symbol frames
+        self.integer = integer
+        # Intermediates are computed on demand but not listed as features
+        self.public = public
+
+
+class FeatureRegistry:
+    def __init__(self):
+        self._features: "OrderedDict[str, Feature]" = OrderedDict()
+
+    def register(self, name: str, inputs: Iterable[str], lookback: int = 0, description: str = '',
+                 category: str = 'technical_analysis', integer: bool = False, public: bool = True):
+        """Decorator registering func(*inputs) as the formula for `name`"""
+        def decorator(func: Callable) -> Callable:
+            inputs_ = tuple(inputs)
+            unknown = [i for i in inputs_ if i not in RAW_INPUTS and i not in self._features]
+            if unknown:
+                raise ValueError(f"Feature '{name}' depends on unregistered inputs: {', '.join(unknown)}")
+            self._features[name] = Feature(name, func, inputs_, lookback, description, category, integer, public)
+            return func
+        return decorator
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._features
+
+    def __getitem__(self, name: str) -> Feature:
+        return self._features[name]
+
+    def names(self, include_intermediates: bool = False) -> List[str]:
+        """Feature names in registration order"""
+        return [name for name, feature in self._features.items() if include_intermediates or feature.public]
+
+    def integer_features(self) -> Tuple[str, ...]:
+        return tuple(name for name, feature in self._features.items() if feature.integer)
+
+    def resolve(self, names: Iterable[str]) -> List[str]:
+        """Return `names` plus everything they depend on, each after its inputs"""
+        order, seen = [], set()
+
+        def visit(name: str):
+            if name in seen or name in RAW_INPUTS:
+                return
+            if name not in self._features:
+                raise KeyError(f"Unknown feature '{name}'")
+            seen.add(name)
+            for dependency in self._features[name].inputs:
+                visit(dependency)
+            order.append(name)
+
+        for name in names:
+            visit(name)
+        return order
+
+    def warmup(self, name: str) -> int:
+        """Bars before the first fully-formed value of `name` (the sum of lookbacks along its deepest chain)"""
+        if name in RAW_INPUTS:
+            return 0
+        feature = self._features[name]
+        return feature.lookback + max((self.warmup(i) for i in feature.inputs), default=0)
+
+    def compute(self, inputs: Dict, names: Iterable[str] = None) -> Dict:
+        """Compute the requested features (default: every public one) from raw OHLCV columns.
+
+        Returns an ordered dict with exactly the requested names. Rows inside
+        a feature's warm-up are NaN, so values from a partial window (e.g. an
+        EMA that has not settled yet) never reach training or inference.
+        """
+        names = list(names) if names is not None else self.names()
+        values = dict(inputs)
+        for name in self.resolve(names):
+            feature = self._features[name]
+            values[name] = feature.func(*(values[i] for i in feature.inputs))
+        # Counted per column, so a left-padded panel symbol warms up from its own first bar
+        bars_seen = inputs['close'].notna().cumsum()
+        result = {}
+        for name in names:
+            warmup = self.warmup(name)
+            # 0/1 flags stay integers; their one-bar lookback only reaches the previous close
+            if warmup and not self._features[name].integer:
+                result[name] = values[name].where(bars_seen > warmup)
+            else:
+                result[name] = values[name]
+        return result
+
+    def describe(self, names: Iterable[str] = None) -> List[Dict]:
+        """Metadata for each feature, as served by /api/features"""
+        names = list(names) if names is not None else self.names()
+        return [{
+            'name': name,
+            'description': self._features[name].description,
+            'category': self._features[name].category,
+            'inputs': list(self._features[name].inputs),
+            'dependencies': [d for d in self.resolve([name]) if d != name],
+            'lookback': self._features[name].lookback,
+            'warmup': self.warmup(name),
+        } for name in names]
+
+
+feature_registry = FeatureRegistry()
+register = feature_registry.register
+
+
+# Price-based features
+@register('price_change', ['close'], 1, 'Close-to-close return over 1 bar', 'price')
+def _price_change(close):
+    return close.pct_change()
+
+
+@register('price_change_5', ['close'], 5, 'Close-to-close return over 5 bars', 'price')
+def _price_change_5(close):
+    return close.pct_change(5)
+
+
+@register('price_change_10', ['close'], 10, 'Close-to-close return over 10 bars', 'price')
+def _price_change_10(close):
+    return close.pct_change(10)
+
+
+# Open-Close relationship features
+@register('open_close_ratio', ['open', 'close'], 0, 'Open divided by close', 'price_action')
+def _open_close_ratio(open_, close):
+    return open_ / close
+
+
+@register('body_size', ['open', 'close'], 0, 'Candle body size relative to the open', 'price_action')
+def _body_size(open_, close):
+    return abs(close - open_) / open_
+
+
+@register('gap_up', ['open', 'close'], 1, '1 if the bar opened above the previous close', 'price_action', integer=True)
+def _gap_up(open_, close):
+    return (open_ > close.shift(1)).astype(int)
+
+
+@register('gap_down', ['open', 'close'], 1, '1 if the bar opened below the previous close', 'price_action', integer=True)
+def _gap_down(open_, close):
+    return (open_ < close.shift(1)).astype(int)
+
+
+# Volatility
+@register('volatility', ['price_change'], 9, 'Standard deviation of 1-bar returns over 10 bars', 'volatility')
+def _volatility(price_change):
+    return price_change.rolling(10).std()
+
+
+# Moving averages
+@register('sma_5', ['close'], 4, '5-bar simple moving average of close', 'trend')
+def _sma_5(close):
+    return close.rolling(5).mean()
+
+
+@register('sma_10', ['close'], 9, '10-bar simple moving average of close', 'trend')
+def _sma_10(close):
+    return close.rolling(10).mean()
+
+
+@register('sma_20', ['close'], 19, '20-bar simple moving average of close', 'trend')
+def _sma_20(close):
+    return close.rolling(20).mean()
+
+
+# Price vs moving averages
+@register('price_vs_sma5', ['close', 'sma_5'], 0, 'Distance of close from its 5-bar SMA, relative', 'trend')
+def _price_vs_sma5(close, sma_5):
+    return (close - sma_5) / sma_5
+
+
+@register('price_vs_sma10', ['close', 'sma_10'], 0, 'Distance of close from its 10-bar SMA, relative', 'trend')
+def _price_vs_sma10(close, sma_10):
+    return (close - sma_10) / sma_10
+
+
+@register('price_vs_sma20', ['close', 'sma_20'], 0, 'Distance of close from its 20-bar SMA, relative', 'trend')
+def _price_vs_sma20(close, sma_20):
+    return (close - sma_20) / sma_20
+
+
+# RSI
+@register('delta', ['close'], 1, 'Close-to-close change', 'momentum', public=False)
+def _delta(close):
+    return close.diff()
+
+
+@register('rsi_gain', ['close', 'delta'], 13, 'Average gain over 14 bars', 'momentum', public=False)
+def _rsi_gain(close, delta):
+    # NaN deltas count as zero moves, except in the NaN padding ahead of a panel symbol's first bar
+    started = close.ffill().notna()
+    return (delta.where(delta > 0, 0)).where(started).rolling(14).mean()
+
+
+@register('rsi_loss', ['close', 'delta'], 13, 'Average loss over 14 bars', 'momentum', public=False)
+def _rsi_loss(close, delta):
+    started = close.ffill().notna()
+    return (-delta.where(delta < 0, 0)).where(started).rolling(14).mean()
+
+
+@register('rsi', ['rsi_gain', 'rsi_loss'], 0, '14-bar Relative Strength Index (0-100)', 'momentum')
+def _rsi(gain, loss):
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+# MACD (EMAs have no hard window; the lookback is the span they need to settle)
+@register('ema_12', ['close'], 12, '12-bar exponential moving average of close', 'trend', public=False)
+def _ema_12(close):
+    return close.ewm(span=12).mean()
+
+
+@register('ema_26', ['close'], 26, '26-bar exponential moving average of close', 'trend', public=False)
+def _ema_26(close):
+    return close.ewm(span=26).mean()
+
+
+@register('macd', ['ema_12', 'ema_26'], 0, 'MACD line: 12-bar EMA minus 26-bar EMA', 'momentum')
+def _macd(ema_12, ema_26):
+    return ema_12 - ema_26
+
+
+@register('macd_signal', ['macd'], 9, '9-bar EMA of the MACD line', 'momentum')
+def _macd_signal(macd):
+    return macd.ewm(span=9).mean()
+
+
+@register('macd_histogram', ['macd', 'macd_signal'], 0, 'MACD line minus its signal line', 'momentum')
+def _macd_histogram(macd, macd_signal):
+    return macd - macd_signal
+
+
+# Volume indicators
+@register('volume_sma', ['volume'], 9, '10-bar simple moving average of volume', 'volume')
+def _volume_sma(volume):
+    return volume.rolling(10).mean()
+
+
+@register('volume_ratio', ['volume', 'volume_sma'], 0, 'Volume relative to its 10-bar average', 'volume')
+def _volume_ratio(volume, volume_sma):
+    return volume / volume_sma
+
+
+# Bollinger Bands (the middle band is the 20-bar SMA, computed once and shared)
+@register('bb_middle', ['sma_20'], 0, 'Bollinger middle band (20-bar SMA)', 'volatility')
+def _bb_middle(sma_20):
+    return sma_20
+
+
+@register('bb_std', ['close'], 19, '20-bar standard deviation of close', 'volatility', public=False)
+def _bb_std(close):
+    return close.rolling(20).std()
+
+
+@register('bb_upper', ['bb_middle', 'bb_std'], 0, 'Bollinger upper band (middle + 2 std)', 'volatility')
+def _bb_upper(bb_middle, bb_std):
+    return bb_middle + (bb_std * 2)
+
+
+@register('bb_lower', ['bb_middle', 'bb_std'], 0, 'Bollinger lower band (middle - 2 std)', 'volatility')
+def _bb_lower(bb_middle, bb_std):
+    return bb_middle - (bb_std * 2)
+
+
+@register('bb_position', ['close', 'bb_lower', 'bb_upper'], 0, 'Position of close within the Bollinger bands (0-1)', 'volatility')
+def _bb_position(close, bb_lower, bb_upper):
+    return (close - bb_lower) / (bb_upper - bb_lower)
+
+
+# Features the movement model trains on by default
+DEFAULT_MODEL_FEATURES = [
+    'price_change', 'price_change_5', 'price_change_10',
+    'open_close_ratio', 'body_size', 'gap_up', 'gap_down',
+    'volatility', 'price_vs_sma5', 'price_vs_sma10', 'price_vs_sma20',
+    'rsi', 'macd', 'macd_signal', 'macd_histogram',
+    'volume_ratio', 'bb_position'
+]
@@ -0,0 +1,96 @@
+# ml/features.py
+"""Indicator computation shared by the single-symbol and panel paths.
+
+`compute_indicators` works on anything pandas can roll column-wise: a
+Series of one symbol's bars, or a 2-D DataFrame holding many symbols side
+by side (bars x symbols). Both paths run the same pandas kernels, so a
+panel computation is bit-for-bit identical to computing each symbol on
+its own. The formulas themselves live in feature_registry.
+"""
+
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from ..api.metrics import metrics
+from .feature_registry import feature_registry
+
+PRICE_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+# Indicators stored as 0/1 integers in the per-symbol frame
+INTEGER_FEATURES = feature_registry.integer_features()
+
+Frame = Union[pd.Series, pd.DataFrame]
+
+
+def compute_indicators(open_: Frame, high: Frame, low: Frame, close: Frame, volume: Frame,
+                       columns: List[str] = None) -> Dict[str, Frame]:
+    """Return the requested indicator columns (default: all, in registry order).
+
+    Only the requested columns and the intermediates they depend on are computed.
+    """
+    inputs = {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}
+    return feature_registry.compute(inputs, columns)
+
+
+def stack_panel(histories: Dict[str, Union[pd.DataFrame, List[Dict]]]) -> Tuple[Dict[str, np.ndarray], List[str], np.ndarray]:
+    """Stack per-symbol OHLCV histories into contiguous (bars x symbols) float64 arrays.
+
+    Shorter histories are left-padded with NaN so every symbol's last bar
+    lands on the last row. Returns (panel, symbols, lengths).
+    """
+    symbols = list(histories)
+    columns = [pd.DataFrame(histories[s]) if not isinstance(histories[s], pd.DataFrame) else histories[s]
+               for s in symbols]
+    lengths = np.array([len(frame) for frame in columns], dtype=np.int64)
+    n_rows = int(lengths.max()) if len(lengths) else 0
+
+    panel = {}
+    for field in PRICE_FIELDS:
+        values = np.full((n_rows, len(symbols)), np.nan)
+        for j, frame in enumerate(columns):
+            if lengths[j]:
+                values[n_rows - lengths[j]:, j] = pd.to_numeric(frame[field]).to_numpy(dtype=np.float64)
+        panel[field] = values
+    return panel, symbols, lengths
+
+
+@metrics.timed('indicators')
+def compute_panel_features(panel: Dict[str, np.ndarray], columns: List[str] = None) -> Dict[str, np.ndarray]:
+    """Compute indicators for a whole panel in one vectorized pass.
+
+    `panel` maps each of open/high/low/close/volume to a (bars x symbols)
+    array. Returns a dict of (bars x symbols) float64 arrays, restricted to
+    (and only computing) `columns` when given.
+    """
+    frames = [pd.DataFrame(panel[field], copy=False) for field in PRICE_FIELDS]
+    indicators = compute_indicators(*frames, columns=columns)
+    return {name: values.to_numpy(dtype=np.float64) for name, values in indicators.items()}
+
+
+def unstack_features(panel: Dict[str, np.ndarray], features: Dict[str, np.ndarray],
+                     symbols: List[str], lengths: np.ndarray) -> Dict[str, pd.DataFrame]:
+    """Split panel output back into per-symbol frames shaped like calculate_technical_indicators"""
+    n_rows = next(iter(panel.values())).shape[0] if panel else 0
+    frames = {}
+    for j, symbol in enumerate(symbols):
+        start = n_rows - int(lengths[j])
+        data = {field: panel[field][start:, j] for field in PRICE_FIELDS}
+        for name, values in features.items():
+            column = values[start:, j]
+            data[name] = column.astype(int) if name in INTEGER_FEATURES else column
+        frames[symbol] = pd.DataFrame(data)
+    return frames
+
+
+def latest_feature_rows(histories: Dict[str, Union[pd.DataFrame, List[Dict]]],
+                        columns: List[str] = None) -> Dict[str, Dict[str, float]]:
+    """Compute features for many symbols in one panel pass and return each symbol's newest row"""
+    if not histories:
+        return {}
+    panel, symbols, _ = stack_panel(histories)
+    features = compute_panel_features(panel, columns)
+    # Histories are right-aligned, so every symbol's newest bar is on the last row
+    return {symbol: {name: float(values[-1, j]) for name, values in features.items()}
+            for j, symbol in enumerate(symbols)}
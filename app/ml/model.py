@@ -1,30 +1,62 @@
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
-from typing import Dict, List, Tuple
-from sklearn.metrics import classification_report, accuracy_score, precision_score, recall_score, f1_score
+from typing import Dict, List, Tuple, Union
 from collections import Counter
+import os
+import threading
+
+# scikit-learn (~1s to import) is imported where it's used, so importing this module stays cheap
+from ..api.metrics import metrics
+from .feature_registry import DEFAULT_MODEL_FEATURES, feature_registry
+from .features import compute_indicators
+from .sentiment_backends import make_backend
+from .sentiment_cache import SentimentCache
+
+# Set FAST_FOREST_DISABLED to always predict through sklearn instead of the flattened forest
+FAST_FOREST_ENABLED = not os.getenv("FAST_FOREST_DISABLED")
+
+# Bump whenever indicator formulas change so stored models trained on the old features are ignored
+FEATURE_SCHEMA_VERSION = 1
 
 class SentimentAnalyzer:
-    def __init__(self):
-        self.analyzer = SentimentIntensityAnalyzer()
+    def __init__(self, cache: SentimentCache = None, backend=None):
+        self.backend = backend if backend is not None else make_backend()
+        self.cache = cache if cache is not None else SentimentCache(
+            max_entries=int(os.getenv('SENTIMENT_CACHE_SIZE', '50000')),
+            namespace=self.backend.name,
+            path=os.getenv('SENTIMENT_CACHE_PATH') or None
+        )
+    
+    def set_backend(self, backend):
+        """Swap the scoring backend; scores cached from the previous one are dropped"""
+        self.backend = backend
+        self.cache.invalidate(backend.name)
     
     def analyze_sentiment(self, text: str) -> float:
-        """Analyze sentiment of a single text using VADER"""
+        """Analyze sentiment of a single text, reusing cached scores"""
         if not text:
             return 0.0
         
-        # Get sentiment scores
-        scores = self.analyzer.polarity_scores(text)
-        
-        # Return compound score (-1 to 1)
-        return scores['compound']
+        score = self.cache.get(text)
+        if score is None:
+            # Compound score (-1 to 1)
+            score = self.backend.score(text)
+            self.cache.put(text, score)
+        return score
     
+    @metrics.timed('sentiment')
     def analyze_batch(self, texts: list) -> list:
-        """Analyze sentiment of multiple texts"""
-        return [self.analyze_sentiment(text) for text in texts]
+        """Analyze sentiment of multiple texts, scoring only uncached ones in a single backend batch"""
+        scores = [0.0 if not text else self.cache.get(text) for text in texts]
+        
+        # Score each distinct uncached text once
+        missing = list(dict.fromkeys(text for text, score in zip(texts, scores) if score is None))
+        if missing:
+            fresh = dict(zip(missing, self.backend.score_batch(missing)))
+            for text, score in fresh.items():
+                self.cache.put(text, score)
+            scores = [fresh[text] if score is None else score for text, score in zip(texts, scores)]
+        return scores
     
     def get_sentiment_label(self, score: float) -> str:
         """Convert sentiment score to label"""
@@ -34,132 +66,137 @@ class SentimentAnalyzer:
             return "Negative"
         return "Neutral"
 
+# Class labels by code, as Python strings like the model has always been trained on
+_LABEL_NAMES = np.array(['Neutral', 'Bullish', 'Bearish'], dtype=object)
+
 class StockMovementPredictor:
-    def __init__(self):
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
+    # Bars ahead the Bullish/Bearish/Neutral label looks, and the returns over it that count as a move
+    LABEL_HORIZON = 5
+    BULLISH_THRESHOLD = 0.02
+    BEARISH_THRESHOLD = -0.02
+    # Training guards: bars in the history, and complete feature rows left after warm-up
+    MIN_HISTORY_BARS = 50
+    MIN_TRAINING_ROWS = 30
+
+    def __init__(self, model=None, feature_columns: List[str] = None, horizon: int = None,
+                 bullish_threshold: float = None, bearish_threshold: float = None):
+        # Any sklearn classifier with predict_proba (e.g. tuning.make_model(...)); defaults to a random forest
+        if model is None:
+            from sklearn.ensemble import RandomForestClassifier
+            model = RandomForestClassifier(n_estimators=100, random_state=42)
+        self.model = model
+        # Registry feature names the model trains on; only these (and their inputs) are computed
+        self.feature_columns = list(feature_columns or DEFAULT_MODEL_FEATURES)
+        self.horizon = self.LABEL_HORIZON if horizon is None else horizon
+        self.bullish_threshold = self.BULLISH_THRESHOLD if bullish_threshold is None else bullish_threshold
+        self.bearish_threshold = self.BEARISH_THRESHOLD if bearish_threshold is None else bearish_threshold
+        from sklearn.preprocessing import StandardScaler
         self.scaler = StandardScaler()
         self.is_trained = False
+        # Flattened copy of the fitted model + scaler, and the pair it was built from
+        self._flat_forest = None
+        self._flat_source = None
         
-    def calculate_technical_indicators(self, data: List[Dict]) -> pd.DataFrame:
-        """Calculate technical indicators from stock data"""
+    @metrics.timed('indicators')
+    def calculate_technical_indicators(self, data: Union[List[Dict], pd.DataFrame],
+                                       columns: List[str] = None) -> pd.DataFrame:
+        """Calculate technical indicators from stock data (every registered one unless `columns` is given)
+
+        `data` is a list of bar dicts or a frame of bar columns, e.g. a
+        memory-mapped bar_store.read_frame(); a frame is never modified or copied.
+        """
         if len(data) < 20:
             return pd.DataFrame()
             
-        df = pd.DataFrame(data)
-        df['open'] = pd.to_numeric(df['open'])
-        df['close'] = pd.to_numeric(df['close'])
-        df['high'] = pd.to_numeric(df['high'])
-        df['low'] = pd.to_numeric(df['low'])
-        df['volume'] = pd.to_numeric(df['volume'])
-        
-        # Price-based features
-        df['price_change'] = df['close'].pct_change()
-        df['price_change_5'] = df['close'].pct_change(5)
-        df['price_change_10'] = df['close'].pct_change(10)
+        if isinstance(data, pd.DataFrame):
+            # Shallow copy: indicator columns are added without touching the caller's frame
+            df = data.copy(deep=False)
+        else:
+            df = pd.DataFrame(data)
+        for column in ['open', 'close', 'high', 'low', 'volume']:
+            if not pd.api.types.is_numeric_dtype(df[column]):
+                df[column] = pd.to_numeric(df[column])
         
-        # Open-Close relationship features
-        df['open_close_ratio'] = df['open'] / df['close']
-        df['body_size'] = abs(df['close'] - df['open']) / df['open']
-        df['gap_up'] = (df['open'] > df['close'].shift(1)).astype(int)
-        df['gap_down'] = (df['open'] < df['close'].shift(1)).astype(int)
-        
-        # Volatility
-        df['volatility'] = df['price_change'].rolling(10).std()
-        
-        # Moving averages
-        df['sma_5'] = df['close'].rolling(5).mean()
-        df['sma_10'] = df['close'].rolling(10).mean()
-        df['sma_20'] = df['close'].rolling(20).mean()
-        
-        # Price vs moving averages
-        df['price_vs_sma5'] = (df['close'] - df['sma_5']) / df['sma_5']
-        df['price_vs_sma10'] = (df['close'] - df['sma_10']) / df['sma_10']
-        df['price_vs_sma20'] = (df['close'] - df['sma_20']) / df['sma_20']
-        
-        # RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
-        
-        # MACD
-        exp1 = df['close'].ewm(span=12).mean()
-        exp2 = df['close'].ewm(span=26).mean()
-        df['macd'] = exp1 - exp2
-        df['macd_signal'] = df['macd'].ewm(span=9).mean()
-        df['macd_histogram'] = df['macd'] - df['macd_signal']
-        
-        # Volume indicators
-        df['volume_sma'] = df['volume'].rolling(10).mean()
-        df['volume_ratio'] = df['volume'] / df['volume_sma']
-        
-        # Bollinger Bands
-        df['bb_middle'] = df['close'].rolling(20).mean()
-        bb_std = df['close'].rolling(20).std()
-        df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
-        df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
-        df['bb_position'] = (df['close'] - df['bb_lower']) / (df['bb_upper'] - df['bb_lower'])
+        indicators = compute_indicators(df['open'], df['high'], df['low'], df['close'], df['volume'], columns)
+        for name, values in indicators.items():
+            df[name] = values
         
         return df
     
-    def create_labels(self, data: List[Dict], lookahead: int = 5) -> Tuple[pd.DataFrame, List[str]]:
+    def warmup_bars(self) -> int:
+        """Leading bars without fully-formed values for the slowest of the model's features"""
+        return max((feature_registry.warmup(name) for name in self.get_feature_columns()), default=0)
+
+    def min_inference_bars(self) -> int:
+        """Fewest bars that give the latest bar a complete feature row"""
+        return max(20, self.warmup_bars() + 1)
+
+    def min_training_bars(self, lookahead: int = None) -> int:
+        """Fewest bars that pass every training guard: warm-up + label horizon + minimum rows"""
+        lookahead = self.horizon if lookahead is None else lookahead
+        return max(self.MIN_HISTORY_BARS, lookahead + 20,
+                   self.warmup_bars() + lookahead + self.MIN_TRAINING_ROWS)
+
+    def future_returns(self, df: pd.DataFrame, lookahead: int = None) -> np.ndarray:
+        """Return from each bar's close to the close `lookahead` bars later (NaN past the last bar)"""
+        lookahead = self.horizon if lookahead is None else lookahead
+        close = df['close'].to_numpy(dtype=np.float64)
+        return (df['close'].shift(-lookahead).to_numpy(dtype=np.float64) / close) - 1
+
+    def label_returns(self, future_returns: np.ndarray) -> np.ndarray:
+        """Map forward returns to Bullish/Bearish/Neutral labels (NaN returns are Neutral)"""
+        # Pick integer class codes first, then look the names up in one take (selecting strings is ~10x slower)
+        codes = np.select([future_returns > self.bullish_threshold, future_returns < self.bearish_threshold],
+                          [1, 2], default=0)
+        return _LABEL_NAMES.take(codes)
+
+    def create_labels(self, data: List[Dict], lookahead: int = None) -> Tuple[pd.DataFrame, np.ndarray]:
         """Create labels based on future price movement"""
-        df = self.calculate_technical_indicators(data)
+        lookahead = self.horizon if lookahead is None else lookahead
+        df = self.calculate_technical_indicators(data, self.get_feature_columns())
         
         if len(df) < lookahead + 20:
-            return pd.DataFrame(), []
-        
-        # Create labels based on future price movement
-        future_returns = df['close'].shift(-lookahead) / df['close'] - 1
+            return pd.DataFrame(), np.array([], dtype=object)
         
-        labels = []
-        for return_val in future_returns:
-            if pd.isna(return_val):
-                labels.append('Neutral')
-            elif return_val > 0.02:  # 2% gain
-                labels.append('Bullish')
-            elif return_val < -0.02:  # 2% loss
-                labels.append('Bearish')
-            else:
-                labels.append('Neutral')
-        
-        return df, labels
+        return df, self.label_returns(self.future_returns(df, lookahead))
+
+    def create_training_set(self, data: List[Dict], lookahead: int = None
+                            ) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray, np.ndarray]:
+        """Return (indicator frame, X, y, row mask) for the rows that can be trained on.
+
+        One mask keeps the rows whose features are complete (past the
+        indicator warm-up) and whose label is known (not within `lookahead`
+        bars of the end), so X and y are aligned by construction.
+        """
+        lookahead = self.horizon if lookahead is None else lookahead
+        feature_columns = self.get_feature_columns()
+        df, labels = self.create_labels(data, lookahead)
+        if df.empty:
+            return df, np.empty((0, len(feature_columns))), labels, np.zeros(0, dtype=bool)
+
+        X = df[feature_columns].to_numpy(dtype=np.float64)
+        mask = ~np.isnan(X).any(axis=1) & ~np.isnan(self.future_returns(df, lookahead))
+        return df, X[mask], labels[mask], mask
     
     def train_model(self, data: List[Dict]) -> bool:
         """Train the model on historical data"""
         try:
-            df, labels = self.create_labels(data)
+            df, X, y, _ = self.create_training_set(data)
             
-            if len(df) < 50 or len(labels) < 50:
+            if len(df) < self.MIN_HISTORY_BARS:
                 return False
             
-            # Select features for training
-            feature_columns = [
-                'price_change', 'price_change_5', 'price_change_10',
-                'open_close_ratio', 'body_size', 'gap_up', 'gap_down',
-                'volatility', 'price_vs_sma5', 'price_vs_sma10', 'price_vs_sma20',
-                'rsi', 'macd', 'macd_signal', 'macd_histogram',
-                'volume_ratio', 'bb_position'
-            ]
-            
-            # Remove rows with NaN values
-            df_clean = df[feature_columns + ['close']].dropna()
-            labels_clean = [labels[i] for i in df_clean.index if i < len(labels)]
-            
-            if len(df_clean) < 30:
+            if len(X) < self.MIN_TRAINING_ROWS:
                 return False
             
-            # Prepare training data
-            X = df_clean[feature_columns].values
-            y = labels_clean[:len(X)]
-            
             # Scale features
             X_scaled = self.scaler.fit_transform(X)
             
             # Train model
             self.model.fit(X_scaled, y)
             self.is_trained = True
+            # Refitting mutates the same model object, so drop the stale flattened copy explicitly
+            self._flat_source = None
             
             return True
             
@@ -169,7 +206,7 @@ class StockMovementPredictor:
     
     def predict_movement(self, data: List[Dict]) -> Dict:
         """Predict stock movement for the latest data point"""
-        if not self.is_trained or len(data) < 20:
+        if not self.is_trained or len(data) < self.min_inference_bars():
             return {
                 'prediction': 'Neutral',
                 'confidence': 0.0,
@@ -178,7 +215,7 @@ class StockMovementPredictor:
             }
         
         try:
-            df = self.calculate_technical_indicators(data)
+            df = self.calculate_technical_indicators(data, self.get_feature_columns())
             
             if len(df) == 0:
                 return {
@@ -189,32 +226,41 @@ class StockMovementPredictor:
                 }
             
             # Get latest data point
-            latest = df.iloc[-1:]
-            
-            feature_columns = [
-                'price_change', 'price_change_5', 'price_change_10',
-                'open_close_ratio', 'body_size', 'gap_up', 'gap_down',
-                'volatility', 'price_vs_sma5', 'price_vs_sma10', 'price_vs_sma20',
-                'rsi', 'macd', 'macd_signal', 'macd_histogram',
-                'volume_ratio', 'bb_position'
-            ]
-            
-            # Check if all features are available
-            missing_features = [col for col in feature_columns if col not in latest.columns or pd.isna(latest[col].iloc[0])]
-            if missing_features:
-                return {
-                    'prediction': 'Neutral',
-                    'confidence': 0.0,
-                    'probabilities': {'Bullish': 0.33, 'Bearish': 0.33, 'Neutral': 0.34},
-                    'features': []
-                }
-            
-            X = latest[feature_columns].values
-            X_scaled = self.scaler.transform(X)
+            latest = df.iloc[-1]
+            return self.predict_features({col: latest.get(col) for col in self.get_feature_columns()})
             
-            # Get prediction and probabilities
-            prediction = self.model.predict(X_scaled)[0]
-            probabilities = self.model.predict_proba(X_scaled)[0]
+        except Exception as e:
+            print(f"Error predicting movement: {e}")
+            return {
+                'prediction': 'Neutral',
+                'confidence': 0.0,
+                'probabilities': {'Bullish': 0.33, 'Bearish': 0.33, 'Neutral': 0.34},
+                'features': []
+            }
+    
+    def predict_features(self, feature_values: Dict) -> Dict:
+        """Predict stock movement from one bar's feature values (e.g. from an IndicatorState)"""
+        neutral = {
+            'prediction': 'Neutral',
+            'confidence': 0.0,
+            'probabilities': {'Bullish': 0.33, 'Bearish': 0.33, 'Neutral': 0.34},
+            'features': []
+        }
+        if not self.is_trained:
+            return neutral
+        
+        feature_columns = self.get_feature_columns()
+        
+        # Check if all features are available
+        missing_features = [col for col in feature_columns if pd.isna(feature_values.get(col))]
+        if missing_features:
+            return neutral
+        
+        try:
+            X = np.array([[feature_values[col] for col in feature_columns]], dtype=np.float64)
+            predictions, probability_rows = self.predict_batch(X)
+            prediction = predictions[0]
+            probabilities = probability_rows[0]
             
             # Map probabilities to labels
             classes = self.model.classes_
@@ -224,13 +270,7 @@ class StockMovementPredictor:
             confidence = float(max(probabilities))
             
             # Extract feature values for the latest data point
-            features = []
-            for i, col in enumerate(feature_columns):
-                if col in latest.columns and not pd.isna(latest[col].iloc[0]):
-                    features.append({
-                        'name': col,
-                        'value': float(latest[col].iloc[0])
-                    })
+            features = [{'name': col, 'value': float(feature_values[col])} for col in feature_columns]
             
             return {
                 'prediction': prediction,
@@ -241,56 +281,68 @@ class StockMovementPredictor:
             
         except Exception as e:
             print(f"Error predicting movement: {e}")
-            return {
-                'prediction': 'Neutral',
-                'confidence': 0.0,
-                'probabilities': {'Bullish': 0.33, 'Bearish': 0.33, 'Neutral': 0.34},
-                'features': []
-            }
+            return neutral
+    
+    @metrics.timed('predict')
+    def predict_batch(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Predict labels and class probabilities for a stacked feature matrix in one model call"""
+        from .fast_forest import MAX_BATCH_ROWS
+        forest = self.flat_forest()
+        if forest is not None and len(X) <= MAX_BATCH_ROWS and not np.isnan(X).any():
+            return forest.predict(X)
+
+        X_scaled = self.scaler.transform(X)
+        probabilities = self.model.predict_proba(X_scaled)
+        # Same tie-breaking as RandomForestClassifier.predict
+        predictions = self.model.classes_.take(np.argmax(probabilities, axis=1), axis=0)
+        return predictions, probabilities
     
+    def flat_forest(self):
+        """Return the fitted forest flattened for fast inference, or None if it can't be (or is disabled)"""
+        if not FAST_FOREST_ENABLED or not self.is_trained:
+            return None
+        # Rebuilt whenever the model or scaler is replaced (retraining, loading from the model store)
+        source = self._flat_source
+        if source is None or source[0] is not self.model or source[1] is not self.scaler:
+            from .fast_forest import FlatForest
+            self._flat_forest = FlatForest.from_sklearn(self.model, self.scaler)
+            self._flat_source = (self.model, self.scaler)
+        return self._flat_forest
+
     def get_feature_columns(self):
         """Return the list of feature columns used by the model"""
-        return [
-            'price_change', 'price_change_5', 'price_change_10',
-            'open_close_ratio', 'body_size', 'gap_up', 'gap_down',
-            'volatility', 'price_vs_sma5', 'price_vs_sma10', 'price_vs_sma20',
-            'rsi', 'macd', 'macd_signal', 'macd_histogram',
-            'volume_ratio', 'bb_position'
-        ]
-
-    def evaluate_model(self, data, test_size=0.2):
-        df, labels = self.create_labels(data)
-        feature_columns = self.get_feature_columns()
-        df_clean = df[feature_columns].dropna()
-        labels_clean = [labels[i] for i in df_clean.index if i < len(labels)]
-        if len(df_clean) < 30:
+        return list(self.feature_columns)
+
+    @metrics.timed('evaluation')
+    def evaluate_model(self, data, test_size=0.2, verbose=True):
+        """Score a copy of the model fitted on the older bars against the newest `test_size` share"""
+        from sklearn.base import clone
+        from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+        from sklearn.preprocessing import StandardScaler
+
+        _, X, y, _ = self.create_training_set(data)
+        if len(X) < 30:
             print('Not enough data to evaluate model.')
             return None
 
         # Split into train/test
-        split_idx = int(len(df_clean) * (1 - test_size))
-        X_train, X_test = df_clean.iloc[:split_idx], df_clean.iloc[split_idx:]
-        y_train, y_test = labels_clean[:split_idx], labels_clean[split_idx:]
+        split_idx = int(len(X) * (1 - test_size))
+        X_train, X_test = X[:split_idx], X[split_idx:]
+        y_train, y_test = y[:split_idx], y[split_idx:]
+
+        # Fit a separate model + scaler so evaluating never replaces the trained model
+        model = clone(self.model)
+        scaler = StandardScaler()
 
         # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
 
         # Train model
-        self.model.fit(X_train_scaled, y_train)
+        model.fit(X_train_scaled, y_train)
 
         # Predict
-        y_pred = self.model.predict(X_test_scaled)
-
-        # Print predictions vs actuals
-        print("\n=== PREDICTIONS vs ACTUALS (test set) ===")
-        for i in range(len(y_pred)):
-            print(f"Predicted: {y_pred[i]} | Actual: {y_test[i]}")
-        print(f"Total predictions: {len(y_pred)}")
-
-        # Print train and test label distribution
-        print("\nTrain label distribution:", Counter(y_train))
-        print("Test label distribution:", Counter(y_test))
+        y_pred = model.predict(X_test_scaled)
 
         # Metrics
         accuracy = accuracy_score(y_test, y_pred)
@@ -298,11 +350,15 @@ class StockMovementPredictor:
         recall = recall_score(y_test, y_pred, average='weighted', zero_division=0)
         f1 = f1_score(y_test, y_pred, average='weighted', zero_division=0)
 
-        print(f"\nModel Evaluation Metrics:")
-        print(f"  Accuracy:  {accuracy:.4f}")
-        print(f"  Precision: {precision:.4f}")
-        print(f"  Recall:    {recall:.4f}")
-        print(f"  F1 Score:  {f1:.4f}")
+        if verbose:
+            print(f"Test predictions: {len(y_pred)}")
+            print("Train label distribution:", Counter(y_train))
+            print("Test label distribution:", Counter(y_test))
+            print(f"\nModel Evaluation Metrics:")
+            print(f"  Accuracy:  {accuracy:.4f}")
+            print(f"  Precision: {precision:.4f}")
+            print(f"  Recall:    {recall:.4f}")
+            print(f"  F1 Score:  {f1:.4f}")
         return {
             'accuracy': accuracy,
             'precision': precision,
@@ -310,6 +366,34 @@ class StockMovementPredictor:
             'f1': f1
         }
 
-# Initialize the analyzers
-sentiment_analyzer = SentimentAnalyzer()
-stock_predictor = StockMovementPredictor()
+# Shared analyzers, built on first use: constructing them loads VADER's lexicon and scikit-learn,
+# which would otherwise be paid by every process at import time
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def _get_shared(name: str, factory):
+    instance = _shared.get(name)
+    if instance is None:
+        with _shared_lock:
+            instance = _shared.get(name)
+            if instance is None:
+                instance = _shared[name] = factory()
+    return instance
+
+
+def get_sentiment_analyzer() -> SentimentAnalyzer:
+    return _get_shared('sentiment_analyzer', SentimentAnalyzer)
+
+
+def get_stock_predictor() -> StockMovementPredictor:
+    return _get_shared('stock_predictor', StockMovementPredictor)
+
+
+def __getattr__(name):
+    # Keeps `from app.ml.model import stock_predictor` working; the instance is built at that import
+    if name == 'sentiment_analyzer':
+        return get_sentiment_analyzer()
+    if name == 'stock_predictor':
+        return get_stock_predictor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
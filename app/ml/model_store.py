@@ -0,0 +1,133 @@
+# ml/model_store.py
+"""Versioned on-disk store for fitted StockMovementPredictor artifacts.
+
+Layout:  <root>/<TICKER>/<interval>/v0001/{model.joblib, scaler.joblib, meta.json}
+
+Each version records the data fingerprint it was trained on and a hash of
+the feature schema, so artifacts built for a different feature list are
+ignored instead of producing garbage predictions. Arrays are loaded
+memory-mapped where joblib can do so.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .model import FEATURE_SCHEMA_VERSION, StockMovementPredictor
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "models")
+
+
+def feature_schema_hash(feature_columns: List[str]) -> str:
+    """Hash the feature list and schema version a model was trained against"""
+    payload = json.dumps({"features": list(feature_columns), "version": FEATURE_SCHEMA_VERSION})
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class ModelStore:
+    def __init__(self, root: str = DEFAULT_STORE_DIR, keep_versions: int = 3, mmap_mode: Optional[str] = "r"):
+        self.root = root
+        self.keep_versions = keep_versions
+        self.mmap_mode = mmap_mode
+        self._lock = threading.Lock()
+
+    def _model_dir(self, ticker: str, interval: str) -> str:
+        return os.path.join(self.root, ticker.upper(), interval)
+
+    def _versions(self, ticker: str, interval: str) -> List[str]:
+        """Return version directory names, newest first"""
+        model_dir = self._model_dir(ticker, interval)
+        if not os.path.isdir(model_dir):
+            return []
+        return sorted((name for name in os.listdir(model_dir) if name.startswith("v")), reverse=True)
+
+    def save(self, ticker: str, interval: str, fingerprint: str, predictor: StockMovementPredictor) -> str:
+        """Write a fitted predictor as a new version and return its directory"""
+        import joblib
+        import sklearn
+
+        model_dir = self._model_dir(ticker, interval)
+        os.makedirs(model_dir, exist_ok=True)
+        feature_columns = predictor.get_feature_columns()
+        meta = {
+            "ticker": ticker.upper(),
+            "interval": interval,
+            "fingerprint": fingerprint,
+            "feature_columns": feature_columns,
+            "schema_hash": feature_schema_hash(feature_columns),
+            "sklearn_version": sklearn.__version__,
+            "created_at": time.time(),
+        }
+
+        with self._lock:
+            versions = self._versions(ticker, interval)
+            next_version = int(versions[0][1:]) + 1 if versions else 1
+            version_dir = os.path.join(model_dir, f"v{next_version:04d}")
+
+            # Write into a temp dir first so readers never see a half-written version
+            tmp_dir = tempfile.mkdtemp(dir=model_dir, prefix=".tmp-")
+            try:
+                joblib.dump(predictor.model, os.path.join(tmp_dir, "model.joblib"))
+                joblib.dump(predictor.scaler, os.path.join(tmp_dir, "scaler.joblib"))
+                with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                    json.dump(meta, f)
+                os.replace(tmp_dir, version_dir)
+            except Exception:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                raise
+
+            # Drop old versions beyond the retention limit
+            for old in self._versions(ticker, interval)[self.keep_versions:]:
+                shutil.rmtree(os.path.join(model_dir, old), ignore_errors=True)
+
+        return version_dir
+
+    def load(self, ticker: str, interval: str, fingerprint: str = None,
+             factory: Callable = StockMovementPredictor) -> Optional[StockMovementPredictor]:
+        """Load the newest version compatible with `factory`'s features, optionally requiring a matching data fingerprint"""
+        import joblib
+
+        expected_hash = feature_schema_hash(factory().get_feature_columns())
+        for version in self._versions(ticker, interval):
+            version_dir = os.path.join(self._model_dir(ticker, interval), version)
+            meta = self._read_meta(version_dir)
+            if meta is None or meta.get("schema_hash") != expected_hash:
+                continue
+            if fingerprint is not None and meta.get("fingerprint") != fingerprint:
+                continue
+            try:
+                predictor = factory()
+                predictor.model = joblib.load(os.path.join(version_dir, "model.joblib"), mmap_mode=self.mmap_mode)
+                predictor.scaler = joblib.load(os.path.join(version_dir, "scaler.joblib"), mmap_mode=self.mmap_mode)
+                predictor.is_trained = True
+                return predictor
+            except Exception as e:
+                print(f"Error loading model artifact {version_dir}: {e}")
+        return None
+
+    def _read_meta(self, version_dir: str) -> Optional[Dict]:
+        try:
+            with open(os.path.join(version_dir, "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list_versions(self, ticker: str, interval: str) -> List[Dict]:
+        """Return metadata for every stored version, newest first"""
+        model_dir = self._model_dir(ticker, interval)
+        metas = []
+        for version in self._versions(ticker, interval):
+            meta = self._read_meta(os.path.join(model_dir, version))
+            if meta is not None:
+                meta["version"] = version
+                metas.append(meta)
+        return metas
+
+
+# Shared store used by the model registry
+model_store = ModelStore(root=os.getenv("MODEL_STORE_DIR", DEFAULT_STORE_DIR))
@@ -0,0 +1,251 @@
+# ml/registry.py
+"""Registry of fitted StockMovementPredictor instances.
+
+Each (ticker, interval) holds one fitted model + scaler pair together with
+the fingerprint of the bars it was fitted on. The pair is reused until new
+bars arrive, and a newer fit replaces it, so each ticker gets its own
+predictor instead of sharing (and overwriting) one singleton.
+
+When the bars change but an older fit for the ticker and interval exists
+(in memory, or in the model store after a restart), that fit answers
+straight away and the refit runs in the background. Only a ticker with no
+fit at all trains in the request.
+
+set_factory() swaps in another predictor configuration (e.g. the winner of
+a hyperparameter search) for one ticker and interval.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Union
+
+import pandas as pd
+
+from ..api.metrics import metrics
+from ..api.singleflight import SingleFlight
+from .model import StockMovementPredictor
+from .model_store import ModelStore, model_store
+from .training_pool import TrainingPool
+
+
+def data_fingerprint(data: Union[List[Dict], pd.DataFrame]) -> str:
+    """Identify a bar history by its length and first/last bar timestamps"""
+    if len(data) == 0:
+        return "empty"
+    if isinstance(data, pd.DataFrame):
+        # Same stamp as the equivalent list of records
+        first_time, last_time = int(data['time'].iloc[0]), int(data['time'].iloc[-1])
+    else:
+        first, last = data[0], data[-1]
+        first_time, last_time = first.get('time', first.get('datetime')), last.get('time', last.get('datetime'))
+    stamp = f"{len(data)}:{first_time}:{last_time}"
+    return hashlib.sha1(stamp.encode()).hexdigest()[:16]
+
+
+class ModelRegistry:
+    def __init__(self, max_models: int = 64, predictor_factory: Callable = StockMovementPredictor,
+                 store: ModelStore = None, training_pool: TrainingPool = None, save_interval: float = 300.0):
+        self.max_models = max_models
+        # Minimum seconds between persisted versions of one ticker+interval, so intraday refits don't churn the disk
+        self.save_interval = save_interval
+        self._factory = predictor_factory
+        # Per-(ticker, interval) overrides of the predictor factory, e.g. tuned configurations
+        self._factories: Dict[tuple, Callable] = {}
+        self.store = store
+        self.training_pool = training_pool
+        # (ticker, interval) -> (fingerprint, predictor), least recently used first
+        self._models: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self._refreshing = set()
+        self._saved_at: Dict[tuple, float] = {}
+        self._stats = {'hits': 0, 'loaded': 0, 'stale': 0, 'trained': 0, 'refreshed': 0, 'failed': 0,
+                       'evictions': 0, 'saved': 0}
+
+    def get(self, ticker: str, interval: str, fingerprint: str) -> Optional[StockMovementPredictor]:
+        """Return a fitted predictor if one exists for this exact data"""
+        key = (ticker.upper(), interval)
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is None or entry[0] != fingerprint:
+                return None
+            self._models.move_to_end(key)
+            return entry[1]
+
+    def put(self, ticker: str, interval: str, fingerprint: str, predictor: StockMovementPredictor):
+        """Cache a fitted predictor, replacing any older fit for the same ticker and interval"""
+        key = (ticker.upper(), interval)
+        with self._lock:
+            self._models[key] = (fingerprint, predictor)
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def set_factory(self, ticker: str, interval: str, factory: Callable):
+        """Build future fits for ticker+interval with `factory` (picklable) and drop the current fit"""
+        key = (ticker.upper(), interval)
+        with self._lock:
+            self._factories[key] = factory
+            self._models.pop(key, None)
+
+    def factory_for(self, ticker: str, interval: str) -> Callable:
+        with self._lock:
+            return self._factories.get((ticker.upper(), interval), self._factory)
+
+    def _uses_stored_models(self, ticker: str, interval: str) -> bool:
+        # Stored artifacts may have been fitted with another configuration than a ticker's override
+        if self.store is None:
+            return False
+        with self._lock:
+            return (ticker.upper(), interval) not in self._factories
+
+    def get_or_train(self, ticker: str, interval: str, data: List[Dict]) -> Optional[StockMovementPredictor]:
+        """Return a fitted predictor for this ticker's bars, training only when the bars are new.
+
+        Returns None when there is not enough data to train.
+        """
+        fingerprint = data_fingerprint(data)
+        key = (ticker.upper(), interval, fingerprint)
+
+        predictor = self.get(ticker, interval, fingerprint)
+        if predictor is not None:
+            self._count('hits')
+            return predictor
+
+        # Only one thread loads or trains a given key; the rest wait and share its model (or error)
+        return self._flights.do(key, lambda: self._load_or_train(ticker, interval, fingerprint, data))
+
+    def _load_or_train(self, ticker: str, interval: str, fingerprint: str,
+                       data: List[Dict]) -> Optional[StockMovementPredictor]:
+        # A previous flight may have finished between the caller's lookup and this one starting
+        predictor = self.get(ticker, interval, fingerprint)
+        if predictor is not None:
+            self._count('hits')
+            return predictor
+
+        # A model fitted on these bars before a restart is loaded instead of retrained
+        if self._uses_stored_models(ticker, interval):
+            predictor = self.store.load(ticker, interval, fingerprint, factory=self._factory)
+            if predictor is not None:
+                self._count('loaded')
+                self.put(ticker, interval, fingerprint, predictor)
+                return predictor
+
+        # An older fit for this ticker answers now; the refit on these bars happens in the background
+        predictor = self._latest(ticker, interval)
+        if predictor is not None:
+            self._count('stale')
+            self._refresh(ticker, interval, fingerprint, data)
+            return predictor
+
+        predictor = self._fit(ticker, interval, fingerprint, data)
+        if predictor is not None:
+            self._count('trained')
+        return predictor
+
+    def _latest(self, ticker: str, interval: str) -> Optional[StockMovementPredictor]:
+        """Return the newest fit for ticker+interval on any bars, from memory or the store"""
+        with self._lock:
+            entry = self._models.get((ticker.upper(), interval))
+        if entry is not None:
+            return entry[1]
+        if not self._uses_stored_models(ticker, interval):
+            return None
+        predictor = self.store.load(ticker, interval, factory=self._factory)
+        if predictor is not None:
+            self._count('loaded')
+            # The bars it was fitted on are unknown here, so no request fingerprint matches it
+            self.put(ticker, interval, None, predictor)
+        return predictor
+
+    def _refresh(self, ticker: str, interval: str, fingerprint: str, data: List[Dict]):
+        """Refit on the given bars in a background thread (at most one refit per ticker+interval at a time)"""
+        key = (ticker.upper(), interval)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                if self._fit(ticker, interval, fingerprint, data) is not None:
+                    self._count('refreshed')
+            except Exception as e:
+                self._count('failed')
+                print(f"Error refreshing model for {ticker} {interval}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name=f"model-refresh-{key[0]}-{interval}", daemon=True).start()
+
+    def _fit(self, ticker: str, interval: str, fingerprint: str,
+             data: List[Dict]) -> Optional[StockMovementPredictor]:
+        predictor = self._train(self.factory_for(ticker, interval), data)
+        if predictor is None:
+            self._count('failed')
+            return None
+        self.put(ticker, interval, fingerprint, predictor)
+        # Overridden configurations stay in memory; the store only holds default-factory fits it can load back
+        if self._uses_stored_models(ticker, interval):
+            self._save(ticker, interval, fingerprint, predictor)
+        return predictor
+
+    def _save(self, ticker: str, interval: str, fingerprint: str, predictor: StockMovementPredictor):
+        if self.store is None:
+            return
+        key = (ticker.upper(), interval)
+        now = time.monotonic()
+        with self._lock:
+            saved_at = self._saved_at.get(key)
+            if saved_at is not None and now - saved_at < self.save_interval:
+                return
+            self._saved_at[key] = now
+        try:
+            self.store.save(ticker, interval, fingerprint, predictor)
+            self._count('saved')
+        except Exception as e:
+            print(f"Error saving model artifact: {e}")
+
+    @metrics.timed('model_fit')
+    def _train(self, factory: Callable, data: List[Dict]) -> Optional[StockMovementPredictor]:
+        """Fit a new predictor, in a worker process when a training pool is configured"""
+        if self.training_pool is not None:
+            return self.training_pool.train(data, factory)
+        predictor = factory()
+        return predictor if predictor.train_model(data) else None
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._saved_at.clear()
+
+    def stats(self) -> Dict:
+        """Return a snapshot of registry counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['models'] = len(self._models)
+            stats['refreshing'] = len(self._refreshing)
+        stats['max_models'] = self.max_models
+        flights = self._flights.stats()
+        stats['training_leaders'] = flights['leaders']
+        stats['training_coalesced'] = flights['coalesced']
+        return stats
+
+
+# Shared registry used by the API routes, persisting fitted models unless MODEL_STORE_DISABLED is set.
+# TRAIN_PROCESSES > 0 moves model fits into a process pool; MODEL_SAVE_INTERVAL throttles persisted versions.
+_train_processes = int(os.getenv("TRAIN_PROCESSES", "0"))
+model_registry = ModelRegistry(
+    store=None if os.getenv("MODEL_STORE_DISABLED") else model_store,
+    training_pool=TrainingPool(_train_processes) if _train_processes > 0 else None,
+    save_interval=float(os.getenv("MODEL_SAVE_INTERVAL", "300")),
+)
@@ -0,0 +1,204 @@
+# ml/sentiment_backends.py
+"""Batch sentiment scoring backends used by SentimentAnalyzer.
+
+VaderBackend scores large batches across a process pool (small batches
+stay in-process, where pool overhead would dominate). TransformerBackend
+runs a CPU transformers pipeline and groups the texts of concurrent calls
+(single texts and batches alike) into micro-batches bounded by
+max_batch/max_wait. Both report throughput.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List
+
+# Per-process analyzer for pool workers
+_worker_analyzer = None
+
+
+def _init_vader_worker():
+    global _worker_analyzer
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    _worker_analyzer = SentimentIntensityAnalyzer()
+
+
+def _score_vader_chunk(texts: List[str]) -> List[float]:
+    return [_worker_analyzer.polarity_scores(text)['compound'] for text in texts]
+
+
+class _Throughput:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.texts = 0
+        self.batches = 0
+        self.seconds = 0.0
+
+    def record(self, count: int, seconds: float):
+        with self._lock:
+            self.texts += count
+            self.batches += 1
+            self.seconds += seconds
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'texts': self.texts,
+                'batches': self.batches,
+                'seconds': self.seconds,
+                'texts_per_sec': self.texts / self.seconds if self.seconds else 0.0,
+            }
+
+
+class VaderBackend:
+    name = 'vader'
+
+    def __init__(self, processes: int = None, min_parallel: int = 512, chunk_size: int = 128):
+        self.processes = processes or os.cpu_count() or 1
+        self.min_parallel = min_parallel
+        self.chunk_size = chunk_size
+        # Imported here so only processes that score with VADER load it and its lexicon
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        self.analyzer = SentimentIntensityAnalyzer()
+        self.throughput = _Throughput()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Spawned, not forked: forking a threaded server can copy a lock another thread holds into the child
+                self._pool = ProcessPoolExecutor(max_workers=self.processes, initializer=_init_vader_worker,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def score(self, text: str) -> float:
+        return self.analyzer.polarity_scores(text)['compound']
+
+    def score_batch(self, texts: List[str]) -> List[float]:
+        started = time.perf_counter()
+        if len(texts) < self.min_parallel or self.processes <= 1:
+            scores = [self.score(text) for text in texts]
+        else:
+            chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+            scores = [score for chunk in self._get_pool().map(_score_vader_chunk, chunks) for score in chunk]
+        self.throughput.record(len(texts), time.perf_counter() - started)
+        return scores
+
+    def stats(self) -> Dict:
+        stats = self.throughput.stats()
+        stats.update({'backend': self.name, 'processes': self.processes, 'min_parallel': self.min_parallel})
+        return stats
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+class TransformerBackend:
+    def __init__(self, model_name: str = 'distilbert-base-uncased-finetuned-sst-2-english',
+                 max_batch: int = 32, max_wait: float = 0.01):
+        self.model_name = model_name
+        self.name = f'transformer:{model_name}'
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.throughput = _Throughput()
+        self._pipeline = None
+        self._load_lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = None
+
+    def _get_pipeline(self):
+        with self._load_lock:
+            if self._pipeline is None:
+                # transformers is heavy and optional, so only import it when this backend is used
+                from transformers import pipeline
+                self._pipeline = pipeline('sentiment-analysis', model=self.model_name, device=-1)
+            return self._pipeline
+
+    @staticmethod
+    def _to_compound(result: Dict) -> float:
+        """Map a classifier label/score onto VADER's -1..1 compound scale"""
+        label = result['label'].lower()
+        if label.startswith('pos'):
+            return float(result['score'])
+        if label.startswith('neg'):
+            return -float(result['score'])
+        return 0.0
+
+    def _run(self, texts: List[str]) -> List[float]:
+        started = time.perf_counter()
+        results = self._get_pipeline()(texts, batch_size=self.max_batch, truncation=True)
+        self.throughput.record(len(texts), time.perf_counter() - started)
+        return [self._to_compound(result) for result in results]
+
+    def score_batch(self, texts: List[str]) -> List[float]:
+        """Score texts through the shared micro-batcher, so concurrent callers share forward passes"""
+        self._ensure_worker()
+        futures = []
+        for text in texts:
+            future = Future()
+            self._queue.put((text, future))
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def score(self, text: str) -> float:
+        """Score one text, sharing a forward pass with other threads scoring at the same time"""
+        return self.score_batch([text])[0]
+
+    def _ensure_worker(self):
+        with self._load_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._batch_loop, name='sentiment-batcher', daemon=True)
+                self._worker.start()
+
+    def _batch_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            # Collect more requests until the batch is full or the oldest one has waited max_wait
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                scores = self._run(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), score in zip(batch, scores):
+                future.set_result(score)
+
+    def stats(self) -> Dict:
+        stats = self.throughput.stats()
+        stats.update({'backend': self.name, 'max_batch': self.max_batch, 'max_wait': self.max_wait})
+        return stats
+
+    def close(self):
+        pass
+
+
+def make_backend(name: str = None):
+    """Build the backend named by `name` or the SENTIMENT_BACKEND environment variable"""
+    name = (name or os.getenv('SENTIMENT_BACKEND', 'vader')).lower()
+    if name == 'vader':
+        return VaderBackend(processes=int(os.getenv('SENTIMENT_PROCESSES', '0')) or None)
+    if name == 'transformer':
+        return TransformerBackend(
+            model_name=os.getenv('SENTIMENT_MODEL', 'distilbert-base-uncased-finetuned-sst-2-english'),
+            max_batch=int(os.getenv('SENTIMENT_MAX_BATCH', '32')),
+            max_wait=float(os.getenv('SENTIMENT_MAX_WAIT', '0.01')),
+        )
+    raise ValueError(f"Unknown sentiment backend: {name}")
@@ -0,0 +1,123 @@
+# ml/sentiment_cache.py
+"""Bounded LRU cache of sentiment scores keyed by a hash of the scored text.
+
+News providers return the same headlines for days, so scores are cached
+by a digest of the article text (title + summary). Entries are tagged
+with the analyzer's namespace; swapping the analyzer invalidates them.
+The cache can optionally be persisted to a JSON file.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def text_key(text: str) -> str:
+    """Digest used as the cache key for a piece of text"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class SentimentCache:
+    def __init__(self, max_entries: int = 50000, namespace: str = 'vader', path: str = None, persist_every: int = 500):
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self.path = path
+        self.persist_every = persist_every
+        self._scores: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Serializes writers so an older snapshot never replaces a newer file
+        self._save_lock = threading.Lock()
+        self._dirty = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        if path:
+            self.load()
+
+    def get(self, text: str) -> Optional[float]:
+        key = text_key(text)
+        with self._lock:
+            score = self._scores.get(key)
+            if score is None:
+                self._stats['misses'] += 1
+                return None
+            self._scores.move_to_end(key)
+            self._stats['hits'] += 1
+            return score
+
+    def put(self, text: str, score: float):
+        key = text_key(text)
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+                self._stats['evictions'] += 1
+            self._dirty += 1
+            should_save = self.path and self._dirty >= self.persist_every
+        if should_save:
+            self.save()
+
+    def invalidate(self, namespace: str = None):
+        """Drop every cached score, e.g. because the analyzer producing them changed"""
+        # Waits for an in-flight save, so stale scores can't be written back after the file is removed
+        with self._save_lock:
+            with self._lock:
+                self._scores.clear()
+                self._dirty = 0
+                self._stats['invalidations'] += 1
+                if namespace is not None:
+                    self.namespace = namespace
+            if self.path:
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+
+    def save(self):
+        """Write the cache to its JSON file"""
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                payload = {'namespace': self.namespace, 'scores': dict(self._scores)}
+                self._dirty = 0
+            tmp_path = None
+            try:
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), prefix='.sentiment-')
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(payload, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Error writing sentiment cache: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def load(self):
+        """Load persisted scores, ignoring files written by a different analyzer"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                payload = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading sentiment cache: {e}")
+            return
+        if payload.get('namespace') != self.namespace:
+            return
+        with self._lock:
+            for key, score in list(payload.get('scores', {}).items())[-self.max_entries:]:
+                self._scores[key] = score
+
+    def stats(self) -> Dict:
+        """Return a snapshot of cache counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._scores)
+        stats['max_entries'] = self.max_entries
+        stats['namespace'] = self.namespace
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,217 @@
+# ml/streaming.py
+"""Incremental indicator state for appending bars one at a time.
+
+IndicatorState reproduces compute_indicators() for the newest bar without
+recomputing the whole history: rolling windows are ring buffers with
+running (compensated) sums and the MACD EMAs use the same recursion as
+pandas' adjusted ewm. Each update is O(1) in the length of the history.
+
+The formulas mirror the definitions in feature_registry by hand, so a
+change to a definition there must be made here too;
+tests/test_streaming.py checks every default model feature against
+compute_indicators() past its warm-up (to 1e-6 relative, 1e-9 absolute).
+"""
+
+import math
+from typing import Dict, Iterable, List, Union
+
+import pandas as pd
+
+NAN = float('nan')
+
+
+def _div(a: float, b: float) -> float:
+    """Divide with NumPy/IEEE semantics instead of raising on zero"""
+    if b == 0:
+        if a == 0 or math.isnan(a):
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+class _RollingWindow:
+    """Fixed-size window over the last `size` values with O(1) mean and std"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values: List[float] = [NAN] * size
+        self.pos = 0
+        self.valid = 0
+        self.shift = None
+        # Compensated running sums of (x - shift) and (x - shift)^2
+        self.sum = 0.0
+        self.sum_c = 0.0
+        self.sumsq = 0.0
+        self.sumsq_c = 0.0
+
+    def _add(self, value: float, sign: float):
+        d = value - self.shift
+        y = sign * d - self.sum_c
+        t = self.sum + y
+        self.sum_c = (t - self.sum) - y
+        self.sum = t
+        y = sign * d * d - self.sumsq_c
+        t = self.sumsq + y
+        self.sumsq_c = (t - self.sumsq) - y
+        self.sumsq = t
+
+    def push(self, value: float):
+        old = self.values[self.pos]
+        if not math.isnan(old):
+            self._add(old, -1.0)
+            self.valid -= 1
+        if not math.isnan(value):
+            if self.shift is None:
+                self.shift = value
+            self._add(value, 1.0)
+            self.valid += 1
+        self.values[self.pos] = value
+        self.pos = (self.pos + 1) % self.size
+        if self.pos == 0:
+            # Once per lap, re-center the sums on the current values so drift and
+            # cancellation never accumulate (amortized O(1) per push)
+            self._rebase()
+
+    def _rebase(self):
+        valid = [v for v in self.values if not math.isnan(v)]
+        self.shift = valid[-1] if valid else None
+        self.sum = self.sum_c = self.sumsq = self.sumsq_c = 0.0
+        for value in valid:
+            self._add(value, 1.0)
+
+    def full(self) -> bool:
+        return self.valid == self.size
+
+    def mean(self) -> float:
+        if not self.full():
+            return NAN
+        return self.shift + self.sum / self.size
+
+    def std(self) -> float:
+        """Sample standard deviation (ddof=1), matching pandas rolling().std()"""
+        if not self.full():
+            return NAN
+        n = self.size
+        var = (self.sumsq - self.sum * self.sum / n) / (n - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+    def ago(self, periods: int) -> float:
+        """Value pushed `periods` steps before the newest one"""
+        return self.values[(self.pos - 1 - periods) % self.size]
+
+
+class _Ewm:
+    """pandas ewm(span=...).mean() with adjust=True, one value at a time"""
+
+    def __init__(self, span: int):
+        alpha = 2.0 / (span + 1.0)
+        self.decay = 1.0 - alpha
+        self.weighted = NAN
+        self.old_wt = 1.0
+
+    def push(self, value: float) -> float:
+        if math.isnan(self.weighted):
+            if not math.isnan(value):
+                self.weighted = value
+                self.old_wt = 1.0
+            return self.weighted
+        self.old_wt *= self.decay
+        if not math.isnan(value):
+            if self.weighted != value:
+                self.weighted = (self.old_wt * self.weighted + value) / (self.old_wt + 1.0)
+            self.old_wt += 1.0
+        return self.weighted
+
+
+class IndicatorState:
+    def __init__(self):
+        self.closes = _RollingWindow(11)
+        self.returns = _RollingWindow(10)
+        self.sma_5 = _RollingWindow(5)
+        self.sma_10 = _RollingWindow(10)
+        self.close_20 = _RollingWindow(20)
+        self.gains = _RollingWindow(14)
+        self.losses = _RollingWindow(14)
+        self.volumes = _RollingWindow(10)
+        self.ema_12 = _Ewm(12)
+        self.ema_26 = _Ewm(26)
+        self.ema_signal = _Ewm(9)
+        self.prev_close = NAN
+        self.bars = 0
+        self.latest: Dict[str, float] = {}
+
+    @classmethod
+    def from_history(cls, data: Union[pd.DataFrame, Iterable[Dict]]) -> 'IndicatorState':
+        """Seed the state by replaying an existing bar history"""
+        state = cls()
+        rows = data.to_dict(orient='records') if isinstance(data, pd.DataFrame) else data
+        for bar in rows:
+            state.update(bar)
+        return state
+
+    def update(self, bar: Dict) -> Dict[str, float]:
+        """Append one closed bar and return every indicator for it"""
+        open_ = float(bar['open'])
+        close = float(bar['close'])
+        volume = float(bar['volume'])
+        prev_close = self.prev_close
+        out = {}
+
+        # Price-based features
+        self.closes.push(close)
+        price_change = close / prev_close - 1 if not math.isnan(prev_close) else NAN
+        out['price_change'] = price_change
+        out['price_change_5'] = close / self.closes.ago(5) - 1 if self.bars >= 5 else NAN
+        out['price_change_10'] = close / self.closes.ago(10) - 1 if self.bars >= 10 else NAN
+
+        # Open-Close relationship features
+        out['open_close_ratio'] = _div(open_, close)
+        out['body_size'] = _div(abs(close - open_), open_)
+        out['gap_up'] = int(open_ > prev_close)
+        out['gap_down'] = int(open_ < prev_close)
+
+        # Volatility
+        self.returns.push(price_change)
+        out['volatility'] = self.returns.std()
+
+        # Moving averages
+        self.sma_5.push(close)
+        self.sma_10.push(close)
+        self.close_20.push(close)
+        out['sma_5'] = self.sma_5.mean()
+        out['sma_10'] = self.sma_10.mean()
+        out['sma_20'] = self.close_20.mean()
+
+        # Price vs moving averages
+        out['price_vs_sma5'] = _div(close - out['sma_5'], out['sma_5'])
+        out['price_vs_sma10'] = _div(close - out['sma_10'], out['sma_10'])
+        out['price_vs_sma20'] = _div(close - out['sma_20'], out['sma_20'])
+
+        # RSI (a missing delta counts as a zero move, like delta.where(delta > 0, 0))
+        delta = close - prev_close
+        self.gains.push(delta if delta > 0 else 0.0)
+        self.losses.push(-delta if delta < 0 else 0.0)
+        rs = _div(self.gains.mean(), self.losses.mean())
+        out['rsi'] = 100 - _div(100, 1 + rs)
+
+        # MACD
+        out['macd'] = self.ema_12.push(close) - self.ema_26.push(close)
+        out['macd_signal'] = self.ema_signal.push(out['macd'])
+        out['macd_histogram'] = out['macd'] - out['macd_signal']
+
+        # Volume indicators
+        self.volumes.push(volume)
+        out['volume_sma'] = self.volumes.mean()
+        out['volume_ratio'] = _div(volume, out['volume_sma'])
+
+        # Bollinger Bands
+        bb_std = self.close_20.std()
+        out['bb_middle'] = out['sma_20']
+        out['bb_upper'] = out['bb_middle'] + (bb_std * 2)
+        out['bb_lower'] = out['bb_middle'] - (bb_std * 2)
+        out['bb_position'] = _div(close - out['bb_lower'], out['bb_upper'] - out['bb_lower'])
+
+        self.prev_close = close
+        self.bars += 1
+        self.latest = out
+        return out
@@ -0,0 +1,55 @@
+# ml/training_pool.py
+"""Process pool for CPU-bound model fits.
+
+RandomForest fits hold the GIL for long stretches, so when the app is
+served by threads a fit in one request stalls every other request.
+TrainingPool runs fits in worker processes and ships the fitted
+predictor back, leaving the serving threads free for I/O.
+
+Workers are spawned rather than forked: forking a threaded server can copy
+a lock that another thread holds (logging, the registry, joblib) into the
+child, which then deadlocks on it.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from .model import StockMovementPredictor
+
+
+def fit_predictor(data: List[Dict], factory: Callable = StockMovementPredictor) -> Optional[StockMovementPredictor]:
+    """Train a fresh predictor built by `factory` (runs inside a worker process)"""
+    predictor = factory()
+    if not predictor.train_model(data):
+        return None
+    return predictor
+
+
+class TrainingPool:
+    def __init__(self, processes: int):
+        self.processes = processes
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.processes,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def submit(self, data: List[Dict], factory: Callable = StockMovementPredictor):
+        """Start a fit in a worker process and return its Future; `factory` must be picklable"""
+        return self._get_executor().submit(fit_predictor, data, factory)
+
+    def train(self, data: List[Dict], factory: Callable = StockMovementPredictor) -> Optional[StockMovementPredictor]:
+        """Fit in a worker process and wait for the result"""
+        return self.submit(data, factory).result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -0,0 +1,314 @@
+# ml/tuning.py
+"""Hyperparameter and algorithm search for the movement classifier.
+
+The feature/label matrix for a (ticker, interval, data fingerprint) is
+built once and written as .npy files; worker processes open them
+memory-mapped and read-only, so every candidate and CV fold shares one
+copy instead of recomputing indicators or pickling arrays.
+
+Candidates are scored with time-series cross-validation (a gap of
+`lookahead` rows keeps training labels out of each validation fold) and
+pruned by successive halving: every rung scores the survivors on a larger
+slice of the most recent rows and keeps the best 1/factor of them.
+Every score is appended to a JSON results file, so re-running the same
+search skips the work already done.
+"""
+
+import hashlib
+import json
+import math
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import ExtraTreesClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler, TimeSeriesSplit
+from sklearn.neural_network import MLPClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from .backtest import build_dataset
+from .model import StockMovementPredictor
+
+DEFAULT_TUNING_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "tuning")
+
+# Estimators the predictor can be built with, and their default search spaces
+ALGORITHMS = {
+    'random_forest': RandomForestClassifier,
+    'extra_trees': ExtraTreesClassifier,
+    'gradient_boosting': HistGradientBoostingClassifier,
+    'logistic_regression': LogisticRegression,
+    'mlp': MLPClassifier,
+}
+
+SEARCH_SPACES = {
+    'random_forest': {
+        'n_estimators': [50, 100, 200, 400],
+        'max_depth': [None, 4, 8, 16],
+        'min_samples_leaf': [1, 2, 5, 10],
+        'max_features': ['sqrt', 0.5, 1.0],
+    },
+    'extra_trees': {
+        'n_estimators': [100, 200, 400],
+        'max_depth': [None, 8, 16],
+        'min_samples_leaf': [1, 5, 10],
+    },
+    'gradient_boosting': {
+        'learning_rate': [0.03, 0.1, 0.3],
+        'max_depth': [None, 3, 6],
+        'max_iter': [100, 200],
+        'l2_regularization': [0.0, 1.0],
+    },
+    'logistic_regression': {
+        'C': [0.01, 0.1, 1.0, 10.0],
+        'max_iter': [1000],
+    },
+    'mlp': {
+        'hidden_layer_sizes': [(32,), (64,), (64, 32)],
+        'alpha': [1e-4, 1e-3, 1e-2],
+        'max_iter': [500],
+    },
+}
+
+# Parameters pinned for every candidate that the estimator accepts
+_FIXED_PARAMS = {'random_state': 42}
+
+
+def make_model(algorithm: str, params: Dict = None):
+    """Instantiate one of ALGORITHMS with the given hyperparameters"""
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm '{algorithm}'. Use one of: {', '.join(ALGORITHMS)}")
+    estimator = ALGORITHMS[algorithm]
+    accepted = estimator().get_params()
+    fixed = {name: value for name, value in _FIXED_PARAMS.items() if name in accepted}
+    if 'n_jobs' in accepted:
+        # Parallelism comes from scoring candidates side by side
+        fixed['n_jobs'] = 1
+    return estimator(**{**fixed, **(params or {})})
+
+
+class TunedPredictorFactory:
+    """Picklable predictor factory for a searched configuration; builds a fresh estimator per call"""
+
+    def __init__(self, algorithm: str, params: Dict):
+        self.algorithm = algorithm
+        self.params = params
+
+    def __call__(self) -> StockMovementPredictor:
+        return StockMovementPredictor(model=make_model(self.algorithm, _restore_params(self.algorithm, self.params)))
+
+
+def _candidate_id(algorithm: str, params: Dict) -> str:
+    payload = json.dumps({'algorithm': algorithm, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+def _json_params(params: Dict) -> Dict:
+    """Make sampled params JSON-friendly (tuples become lists, numpy scalars become Python ones)"""
+    return {name: (list(value) if isinstance(value, tuple) else
+                   value.item() if isinstance(value, np.generic) else value)
+            for name, value in params.items()}
+
+
+def _restore_params(algorithm: str, params: Dict) -> Dict:
+    if algorithm == 'mlp' and 'hidden_layer_sizes' in params:
+        params = {**params, 'hidden_layer_sizes': tuple(params['hidden_layer_sizes'])}
+    return params
+
+
+def generate_candidates(algorithms: List[str] = None, n_candidates: int = 32,
+                        search_spaces: Dict[str, Dict] = None, seed: int = 0) -> List[Dict]:
+    """Sample up to n_candidates configurations, split evenly across algorithms"""
+    algorithms = algorithms or ['random_forest']
+    spaces = {**SEARCH_SPACES, **(search_spaces or {})}
+    per_algorithm = max(1, n_candidates // len(algorithms))
+
+    candidates = []
+    for algorithm in algorithms:
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm '{algorithm}'. Use one of: {', '.join(ALGORITHMS)}")
+        space = spaces[algorithm]
+        grid = ParameterGrid(space)
+        if len(grid) <= per_algorithm:
+            sampled = list(grid)
+        else:
+            sampled = list(ParameterSampler(space, per_algorithm, random_state=seed))
+        for params in sampled:
+            params = _json_params(params)
+            candidates.append({'id': _candidate_id(algorithm, params), 'algorithm': algorithm, 'params': params})
+    return candidates
+
+
+class FeatureMatrixCache:
+    """Feature/label matrices on disk, one directory per (ticker, interval, fingerprint)"""
+
+    def __init__(self, root: str = DEFAULT_TUNING_DIR):
+        self.root = root
+
+    def directory(self, ticker: str, interval: str, fingerprint: str) -> str:
+        return os.path.join(self.root, ticker.upper(), interval, fingerprint)
+
+    def get_or_build(self, ticker: str, interval: str, fingerprint: str, data: List[Dict],
+                     lookahead: int = 5) -> Optional[Dict]:
+        """Return paths and metadata for the cached matrix, building it from `data` if needed"""
+        directory = self.directory(ticker, interval, fingerprint)
+        meta_path = os.path.join(directory, f"matrix-{lookahead}.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                return json.load(f)
+
+        dataset = build_dataset(data, lookahead)
+        if dataset is None:
+            return None
+
+        classes, codes = np.unique(dataset['y'], return_inverse=True)
+        os.makedirs(directory, exist_ok=True)
+        meta = {
+            'X': os.path.join(directory, f"X-{lookahead}.npy"),
+            'y': os.path.join(directory, f"y-{lookahead}.npy"),
+            'rows': int(len(codes)),
+            'classes': [str(c) for c in classes],
+            'feature_columns': dataset['feature_columns'],
+            'lookahead': lookahead,
+        }
+        np.save(meta['X'], dataset['X'])
+        np.save(meta['y'], codes.astype(np.int8))
+        _write_json(meta_path, meta)
+        return meta
+
+
+def _write_json(path: str, payload):
+    """Write JSON atomically so an interrupted search never leaves a truncated file"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, 'w') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _score_fold(matrix: Dict, algorithm: str, params: Dict, n_rows: int, n_splits: int, fold: int) -> Dict:
+    """Fit and score one CV fold of one candidate (runs in a worker process)"""
+    X = np.load(matrix['X'], mmap_mode='r')
+    y = np.load(matrix['y'], mmap_mode='r')
+    start = len(y) - n_rows
+    splitter = TimeSeriesSplit(n_splits=n_splits, gap=matrix['lookahead'])
+    train_index, test_index = list(splitter.split(np.empty((n_rows, 1))))[fold]
+
+    model = make_pipeline(StandardScaler(), make_model(algorithm, _restore_params(algorithm, params)))
+    started = time.perf_counter()
+    try:
+        model.fit(X[start + train_index], y[start + train_index])
+        y_pred = model.predict(X[start + test_index])
+    except Exception as e:
+        # e.g. a training window holding a single class; the candidate scores zero here instead of ending the search
+        return {'f1': 0.0, 'accuracy': 0.0, 'fit_time': time.perf_counter() - started, 'error': str(e)}
+    y_test = y[start + test_index]
+    return {
+        'f1': float(f1_score(y_test, y_pred, average='weighted', zero_division=0)),
+        'accuracy': float(accuracy_score(y_test, y_pred)),
+        'fit_time': time.perf_counter() - started,
+    }
+
+
+class HyperparameterSearch:
+    def __init__(self, cache: FeatureMatrixCache = None, n_splits: int = 5, factor: int = 3,
+                 min_rows: int = 200, n_jobs: int = -1):
+        self.cache = cache or FeatureMatrixCache()
+        self.n_splits = n_splits
+        self.factor = factor
+        self.min_rows = min_rows
+        self.n_jobs = n_jobs
+
+    def _rung_rows(self, total_rows: int, n_candidates: int) -> List[int]:
+        """Rows of history used at each rung, growing by `factor` and ending at the full history"""
+        rungs = max(1, int(math.log(max(n_candidates, 1), self.factor)) + 1)
+        rows = [int(total_rows / self.factor ** (rungs - 1 - r)) for r in range(rungs)]
+        # Small rungs are pointless once they can't hold every CV fold
+        return sorted({max(row, min(self.min_rows, total_rows)) for row in rows})
+
+    def run(self, ticker: str, interval: str, fingerprint: str, data: List[Dict],
+            algorithms: List[str] = None, n_candidates: int = 32, lookahead: int = 5,
+            search_spaces: Dict[str, Dict] = None, seed: int = 0) -> Optional[Dict]:
+        """Search configurations for one ticker's bars; returns the best one and the leaderboard.
+
+        Returns None if the history is too short to cross-validate.
+        """
+        matrix = self.cache.get_or_build(ticker, interval, fingerprint, data, lookahead)
+        if matrix is None or matrix['rows'] < self.n_splits + 1 + lookahead * self.n_splits:
+            return None
+
+        candidates = generate_candidates(algorithms, n_candidates, search_spaces, seed)
+        settings = {
+            'candidates': sorted(c['id'] for c in candidates),
+            'n_splits': self.n_splits,
+            'factor': self.factor,
+            'min_rows': self.min_rows,
+            'lookahead': lookahead,
+        }
+        search_id = hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:12]
+        results_path = os.path.join(self.cache.directory(ticker, interval, fingerprint), f"search-{search_id}.json")
+        results = self._load_results(results_path)
+
+        survivors = candidates
+        for rung, n_rows in enumerate(self._rung_rows(matrix['rows'], len(candidates))):
+            pending = [(c, fold) for c in survivors for fold in range(self.n_splits)
+                       if str(fold) not in results.get(c['id'], {}).get(str(n_rows), {})]
+            if pending:
+                scores = Parallel(n_jobs=self.n_jobs)(
+                    delayed(_score_fold)(matrix, c['algorithm'], c['params'], n_rows, self.n_splits, fold)
+                    for c, fold in pending
+                )
+                for (candidate, fold), score in zip(pending, scores):
+                    results.setdefault(candidate['id'], {}).setdefault(str(n_rows), {})[str(fold)] = score
+                _write_json(results_path, results)
+
+            for candidate in survivors:
+                folds = results[candidate['id']][str(n_rows)].values()
+                candidate['rung'] = rung
+                candidate['rows'] = n_rows
+                candidate['score'] = float(np.mean([s['f1'] for s in folds]))
+                candidate['score_std'] = float(np.std([s['f1'] for s in folds]))
+                candidate['accuracy'] = float(np.mean([s['accuracy'] for s in folds]))
+                candidate['fit_time'] = float(np.mean([s['fit_time'] for s in folds]))
+                errors = [s['error'] for s in folds if 'error' in s]
+                if errors:
+                    candidate['failed_folds'] = len(errors)
+                    candidate['error'] = errors[0]
+
+            survivors = sorted(survivors, key=lambda c: c['score'], reverse=True)
+            if n_rows < matrix['rows']:
+                survivors = survivors[:max(1, math.ceil(len(survivors) / self.factor))]
+
+        leaderboard = sorted(candidates, key=lambda c: (c.get('rung', -1), c.get('score', 0.0)), reverse=True)
+        best = survivors[0]
+        return {
+            'ticker': ticker.upper(),
+            'interval': interval,
+            'search_id': search_id,
+            'rows': matrix['rows'],
+            'best': {
+                'algorithm': best['algorithm'],
+                'params': best['params'],
+                'score': best['score'],
+                'accuracy': best['accuracy'],
+            },
+            'leaderboard': leaderboard,
+        }
+
+    def _load_results(self, path: str) -> Dict:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+# Shared search used by the API routes
+hyperparameter_search = HyperparameterSearch(
+    cache=FeatureMatrixCache(root=os.getenv("TUNING_DIR", DEFAULT_TUNING_DIR)),
+    n_jobs=int(os.getenv("TUNING_JOBS", "-1"))
+)
@@ -0,0 +1,85 @@
+# serve.py
+"""Production entry point for the Flask app.
+
+`python app/main.py` runs the single-process debug server, where one slow
+TradingView or Finnhub call holds up every other request. This runs the
+same app on a thread-pool WSGI server so I/O-bound requests overlap, and
+moves model fits into a process pool so they don't hold the GIL for
+serving threads:
+
+    python -m app.serve --threads 32 --train-processes 4
+
+waitress is used when installed, otherwise Werkzeug's threaded server.
+Under gunicorn, use threaded workers for the same effect:
+
+    TRAIN_PROCESSES=4 gunicorn -w 2 -k gthread --threads 16 app.main:app
+
+scikit-learn, VADER and tvDatafeed are imported on first use, so workers
+boot quickly. Pass --warm-up (or set WARM_UP=1) to load them before
+serving instead; under gunicorn that means using the factory entry point,
+`gunicorn ... 'app.serve:build_app()'`.
+"""
+
+import argparse
+import os
+
+
+def build_app(train_processes: int = None, warm_up: bool = None):
+    """Import the app, attach a training process pool if requested and start the news refresher"""
+    from app.main import app, warm_up as warm_up_app
+    from app.api.news_api import news_refresher
+    from app.ml.registry import model_registry
+    from app.ml.training_pool import TrainingPool
+
+    if train_processes is None:
+        train_processes = int(os.getenv('TRAIN_PROCESSES', '0'))
+    if warm_up is None:
+        warm_up = bool(os.getenv('WARM_UP'))
+
+    if warm_up:
+        timings = warm_up_app()
+        print("Warmed up in " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+    if train_processes > 0 and model_registry.training_pool is None:
+        model_registry.training_pool = TrainingPool(train_processes)
+    # Keep NEWS_WATCHLIST tickers' news precomputed in the background
+    news_refresher.start()
+    return app
+
+
+def serve(app, host: str, port: int, threads: int, server: str = 'auto'):
+    """Serve `app` on a thread-pool WSGI server until interrupted"""
+    if server in ('auto', 'waitress'):
+        try:
+            from waitress import serve as waitress_serve
+        except ImportError:
+            if server == 'waitress':
+                raise
+        else:
+            print(f"Serving on http://{host}:{port} with waitress ({threads} threads)")
+            waitress_serve(app, host=host, port=port, threads=threads)
+            return
+
+    from werkzeug.serving import run_simple
+    print(f"Serving on http://{host}:{port} with the threaded Werkzeug server")
+    run_simple(host, port, app, threaded=True, use_reloader=False, use_debugger=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the smartFinance API with concurrent request handling")
+    parser.add_argument('--host', default=os.getenv('HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '5000')))
+    parser.add_argument('--threads', type=int, default=int(os.getenv('SERVER_THREADS', '16')),
+                        help='request-handling threads (waitress)')
+    parser.add_argument('--train-processes', type=int, default=int(os.getenv('TRAIN_PROCESSES', '0')),
+                        help='worker processes for model fits (0 trains in the request thread)')
+    parser.add_argument('--server', choices=['auto', 'waitress', 'threaded'], default='auto')
+    parser.add_argument('--warm-up', action='store_true', default=bool(os.getenv('WARM_UP')),
+                        help='load ML/sentiment dependencies before serving instead of on first use')
+    args = parser.parse_args()
+
+    app = build_app(args.train_processes, args.warm_up)
+    serve(app, args.host, args.port, args.threads, args.server)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/bench_feature_panel.py
+"""Throughput of the panel feature engine versus per-symbol indicator calculation.
+
+Run from the repository root:  python -m benchmarks.bench_feature_panel
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.api.fake_feed import generate_ohlcv
+from app.ml.features import compute_panel_features, stack_panel, unstack_features
+from app.ml.model import StockMovementPredictor
+
+
+def make_histories(n_symbols: int, n_bars: int):
+    return {f"SYM{i}": generate_ohlcv(f"SYM{i}", n_bars, 86400, end_time=1_700_000_000).reset_index()
+            for i in range(n_symbols)}
+
+
+def bench(n_symbols: int, n_bars: int, repeat: int):
+    histories = make_histories(n_symbols, n_bars)
+    records = {symbol: frame.to_dict(orient="records") for symbol, frame in histories.items()}
+    predictor = StockMovementPredictor()
+
+    best_loop = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        per_symbol = {symbol: predictor.calculate_technical_indicators(rows) for symbol, rows in records.items()}
+        best_loop = min(best_loop, time.perf_counter() - started)
+
+    panel, symbols, lengths = stack_panel(histories)
+    best_panel = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        features = compute_panel_features(panel)
+        best_panel = min(best_panel, time.perf_counter() - started)
+
+    # The panel path must reproduce the per-symbol output exactly
+    frames = unstack_features(panel, features, symbols, lengths)
+    for symbol in symbols:
+        for name in features:
+            expected = per_symbol[symbol][name].to_numpy(dtype=np.float64)
+            actual = frames[symbol][name].to_numpy(dtype=np.float64)
+            assert np.array_equal(expected, actual, equal_nan=True), (symbol, name)
+
+    return best_loop, best_panel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bars", type=int, default=500)
+    parser.add_argument("--symbols", type=int, nargs="+", default=[10, 50, 100, 250, 500])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'symbols':>8} {'per-symbol s':>13} {'panel s':>9} {'speedup':>8} {'panel symbols/s':>16}")
+    for n_symbols in args.symbols:
+        loop_s, panel_s = bench(n_symbols, args.bars, args.repeat)
+        print(f"{n_symbols:>8} {loop_s:>13.4f} {panel_s:>9.4f} {loop_s / panel_s:>7.1f}x {n_symbols / panel_s:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
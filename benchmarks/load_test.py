@@ -0,0 +1,140 @@
+# benchmarks/load_test.py
+"""Load-test the API with stubbed upstreams and report latency as concurrency grows.
+
+TradingView is replaced by the offline fake feed (with an artificial
+per-fetch delay) and the news providers by a canned, delayed response, so
+the numbers reflect how well the server overlaps upstream waits rather
+than network conditions. Run from the repository root:
+
+    python -m benchmarks.load_test --concurrency 1 4 16 64 --duration 10
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+
+def stub_upstreams(fetch_delay: float, news_delay: float):
+    """Point every upstream at local stubs; must run before the app is imported"""
+    os.environ['TV_FAKE_FEED'] = '1'
+    os.environ['TV_FAKE_DELAY'] = str(fetch_delay)
+    os.environ.setdefault('MODEL_STORE_DISABLED', '1')
+
+    from app.api.news_sources import news_aggregator
+
+    def fake_fetch(tickers, days=7, since=None):
+        time.sleep(news_delay)
+        now = int(time.time())
+        return {ticker: [{
+            'title': f'{ticker} headline {i}',
+            'source': 'Stub',
+            'publishedAt': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now - i * 3600)),
+            'url': f'https://example.com/{ticker}/{i}',
+            'summary': random.choice(['Shares rally on strong earnings', 'Stock falls after weak guidance',
+                                      'Company announces quarterly results'])
+        } for i in range(20)] for ticker in tickers}
+
+    news_aggregator.fetch = fake_fetch
+
+
+def start_server(app, server: str):
+    """Start the app on an ephemeral port in a background thread and return its base URL"""
+    if server == 'waitress':
+        from waitress import create_server
+        httpd = create_server(app, host='127.0.0.1', port=0, threads=64)
+        port = httpd.effective_port
+        threading.Thread(target=httpd.run, daemon=True).start()
+    else:
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        httpd = make_server('127.0.0.1', 0, app, threaded=True)
+        port = httpd.server_port
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{port}'
+
+
+def run_level(base_url: str, paths, concurrency: int, duration: float):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(seed):
+        rng = random.Random(seed)
+        local = []
+        failed = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base_url + rng.choice(paths), timeout=60) as response:
+                    response.read()
+            except (urllib.error.URLError, OSError):
+                failed += 1
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    samples = np.array(latencies) * 1000
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(samples, 50)) if len(samples) else 0.0,
+        'p99_ms': float(np.percentile(samples, 99)) if len(samples) else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per concurrency level')
+    parser.add_argument('--tickers', type=int, default=20, help='distinct tickers to spread requests over')
+    parser.add_argument('--fetch-delay', type=float, default=0.05, help='simulated TradingView latency (s)')
+    parser.add_argument('--news-delay', type=float, default=0.2, help='simulated news provider latency (s)')
+    parser.add_argument('--train-processes', type=int, default=0)
+    parser.add_argument('--server', choices=['threaded', 'waitress'], default='threaded')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    stub_upstreams(args.fetch_delay, args.news_delay)
+    from app.serve import build_app
+    base_url = start_server(build_app(args.train_processes), args.server)
+
+    tickers = [f'T{i:03d}' for i in range(args.tickers)]
+    paths = ([f'/api/stock?ticker={t}&n_bars=300' for t in tickers] +
+             [f'/api/predict?ticker={t}&n_bars=200' for t in tickers] +
+             [f'/api/news?ticker={t}' for t in tickers])
+
+    results = []
+    print(f"{'conc':>5} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for concurrency in args.concurrency:
+        result = run_level(base_url, paths, concurrency, args.duration)
+        results.append(result)
+        print(f"{result['concurrency']:>5} {result['requests']:>9} {result['errors']:>7} {result['rps']:>8.1f} "
+              f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,418 @@
+# benchmarks/suite.py
+"""Reproducible benchmarks for the data, ML and news hot paths.
+
+Everything runs offline: bars come from the synthetic OHLCV generator in
+app.api.fake_feed and news from a canned Finnhub corpus
+(benchmarks/fixtures/finnhub_company_news.json) served through a stub
+HTTP session. Results are written as JSON; pass an earlier results file
+as --baseline to flag regressions. Run from the repository root:
+
+    python -m benchmarks.suite --output benchmarks/results/current.json
+    python -m benchmarks.suite --baseline benchmarks/results/main.json --threshold 0.15
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FINNHUB_CORPUS = os.path.join(FIXTURES_DIR, "finnhub_company_news.json")
+
+# (name, group, params, setup); setup returns the zero-argument callable that gets timed
+CASES: List[tuple] = []
+
+
+def case(name: str, group: str, quick: bool = True, **params):
+    """Register a benchmark; `quick=False` cases are skipped with --quick"""
+    def decorator(setup: Callable[..., Callable]):
+        # Stacked decorators apply bottom-up; insert ahead of the setup's other cases to keep source order
+        index = next((i for i, entry in enumerate(CASES) if entry[3] is setup), len(CASES))
+        CASES.insert(index, (name, group, params, setup, quick))
+        return setup
+    return decorator
+
+
+class _CannedResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class CannedFinnhubSession:
+    """Stands in for requests.Session, answering Finnhub company-news calls from the corpus"""
+
+    def __init__(self, corpus: Dict[str, List[Dict]]):
+        self.corpus = corpus
+
+    def get(self, url, params=None, timeout=None):
+        return _CannedResponse(self.corpus.get((params or {}).get('symbol', ''), []))
+
+
+def load_corpus() -> Dict[str, List[Dict]]:
+    with open(FINNHUB_CORPUS) as f:
+        return json.load(f)
+
+
+def stub_upstreams():
+    """Point TradingView and the news providers at offline stubs; must run before the app is imported"""
+    os.environ['TV_FAKE_FEED'] = '1'
+    os.environ['TV_FAKE_DELAY'] = '0'
+    os.environ['MODEL_STORE_DISABLED'] = '1'
+    os.environ.pop('BAR_CACHE_DIR', None)
+    os.environ.pop('SENTIMENT_CACHE_PATH', None)
+
+    from app.api.news_sources import news_aggregator
+    news_aggregator.finnhub_key = 'benchmark'
+    news_aggregator.news_api_key = None
+    news_aggregator.session = CannedFinnhubSession(load_corpus())
+
+
+def bar_records(n_bars: int, symbol: str = 'BENCH', seed: int = 0) -> List[Dict]:
+    """Synthetic daily bars as the list of dicts the predictor takes"""
+    from app.api.fake_feed import generate_ohlcv
+    from app.api.serialization import add_time_column
+
+    frame = generate_ohlcv(symbol, n_bars, 86400, end_time=1_700_000_000, seed=seed).reset_index()
+    add_time_column(frame)
+    return frame.to_dict(orient='records')
+
+
+def corpus_texts(n: int, unique: bool = True) -> List[str]:
+    """n article texts from the corpus, suffixed to be distinct (cache misses) when `unique`"""
+    articles = [a for items in load_corpus().values() for a in items]
+    texts = [f"{a['headline']} {a['summary']}" for a in articles]
+    return [texts[i % len(texts)] + (f" #{i}" if unique else '') for i in range(n)]
+
+
+# --- Indicators -----------------------------------------------------------------
+
+@case('indicators', 'ml', bars=100)
+@case('indicators', 'ml', bars=1000)
+@case('indicators', 'ml', quick=False, bars=100000)
+def _indicators(bars):
+    from app.ml.model import StockMovementPredictor
+    predictor, data = StockMovementPredictor(), bar_records(bars)
+    return lambda: predictor.calculate_technical_indicators(data)
+
+
+@case('model_features', 'ml', bars=1000)
+def _model_features(bars):
+    from app.ml.model import StockMovementPredictor
+    predictor, data = StockMovementPredictor(), bar_records(bars)
+    return lambda: predictor.calculate_technical_indicators(data, predictor.get_feature_columns())
+
+
+@case('create_labels', 'ml', bars=1000)
+@case('create_labels', 'ml', quick=False, bars=100000)
+def _create_labels(bars):
+    from app.ml.model import StockMovementPredictor
+    predictor, data = StockMovementPredictor(), bar_records(bars)
+    df = predictor.calculate_technical_indicators(data, predictor.get_feature_columns())
+    return lambda: predictor.label_returns(predictor.future_returns(df))
+
+
+@case('training_set', 'ml', bars=1000)
+@case('training_set', 'ml', quick=False, bars=100000)
+def _training_set(bars):
+    from app.ml.model import StockMovementPredictor
+    predictor, data = StockMovementPredictor(), bar_records(bars)
+    return lambda: predictor.create_training_set(data)
+
+
+# --- Model ----------------------------------------------------------------------
+
+@case('train_model', 'ml', bars=100)
+@case('train_model', 'ml', bars=1000)
+def _train_model(bars):
+    from app.ml.model import StockMovementPredictor
+    data = bar_records(bars)
+    return lambda: StockMovementPredictor().train_model(data)
+
+
+@case('predict_movement', 'ml', bars=100)
+@case('predict_movement', 'ml', bars=1000)
+def _predict_movement(bars):
+    from app.ml.model import StockMovementPredictor
+    predictor, data = StockMovementPredictor(), bar_records(bars)
+    predictor.train_model(data)
+    return lambda: predictor.predict_movement(data)
+
+
+@case('forest_inference', 'ml', engine='sklearn', rows=1)
+@case('forest_inference', 'ml', engine='flat', rows=1)
+@case('forest_inference', 'ml', engine='sklearn', rows=200)
+@case('forest_inference', 'ml', engine='flat', rows=200)
+def _forest_inference(engine, rows):
+    from app.ml.model import StockMovementPredictor
+    predictor = StockMovementPredictor()
+    predictor.train_model(bar_records(1000))
+    _, X, _, _ = predictor.create_training_set(bar_records(1000, seed=1))
+    X = X[-rows:]
+    if engine == 'flat':
+        forest = predictor.flat_forest()
+        return lambda: forest.predict(X)
+    return lambda: predictor.model.predict_proba(predictor.scaler.transform(X))
+
+
+@case('evaluate_model', 'ml', bars=500)
+def _evaluate_model(bars):
+    from app.ml.model import StockMovementPredictor
+    data = bar_records(bars)
+
+    def run():
+        StockMovementPredictor().evaluate_model(data, verbose=False)
+    return run
+
+
+# --- Serialization --------------------------------------------------------------
+
+@case('timestamps_to_dict', 'data', bars=1000)
+@case('timestamps_to_dict', 'data', bars=10000)
+def _timestamps_to_dict(bars):
+    from app.api.fake_feed import generate_ohlcv
+    from app.api.serialization import add_time_column
+    frame = generate_ohlcv('BENCH', bars, 86400, end_time=1_700_000_000)
+
+    def run():
+        data = frame.reset_index()
+        add_time_column(data)
+        return data.to_dict(orient='records')
+    return run
+
+
+# --- Sentiment ------------------------------------------------------------------
+
+@case('analyze_batch_cold', 'news', texts=10)
+@case('analyze_batch_cold', 'news', texts=100)
+@case('analyze_batch_cold', 'news', texts=1000)
+def _analyze_batch_cold(texts):
+    from app.ml.model import SentimentAnalyzer, get_sentiment_analyzer
+    from app.ml.sentiment_cache import SentimentCache
+    batch = corpus_texts(texts)
+    # A fresh cache per call so every text is scored by the backend
+    return lambda: SentimentAnalyzer(cache=SentimentCache(), backend=get_sentiment_analyzer().backend).analyze_batch(batch)
+
+
+@case('analyze_batch_cached', 'news', texts=1000)
+def _analyze_batch_cached(texts):
+    from app.ml.model import SentimentAnalyzer, get_sentiment_analyzer
+    from app.ml.sentiment_cache import SentimentCache
+    analyzer = SentimentAnalyzer(cache=SentimentCache(), backend=get_sentiment_analyzer().backend)
+    batch = corpus_texts(texts)
+    analyzer.analyze_batch(batch)
+    return lambda: analyzer.analyze_batch(batch)
+
+
+# --- Endpoints (Flask test client, stubbed upstreams) ----------------------------
+
+def _endpoint(path: str, warm: bool = True):
+    from app.main import app
+    client = app.test_client()
+    if warm:
+        # Fill the bar cache, model registry and sentiment cache so steady-state serving is measured
+        client.get(path)
+
+    def run():
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status_code)
+        return response.data
+    return run
+
+
+@case('endpoint_stock', 'endpoints', bars=500)
+def _endpoint_stock(bars):
+    return _endpoint(f'/api/stock?ticker=AAPL&n_bars={bars}')
+
+
+@case('endpoint_stock_columns_gzip', 'endpoints', bars=500)
+def _endpoint_stock_columns(bars):
+    return _endpoint(f'/api/stock?ticker=AAPL&n_bars={bars}&format=columns&compress=gzip')
+
+
+@case('endpoint_predict', 'endpoints', bars=200)
+def _endpoint_predict(bars):
+    return _endpoint(f'/api/predict?ticker=MSFT&n_bars={bars}')
+
+
+@case('endpoint_predict_batch', 'endpoints', tickers=4)
+def _endpoint_predict_batch(tickers):
+    symbols = ','.join(['AAPL', 'MSFT', 'NVDA', 'TSLA'][:tickers])
+    return _endpoint(f'/api/predict/batch?tickers={symbols}&stream=0')
+
+
+@case('endpoint_news', 'endpoints', tickers=1)
+def _endpoint_news(tickers):
+    return _endpoint('/api/news?ticker=NVDA')
+
+
+# --- Streaming ------------------------------------------------------------------
+
+@case('stream_bar', 'streaming', subscribers=1)
+@case('stream_bar', 'streaming', subscribers=100)
+def _stream_bar(subscribers):
+    from app.api.bar_stream import BarStreamHub
+    from app.api.fake_feed import FakeBarSource
+    from app.ml.model import StockMovementPredictor
+    source = FakeBarSource(speed=0, start=1_700_000_000)
+
+    def predictor_for(ticker, interval, records):
+        predictor = StockMovementPredictor()
+        predictor.train_model(records)
+        return predictor
+
+    hub = BarStreamHub(source.fetch, predictor_for, seed_bars=300, max_queue=1, clock=source.now)
+    clients = [hub.subscribe('BENCH', '1m') for _ in range(subscribers)]
+    for client in clients:
+        # Each subscriber starts with the latest bar
+        client.events.get_nowait()
+
+    def run():
+        # One closed 1m bar: upstream fetch, incremental indicators, prediction and fan-out
+        source.advance(60)
+        hub.poll()
+        for client in clients:
+            client.events.get_nowait()
+    return run
+
+
+# --- Cold start (fresh interpreter per call) ------------------------------------
+
+COLD_START_SCRIPTS = {
+    # What a worker pays to boot and import the app
+    'import': 'import app.main',
+    # Boot plus the optional deploy-time warm-up
+    'warm_up': 'import app.main; app.main.warm_up()',
+    # Boot, then the first prediction request with everything loaded on demand
+    'first_predict': ('import app.main; client = app.main.app.test_client(); '
+                      'assert client.get("/api/predict?ticker=AAPL").status_code == 200'),
+}
+
+
+@case('cold_start', 'startup', stage='import')
+@case('cold_start', 'startup', stage='warm_up')
+@case('cold_start', 'startup', quick=False, stage='first_predict')
+def _cold_start(stage):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    command = [sys.executable, '-c', COLD_START_SCRIPTS[stage]]
+    # Runs with the stubbed-upstream environment set by stub_upstreams()
+    return lambda: subprocess.run(command, cwd=root, check=True)
+
+
+def measure(fn: Callable, repeat: int, min_sample: float = 0.05) -> Dict:
+    """Time fn() per call: one warm-up call, then `repeat` samples of enough calls to last min_sample seconds"""
+    started = time.perf_counter()
+    fn()
+    once = time.perf_counter() - started
+    loops = max(1, int(min_sample / once)) if once > 0 else 1000
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - started) / loops)
+    return {
+        'median_s': statistics.median(samples),
+        'min_s': min(samples),
+        'max_s': max(samples),
+        'loops': loops,
+        'repeat': repeat,
+    }
+
+
+def case_id(name: str, params: Dict) -> str:
+    return name + ''.join(f'[{key}={value}]' for key, value in sorted(params.items()))
+
+
+def environment() -> Dict:
+    import numpy
+    import pandas
+    import sklearn
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'sklearn': sklearn.__version__,
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Return the ids of cases whose median slowed down by more than `threshold` (e.g. 0.15 = 15%)"""
+    regressions = []
+    for cid, result in results.items():
+        previous = baseline.get(cid)
+        if previous is None:
+            continue
+        result['baseline_median_s'] = previous['median_s']
+        result['change'] = result['median_s'] / previous['median_s'] - 1
+        if result['change'] > threshold:
+            regressions.append(cid)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', help='results JSON from an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15, help='slowdown that counts as a regression')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--quick', action='store_true', help='skip the slowest cases and take fewer samples')
+    parser.add_argument('--filter', default='', help='only run cases whose id contains this text')
+    args = parser.parse_args()
+
+    stub_upstreams()
+    repeat = 3 if args.quick else args.repeat
+
+    results = {}
+    print(f"{'case':<48} {'median':>12} {'min':>12}")
+    for name, group, params, setup, quick in CASES:
+        cid = case_id(name, params)
+        if (args.quick and not quick) or args.filter not in cid:
+            continue
+        result = measure(setup(**params), repeat)
+        result.update({'name': name, 'group': group, 'params': params})
+        results[cid] = result
+        print(f"{cid:<48} {result['median_s'] * 1000:>10.3f}ms {result['min_s'] * 1000:>10.3f}ms", flush=True)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.threshold)
+        print(f"\n{'case':<48} {'baseline':>12} {'current':>12} {'change':>8}")
+        for cid, result in results.items():
+            if 'change' in result:
+                flag = '  REGRESSION' if cid in regressions else ''
+                print(f"{cid:<48} {result['baseline_median_s'] * 1000:>10.3f}ms "
+                      f"{result['median_s'] * 1000:>10.3f}ms {result['change']:>+7.1%}{flag}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
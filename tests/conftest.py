@@ -0,0 +1,11 @@
+# conftest.py
+import os
+import tempfile
+
+# Point the app at offline stand-ins before anything imports it
+os.environ['TV_FAKE_FEED'] = '1'
+os.environ['MODEL_STORE_DISABLED'] = '1'
+os.environ.pop('BAR_CACHE_DIR', None)
+os.environ.pop('SENTIMENT_CACHE_PATH', None)
+os.environ['BAR_STORE_DIR'] = tempfile.mkdtemp(prefix='bar-store-')
+os.environ['TUNING_DIR'] = tempfile.mkdtemp(prefix='tuning-')
@@ -1 +1,45 @@
 # test_api.py
+import pytest
+
+from app.main import app
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+@pytest.mark.parametrize('body', [
+    {'tickers': [123]},
+    {'tickers': {'AAPL': 1}},
+    {'tickers': ['AAPL'], 'intervals': 7},
+    {'tickers': ['AAPL'], 'n_bars': 'abc'},
+])
+def test_predict_batch_rejects_malformed_bodies(client, body):
+    response = client.post('/api/predict/batch', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_predict_batch_accepts_comma_separated_tickers(client):
+    response = client.post('/api/predict/batch', json={'tickers': 'AAPL,MSFT', 'stream': False})
+    assert response.status_code == 200
+    assert sorted(result['ticker'] for result in response.get_json()['results']) == ['AAPL', 'MSFT']
+
+
+def test_backtest_rejects_overlapping_test_windows(client):
+    response = client.get('/api/backtest?ticker=AAPL&test_size=20&step=10')
+    assert response.status_code == 400
+    assert 'step' in response.get_json()['error']
+
+
+def test_evaluate_returns_the_metrics(client):
+    response = client.get('/api/evaluate?ticker=AAPL&n_bars=300')
+    assert response.status_code == 200
+    assert set(response.get_json()['metrics']) == {'accuracy', 'precision', 'recall', 'f1'}
+
+
+def test_tune_rejects_unknown_algorithms(client):
+    response = client.get('/api/tune?ticker=AAPL&algorithms=random_forest,quantum')
+    assert response.status_code == 400
+    assert 'random_forest' in response.get_json()['error']
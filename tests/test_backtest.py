@@ -0,0 +1,46 @@
+# test_backtest.py
+import numpy as np
+import pytest
+
+from app.api.fake_feed import generate_ohlcv
+from app.ml.backtest import backtest, signal_pnl, walk_forward_splits
+
+
+def history(n_bars=400):
+    frame = generate_ohlcv('AAPL', n_bars, 86400, end_time=1_700_000_000)
+    return [{'time': int(ts.timestamp()), **row} for ts, row in frame.iterrows()]
+
+
+def test_test_windows_must_not_overlap():
+    with pytest.raises(ValueError):
+        walk_forward_splits(500, 250, 20, step=10)
+
+    splits = walk_forward_splits(500, 250, 20, gap=5)
+    for previous, current in zip(splits, splits[1:]):
+        assert current['test_start'] >= previous['test_end']
+
+
+def test_summary_scores_the_concatenated_out_of_sample_returns():
+    result = backtest(history(), train_size=200, test_size=20, n_jobs=1)
+    folds, summary = result['folds'], result['summary']
+    assert summary['folds'] == len(folds) > 1
+
+    # Non-overlapping windows compound to the same total as the folds taken one after another
+    compounded = np.prod([1 + fold['pnl']['total_return'] for fold in folds]) - 1
+    assert summary['total_return'] == pytest.approx(compounded)
+    held = np.prod([1 + fold['pnl']['buy_and_hold_return'] for fold in folds]) - 1
+    assert summary['buy_and_hold_return'] == pytest.approx(held)
+    assert summary['max_drawdown'] <= min(fold['pnl']['max_drawdown'] for fold in folds)
+
+
+def test_signal_pnl_charges_costs_on_position_changes():
+    predictions = np.array(['Bullish', 'Bullish', 'Bearish', 'Neutral'])
+    next_return = np.array([0.01, 0.02, -0.01, 0.05])
+
+    free = signal_pnl(predictions, next_return)
+    assert free['total_return'] == pytest.approx(1.01 * 1.02 * 1.01 - 1)
+    assert free['trades'] == 3
+    assert free['exposure'] == pytest.approx(0.75)
+
+    costly = signal_pnl(predictions, next_return, cost_bps=10)
+    assert costly['total_return'] < free['total_return']
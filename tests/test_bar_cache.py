@@ -0,0 +1,61 @@
+# test_bar_cache.py
+import os
+
+from app.api.bar_cache import BarCache
+from app.api.fake_feed import generate_ohlcv
+
+NOW = 1_700_000_000
+
+
+class CountingFetch:
+    """Fake upstream for one symbol that records how many bars each call asked for"""
+
+    def __init__(self, symbol: str = 'AAPL', step: int = 60):
+        self.symbol = symbol
+        self.step = step
+        self.now = NOW
+        self.counts = []
+
+    def __call__(self, count):
+        self.counts.append(count)
+        return generate_ohlcv(self.symbol, count, self.step, end_time=self.now)
+
+
+def test_repeat_requests_are_served_from_memory_until_the_bar_closes():
+    cache, fetch = BarCache(), CountingFetch()
+    first = cache.get('AAPL', 'NASDAQ', '1m', 100, fetch, now=NOW)
+    second = cache.get('AAPL', 'NASDAQ', '1m', 50, fetch, now=NOW + 1)
+
+    assert fetch.counts == [100]
+    assert second.equals(first.tail(50))
+    assert cache.stats()['hits'] == 1
+
+
+def test_expired_entry_fetches_only_the_new_tail():
+    cache, fetch = BarCache(), CountingFetch()
+    cache.get('AAPL', 'NASDAQ', '1m', 100, fetch, now=NOW)
+
+    fetch.now = NOW + 180
+    data = cache.get('AAPL', 'NASDAQ', '1m', 100, fetch, now=fetch.now)
+
+    assert fetch.counts[1] < 10
+    assert data.equals(generate_ohlcv('AAPL', 100, 60, end_time=fetch.now))
+
+
+def test_invalidate_removes_persisted_entries(tmp_path):
+    cache_dir = str(tmp_path)
+    cache = BarCache(cache_dir=cache_dir)
+    cache.get('AAPL', 'NASDAQ', '1m', 10, CountingFetch('AAPL'), now=NOW)
+    cache.get('MSFT', 'NASDAQ', '1m', 10, CountingFetch('MSFT'), now=NOW)
+    assert len(os.listdir(cache_dir)) == 2
+
+    cache.invalidate('aapl')
+    assert [name.split('_')[0] for name in os.listdir(cache_dir)] == ['MSFT']
+
+    # A fresh cache over the same directory no longer finds the invalidated symbol
+    fetch = CountingFetch('AAPL')
+    BarCache(cache_dir=cache_dir).get('AAPL', 'NASDAQ', '1m', 10, fetch, now=NOW)
+    assert fetch.counts == [10]
+
+    cache.invalidate()
+    assert os.listdir(cache_dir) == []
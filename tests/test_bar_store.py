@@ -0,0 +1,34 @@
+# test_bar_store.py
+import numpy as np
+
+from app.api.fake_feed import generate_ohlcv
+from app.data.bar_store import BarStore
+
+END = 1_700_000_000
+
+
+def test_appends_skip_stored_bars_and_replace_the_forming_one(tmp_path):
+    store = BarStore(str(tmp_path))
+    assert store.append('aapl', 'nasdaq', '1m', generate_ohlcv('AAPL', 100, 60, end_time=END)) == 100
+
+    # The overlap is dropped, the last stored bar is rewritten and three new bars land after it
+    later = generate_ohlcv('AAPL', 10, 60, end_time=END + 180)
+    later.iloc[-4, later.columns.get_loc('close')] = -1.0
+    assert store.append('AAPL', 'NASDAQ', '1m', later) == 3
+
+    frame = store.read_frame('AAPL', 'NASDAQ', '1m')
+    assert len(frame) == store.rows('AAPL', 'NASDAQ', '1m') == 103
+    assert np.all(np.diff(frame['time']) == 60)
+    assert frame['close'].iloc[-4] == -1.0
+
+
+def test_reads_slice_by_time(tmp_path):
+    store = BarStore(str(tmp_path))
+    bars = generate_ohlcv('AAPL', 100, 60, end_time=END)
+    store.append('AAPL', 'NASDAQ', '1m', bars)
+    times = store.read('AAPL', 'NASDAQ', '1m')['time']
+
+    window = store.read('AAPL', 'NASDAQ', '1m', start=int(times[10]), end=int(times[20]))
+    assert list(window['time']) == list(times[10:20])
+    assert len(store.read('AAPL', 'NASDAQ', '1m', last=5)['close']) == 5
+    assert store.read('MSFT', 'NASDAQ', '1m') is None
@@ -0,0 +1,190 @@
+# test_bar_stream.py
+import queue
+
+import pandas as pd
+import pytest
+
+from app.api.bar_stream import BarStreamHub, sse_events
+from app.api.fake_feed import FakeBarSource
+
+START = 1_700_000_000
+
+
+@pytest.fixture
+def source():
+    return FakeBarSource(speed=0, start=START)
+
+
+def make_hub(fetch, source, **kwargs):
+    # A long poll interval keeps the background poller idle; tests drive poll() themselves
+    options = {'seed_bars': 120, 'poll_interval': 3600, 'max_queue': 4, 'replay': 50}
+    options.update(kwargs)
+    return BarStreamHub(fetch, clock=source.now, **options)
+
+
+def drain(subscriber):
+    events = []
+    while True:
+        try:
+            events.append(subscriber.events.get_nowait())
+        except queue.Empty:
+            return events
+
+
+def test_subscribers_share_one_fetch_and_receive_the_same_deltas(source):
+    hub = make_hub(source.fetch, source)
+    first, second = hub.subscribe('aapl', '1m'), hub.subscribe('AAPL', '1m')
+    assert source.calls == 1
+
+    latest = drain(first)
+    assert latest == drain(second)
+    assert len(latest) == 1
+
+    for _ in range(3):
+        source.advance(60)
+        hub.poll()
+    assert source.calls == 4
+
+    events = drain(first)
+    assert events == drain(second)
+    assert [event['id'] for event in events] == [latest[0]['id'] + 60 * n for n in (1, 2, 3)]
+    assert all(set(event['bar']) == {'time', 'open', 'high', 'low', 'close', 'volume'} for event in events)
+
+
+def test_forming_bar_is_not_published(source):
+    hub = make_hub(source.fetch, source)
+    subscriber = hub.subscribe('AAPL', '1m')
+    drain(subscriber)
+
+    # Half a bar later the newest bar is still forming
+    source.advance(30)
+    hub.poll()
+    assert drain(subscriber) == []
+
+    source.advance(30)
+    hub.poll()
+    assert len(drain(subscriber)) == 1
+
+
+@pytest.mark.parametrize('offset_hours', [-5, 9])
+def test_local_time_stamps_do_not_change_what_counts_as_closed(source, offset_hours):
+    # tvDatafeed stamps bars in the host's local time
+    def fetch(ticker, interval, n_bars):
+        frame = source.fetch(ticker, interval, n_bars)
+        frame.index = frame.index + pd.Timedelta(hours=offset_hours)
+        return frame
+
+    hub = make_hub(fetch, source)
+    subscriber = hub.subscribe('AAPL', '1m')
+    drain(subscriber)
+
+    source.advance(30)
+    hub.poll()
+    assert drain(subscriber) == []
+
+    source.advance(30)
+    hub.poll()
+    assert len(drain(subscriber)) == 1
+
+
+def test_slow_subscriber_is_disconnected_without_affecting_others(source):
+    hub = make_hub(source.fetch, source, max_queue=2)
+    fast, slow = hub.subscribe('AAPL', '1m'), hub.subscribe('AAPL', '1m')
+
+    received = drain(fast)
+    for _ in range(4):
+        source.advance(60)
+        hub.poll()
+        received += drain(fast)
+
+    assert len(received) == 5
+    assert slow.overflowed
+    assert hub.stats()['overflows'] == 1
+    assert hub.stats()['feeds']['AAPL:1m']['subscribers'] == 1
+
+    frames = list(sse_events(hub, slow, heartbeat=0.01))
+    assert frames[0].startswith('retry:')
+    assert frames[-1].startswith('event: overflow')
+    assert sum(frame.startswith('id:') for frame in frames) == 3
+
+
+def test_last_event_id_replays_missed_bars(source):
+    hub = make_hub(source.fetch, source, max_queue=2)
+    subscriber = hub.subscribe('AAPL', '1m')
+    last_seen = drain(subscriber)[-1]['id']
+
+    for _ in range(6):
+        source.advance(60)
+        hub.poll()
+        drain(subscriber)
+
+    # Reconnecting replays everything after the last event the client saw, even past the queue bound
+    resumed = hub.subscribe('AAPL', '1m', last_event_id=last_seen)
+    assert [event['id'] for event in drain(resumed)] == [last_seen + 60 * n for n in range(1, 7)]
+
+
+@pytest.mark.parametrize('overflow', [False, True])
+def test_sole_subscriber_reconnect_replays_missed_bars(source, overflow):
+    hub = make_hub(source.fetch, source, max_queue=2)
+    subscriber = hub.subscribe('AAPL', '1m')
+    last_seen = drain(subscriber)[-1]['id']
+
+    # The only subscriber leaves, either by disconnecting or by falling behind, and its feed is dropped
+    if overflow:
+        for _ in range(4):
+            source.advance(60)
+            hub.poll()
+        assert subscriber.overflowed
+    else:
+        hub.unsubscribe(subscriber)
+    assert ('AAPL', '1m') not in hub._feeds
+
+    source.advance(120)
+    resumed = hub.subscribe('AAPL', '1m', last_event_id=last_seen)
+    missed = 6 if overflow else 2
+    assert [event['id'] for event in drain(resumed)] == [last_seen + 60 * n for n in range(1, missed + 1)]
+
+
+def test_subscribe_does_not_join_a_dropped_feed(source):
+    hub = make_hub(source.fetch, source)
+    first = hub.subscribe('AAPL', '1m')
+    dropped = hub._feeds[('AAPL', '1m')]
+    create_feed = hub._get_or_create_feed
+    calls = []
+
+    def racing_create(ticker, interval):
+        # The first lookup hands back the feed just as its last subscriber leaves
+        calls.append(ticker)
+        if len(calls) == 1:
+            hub.unsubscribe(first)
+            return dropped
+        return create_feed(ticker, interval)
+
+    hub._get_or_create_feed = racing_create
+    second = hub.subscribe('AAPL', '1m')
+
+    feed = hub._feeds[('AAPL', '1m')]
+    assert feed is not dropped
+    assert feed.subscribers == [second]
+    source.advance(60)
+    hub.poll()
+    assert len(drain(second)) == 2
+
+
+def test_events_carry_the_models_prediction(source):
+    from app.ml.model import StockMovementPredictor
+
+    def predictor_for(ticker, interval, records):
+        predictor = StockMovementPredictor()
+        assert predictor.train_model(records)
+        return predictor
+
+    hub = make_hub(source.fetch, source, seed_bars=300, predictor_for=predictor_for)
+    subscriber = hub.subscribe('AAPL', '1m')
+    source.advance(60)
+    hub.poll()
+
+    for event in drain(subscriber):
+        prediction = event['prediction']
+        assert prediction['prediction'] in ('Bullish', 'Bearish', 'Neutral')
+        assert prediction['confidence'] == pytest.approx(max(prediction['probabilities'].values()))
@@ -0,0 +1,36 @@
+# test_features.py
+import numpy as np
+
+from app.api.fake_feed import generate_ohlcv
+from app.ml.feature_registry import feature_registry
+from app.ml.features import compute_panel_features, stack_panel
+from app.ml.model import StockMovementPredictor
+
+BARS = generate_ohlcv('AAPL', 300, 86400, end_time=1_700_000_000)
+
+
+def test_rows_inside_the_warm_up_are_nan():
+    features = feature_registry.compute({field: BARS[field] for field in BARS.columns})
+    for name, values in features.items():
+        warmup = feature_registry.warmup(name)
+        if feature_registry[name].integer:
+            continue
+        assert values.iloc[:warmup].isna().all(), name
+        assert values.iloc[warmup:].notna().all(), name
+
+
+def test_panel_symbols_warm_up_from_their_own_first_bar():
+    short = generate_ohlcv('MSFT', 100, 86400, end_time=1_700_000_000)
+    panel, symbols, _ = stack_panel({'AAPL': BARS, 'MSFT': short})
+    macd = compute_panel_features(panel, ['macd_signal'])['macd_signal']
+    on_its_own = compute_panel_features(stack_panel({'MSFT': short})[0], ['macd_signal'])['macd_signal']
+
+    np.testing.assert_array_equal(macd[-100:, symbols.index('MSFT')], on_its_own[:, 0])
+
+
+def test_training_rows_start_after_the_slowest_warm_up():
+    predictor = StockMovementPredictor()
+    records = [{'time': int(ts.timestamp()), **row} for ts, row in BARS.iterrows()]
+    _, _, _, mask = predictor.create_training_set(records)
+    assert not mask[:predictor.warmup_bars()].any()
+    assert mask[predictor.warmup_bars()]
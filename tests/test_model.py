@@ -0,0 +1,64 @@
+# test_model.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.api.fake_feed import generate_ohlcv
+from app.ml.model import StockMovementPredictor
+
+
+def loop_labels(future_returns):
+    """The per-row labelling label_returns replaced"""
+    labels = []
+    for return_val in future_returns:
+        if pd.isna(return_val):
+            labels.append('Neutral')
+        elif return_val > 0.02:
+            labels.append('Bullish')
+        elif return_val < -0.02:
+            labels.append('Bearish')
+        else:
+            labels.append('Neutral')
+    return labels
+
+
+def records(frame):
+    return [{'time': int(ts.timestamp()), **row} for ts, row in frame.iterrows()]
+
+
+def test_label_returns_match_the_row_loop():
+    rng = np.random.default_rng(0)
+    returns = np.concatenate([
+        rng.normal(0, 0.03, 1000),
+        [np.nan, 0.02, -0.02, np.nextafter(0.02, 1), np.nextafter(-0.02, -1), 0.0, np.inf, -np.inf],
+    ])
+    labels = StockMovementPredictor().label_returns(returns)
+    assert list(labels) == loop_labels(returns)
+    assert all(type(label) is str for label in labels)
+
+
+def test_thresholds_are_configurable():
+    predictor = StockMovementPredictor(bullish_threshold=0.0, bearish_threshold=-0.05)
+    assert list(predictor.label_returns(np.array([0.001, -0.01, -0.06]))) == ['Bullish', 'Neutral', 'Bearish']
+
+
+@pytest.mark.parametrize('gaps', [[], [120, 121, 180], [60, 200, 201, 202]])
+def test_training_rows_keep_features_and_labels_aligned(gaps):
+    frame = generate_ohlcv('AAPL', 300, 86400, end_time=1_700_000_000)
+    # Missing volumes blank the volume features for the following window, in the middle of the history
+    frame.iloc[gaps, frame.columns.get_loc('volume')] = np.nan
+    predictor = StockMovementPredictor()
+    df, X, y, mask = predictor.create_training_set(records(frame))
+
+    # The old path: drop incomplete feature rows, then look each kept row's label up by index
+    columns = predictor.get_feature_columns()
+    future = df['close'].shift(-predictor.horizon) / df['close'] - 1
+    kept = df[columns].dropna().index
+    kept = kept[future.loc[kept].notna()]
+    labels = loop_labels(future)
+
+    assert list(np.flatnonzero(mask)) == list(kept)
+    np.testing.assert_array_equal(X, df.loc[kept, columns].to_numpy())
+    assert list(y) == [labels[i] for i in kept]
+    if gaps:
+        assert not mask[gaps].any()
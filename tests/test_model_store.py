@@ -0,0 +1,46 @@
+# test_model_store.py
+import numpy as np
+
+from app.api.fake_feed import generate_ohlcv
+from app.ml.model import StockMovementPredictor
+from app.ml.model_store import ModelStore
+
+BARS = [{'time': int(ts.timestamp()), **row}
+        for ts, row in generate_ohlcv('AAPL', 300, 86400, end_time=1_700_000_000).iterrows()]
+
+
+def fitted():
+    predictor = StockMovementPredictor()
+    assert predictor.train_model(BARS)
+    return predictor
+
+
+def test_loaded_model_predicts_like_the_saved_one(tmp_path):
+    store, predictor = ModelStore(str(tmp_path)), fitted()
+    store.save('aapl', '1d', 'abc', predictor)
+
+    loaded = store.load('AAPL', '1d', 'abc')
+    assert loaded.is_trained
+    _, X, _, _ = predictor.create_training_set(BARS)
+    np.testing.assert_array_equal(loaded.model.predict_proba(loaded.scaler.transform(X)),
+                                  predictor.model.predict_proba(predictor.scaler.transform(X)))
+    assert store.load('AAPL', '1d', 'other') is None
+
+
+def test_old_versions_are_pruned_and_the_newest_is_loaded(tmp_path):
+    store, predictor = ModelStore(str(tmp_path), keep_versions=2), fitted()
+    for fingerprint in ('one', 'two', 'three'):
+        store.save('AAPL', '1d', fingerprint, predictor)
+
+    assert [meta['fingerprint'] for meta in store.list_versions('AAPL', '1d')] == ['three', 'two']
+    assert store.load('AAPL', '1d', 'one') is None
+    assert store.load('AAPL', '1d') is not None
+
+
+def test_models_trained_on_other_features_are_ignored(tmp_path):
+    store = ModelStore(str(tmp_path))
+    store.save('AAPL', '1d', 'abc', fitted())
+
+    def narrower():
+        return StockMovementPredictor(feature_columns=['rsi', 'macd'])
+    assert store.load('AAPL', '1d', factory=narrower) is None
@@ -0,0 +1,44 @@
+# test_registry.py
+from app.api.fake_feed import generate_ohlcv
+from app.ml.model_store import ModelStore
+from app.ml.registry import ModelRegistry, data_fingerprint
+from app.ml.tuning import TunedPredictorFactory
+
+
+def history(n_bars=300, end_time=1_700_000_000):
+    frame = generate_ohlcv('AAPL', n_bars, 86400, end_time=end_time)
+    return [{'time': int(ts.timestamp()), **row} for ts, row in frame.iterrows()]
+
+
+def test_fits_on_the_same_bars_are_reused():
+    registry, data = ModelRegistry(), history()
+    first = registry.get_or_train('AAPL', '1d', data)
+    assert registry.get_or_train('aapl', '1d', data) is first
+    assert registry.stats()['trained'] == 1
+    assert registry.stats()['hits'] == 1
+
+
+def test_stored_fit_is_loaded_after_a_restart(tmp_path):
+    data = history()
+    ModelRegistry(store=ModelStore(str(tmp_path))).get_or_train('AAPL', '1d', data)
+
+    restarted = ModelRegistry(store=ModelStore(str(tmp_path)))
+    assert restarted.get_or_train('AAPL', '1d', data) is not None
+    assert restarted.stats()['loaded'] == 1
+    assert restarted.stats()['trained'] == 0
+
+
+def test_tuned_fits_are_not_loaded_as_the_default_model_after_a_restart(tmp_path):
+    store, data = ModelStore(str(tmp_path)), history()
+    registry = ModelRegistry(store=store)
+    registry.set_factory('AAPL', '1d', TunedPredictorFactory('logistic_regression', {'C': 0.5}))
+    tuned = registry.get_or_train('AAPL', '1d', data)
+    assert type(tuned.model).__name__ == 'LogisticRegression'
+    assert store.list_versions('AAPL', '1d') == []
+
+    # Without the override the restarted registry trains its own default model
+    restarted = ModelRegistry(store=ModelStore(str(tmp_path)))
+    predictor = restarted.get_or_train('AAPL', '1d', data)
+    assert type(predictor.model).__name__ != 'LogisticRegression'
+    assert restarted.stats()['loaded'] == 0
+    assert restarted.get('AAPL', '1d', data_fingerprint(data)) is predictor
@@ -0,0 +1,48 @@
+# test_sentiment_backends.py
+import threading
+
+from app.ml.sentiment_backends import TransformerBackend
+
+
+class RecordingPipeline:
+    """Stands in for a transformers pipeline, recording the size of every forward pass"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts, batch_size=None, truncation=None):
+        self.batches.append(len(texts))
+        return [{'label': 'POSITIVE' if 'up' in text else 'NEGATIVE', 'score': 0.9} for text in texts]
+
+
+def make_backend(max_batch=32, max_wait=0.2):
+    backend = TransformerBackend(max_batch=max_batch, max_wait=max_wait)
+    backend._pipeline = RecordingPipeline()
+    return backend
+
+
+def test_concurrent_batches_share_forward_passes():
+    backend = make_backend()
+    results = {}
+
+    def score(name, texts):
+        results[name] = backend.score_batch(texts)
+
+    threads = [threading.Thread(target=score, args=(name, [f'{name} up {i}' for i in range(10)]))
+               for name in ('AAPL', 'MSFT')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {'AAPL': [0.9] * 10, 'MSFT': [0.9] * 10}
+    assert backend._pipeline.batches == [20]
+
+
+def test_large_batch_is_split_at_max_batch():
+    backend = make_backend(max_batch=8, max_wait=0.01)
+    scores = backend.score_batch([f'down {i}' for i in range(20)])
+
+    assert scores == [-0.9] * 20
+    assert backend._pipeline.batches == [8, 8, 4]
+    assert backend.score('up') == 0.9
@@ -0,0 +1,52 @@
+# test_sentiment_cache.py
+import os
+import threading
+
+from app.ml.sentiment_cache import SentimentCache
+
+
+def test_scores_persist_for_the_same_namespace_only(tmp_path):
+    path = str(tmp_path / 'sentiment.json')
+    cache = SentimentCache(path=path)
+    cache.put('Shares rose after strong earnings', 0.6)
+    cache.save()
+
+    assert SentimentCache(path=path).get('Shares rose after strong earnings') == 0.6
+    assert SentimentCache(path=path, namespace='transformer').get('Shares rose after strong earnings') is None
+
+
+def test_concurrent_saves_leave_one_complete_file(tmp_path):
+    path = str(tmp_path / 'sentiment.json')
+    cache = SentimentCache(path=path, persist_every=10 ** 9)
+    for i in range(2000):
+        cache.put(f'headline {i}', i / 2000)
+
+    threads = [threading.Thread(target=cache.save) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert os.listdir(tmp_path) == ['sentiment.json']
+    assert SentimentCache(path=path).stats()['size'] == 2000
+
+
+def test_invalidate_is_not_undone_by_a_concurrent_save(tmp_path):
+    path = str(tmp_path / 'sentiment.json')
+    cache = SentimentCache(path=path, persist_every=10 ** 9)
+    for i in range(2000):
+        cache.put(f'headline {i}', i / 2000)
+
+    saver = threading.Thread(target=cache.save)
+    saver.start()
+    cache.invalidate()
+    saver.join()
+
+    # Whichever runs first, nothing from before the invalidation is left on disk
+    assert SentimentCache(path=path).stats()['size'] == 0
+
+
+def test_invalidate_without_a_file(tmp_path):
+    cache = SentimentCache(path=str(tmp_path / 'missing.json'))
+    cache.invalidate('transformer')
+    assert cache.namespace == 'transformer'
@@ -0,0 +1,27 @@
+# test_tuning.py
+import os
+
+import numpy as np
+
+from app.ml.tuning import _score_fold
+
+
+def write_matrix(path, y):
+    rng = np.random.default_rng(0)
+    np.save(os.path.join(path, 'X.npy'), rng.normal(size=(len(y), 4)))
+    np.save(os.path.join(path, 'y.npy'), np.array(y))
+    return {'X': os.path.join(path, 'X.npy'), 'y': os.path.join(path, 'y.npy'), 'lookahead': 0}
+
+
+def test_single_class_fold_scores_zero_instead_of_raising(tmp_path):
+    # The first fold only ever sees Neutral labels, which LogisticRegression refuses to fit
+    labels = ['Neutral'] * 40 + ['Bullish', 'Bearish'] * 40
+    matrix = write_matrix(str(tmp_path), labels)
+
+    failed = _score_fold(matrix, 'logistic_regression', {}, len(labels), 4, 0)
+    assert failed['f1'] == 0.0
+    assert 'error' in failed
+
+    scored = _score_fold(matrix, 'logistic_regression', {}, len(labels), 4, 3)
+    assert 'error' not in scored
+    assert scored['f1'] > 0.0
@@ -0,0 +1,85 @@
+# test_tv_pool.py
+import threading
+
+import pytest
+
+from app.api.fake_feed import FakeTvDatafeed
+from app.api.tv_pool import TvSessionPool
+
+
+class CountingFeed(FakeTvDatafeed):
+    """Fake feed that records how many fetches are in flight at once"""
+
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+
+    def get_hist(self, *args, **kwargs):
+        with CountingFeed.lock:
+            CountingFeed.active += 1
+            CountingFeed.peak = max(CountingFeed.peak, CountingFeed.active)
+        try:
+            return super().get_hist(*args, **kwargs)
+        finally:
+            with CountingFeed.lock:
+                CountingFeed.active -= 1
+
+
+def test_concurrent_fetches_are_capped():
+    CountingFeed.active = CountingFeed.peak = 0
+    pool = TvSessionPool(factory=lambda: CountingFeed(fetch_delay=0.05), max_sessions=2)
+
+    threads = [threading.Thread(target=pool.get_hist, args=('AAPL', 'NASDAQ', '1D', 10)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert CountingFeed.peak == 2
+    stats = pool.stats()
+    assert stats['requests'] == 6
+    assert stats['logins'] <= 2
+    assert stats['in_use'] == 0
+
+
+def test_idle_session_is_reused_until_it_expires():
+    pool = TvSessionPool(factory=FakeTvDatafeed, session_ttl=3600.0)
+    pool.get_hist('AAPL', 'NASDAQ', '1D', 10)
+    pool.get_hist('AAPL', 'NASDAQ', '1D', 10)
+    assert pool.stats()['logins'] == 1
+    assert pool.stats()['hits'] == 1
+
+    pool.session_ttl = 0.0
+    pool.get_hist('AAPL', 'NASDAQ', '1D', 10)
+    stats = pool.stats()
+    assert stats['expired'] == 1
+    assert stats['logins'] == 2
+
+
+def test_stale_session_relogs_in_once():
+    pool = TvSessionPool(factory=FakeTvDatafeed)
+    with pool.session() as client:
+        stale = client
+    stale.expired = True
+
+    data = pool.get_hist('AAPL', 'NASDAQ', '1D', 10)
+
+    assert data is not None and len(data) == 10
+    stats = pool.stats()
+    assert stats['relogins'] == 1
+    assert stats['logins'] == 2
+    # The replacement session goes back to the pool, not the stale one
+    with pool.session() as client:
+        assert client is not stale
+
+
+def test_session_is_dropped_when_block_raises():
+    pool = TvSessionPool(factory=FakeTvDatafeed)
+    with pytest.raises(RuntimeError):
+        with pool.session():
+            raise RuntimeError("socket closed")
+
+    assert pool.stats()['idle'] == 0
+    assert pool.stats()['in_use'] == 0
+    pool.get_hist('AAPL', 'NASDAQ', '1D', 10)
+    assert pool.stats()['logins'] == 2